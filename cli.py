@@ -112,6 +112,8 @@ class CLI:
         self.save_history()
         if self.riot_client:
             await self.riot_client.close()
+        if self.db_manager:
+            await self.db_manager.close()
 
     def print_help(self):
         """Affiche l'aide"""
@@ -237,7 +239,7 @@ Raccourcis clavier (style bash):
         """Ajoute un utilisateur avec gestion du statut primary"""
         import aiosqlite
 
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.connection() as db:
             # Verifier si c'est le premier compte ou si on force primary
             cursor = await db.execute(
                 "SELECT COUNT(*) FROM users WHERE discord_id = ?",
@@ -283,11 +285,9 @@ Raccourcis clavier (style bash):
             print("       setprimary <RiotID#Tag>")
             return
 
-        import aiosqlite
-
         identifier = args[0]
 
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.connection() as db:
             # Chercher par alias ou par gamename#tag
             if '#' in identifier:
                 game_name, tag_line = identifier.rsplit('#', 1)
@@ -433,9 +433,7 @@ Raccourcis clavier (style bash):
 
     async def cmd_users(self, args: list):
         """Liste tous les utilisateurs avec des comptes lies"""
-        import aiosqlite
-
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.connection() as db:
             cursor = await db.execute(
                 """SELECT discord_id, COUNT(*) as count,
                    GROUP_CONCAT(game_name || '#' || tag_line, ', ') as accounts
@@ -490,12 +488,14 @@ Raccourcis clavier (style bash):
         queue = args[0].lower() if args else "both"
 
         if queue == "both":
+            leaderboards = await self.leaderboard_module.get_leaderboards(["RANKED_SOLO_5x5", "RANKED_FLEX_SR"])
+
             # Solo
-            solo_players = await self.leaderboard_module.get_leaderboard_data("RANKED_SOLO_5x5")
+            solo_players = leaderboards["RANKED_SOLO_5x5"]
             print(self.leaderboard_module.format_leaderboard_text("RANKED_SOLO_5x5", solo_players))
 
             # Flex
-            flex_players = await self.leaderboard_module.get_leaderboard_data("RANKED_FLEX_SR")
+            flex_players = leaderboards["RANKED_FLEX_SR"]
             print(self.leaderboard_module.format_leaderboard_text("RANKED_FLEX_SR", flex_players))
 
         elif queue == "solo":
@@ -513,7 +513,7 @@ Raccourcis clavier (style bash):
         """Met a jour les rangs de tous les joueurs"""
         print("[UpdateRanks] Mise a jour des rangs...")
         count = await self.leaderboard_module.update_all_ranks()
-        print(f"[UpdateRanks] {count} rangs mis a jour.")
+        print(f"[UpdateRanks] {count} rang(s) modifie(s).")
 
     def _print_embed(self, embed):
         """Affiche un embed Discord en mode texte"""
@@ -24,8 +24,11 @@ class ExerciseCog(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @exercises_group.command(name="enable", description="Activer le tracking d'un exercice")
-    @app_commands.describe(exercise_id="ID de l'exercice a activer")
-    async def enable(self, interaction: discord.Interaction, exercise_id: str):
+    @app_commands.describe(
+        exercise_id="ID de l'exercice a activer",
+        backfill="Evaluer aussi les games deja jouees cette saison (en arriere-plan)"
+    )
+    async def enable(self, interaction: discord.Interaction, exercise_id: str, backfill: bool = False):
         """Active un exercice"""
         await interaction.response.defer(ephemeral=True)
 
@@ -52,7 +55,20 @@ class ExerciseCog(commands.Cog):
             success = await self.bot.db_manager.enable_exercise(user['riot_puuid'], exercise_id)
             ex_name = config.TRAINING_EXERCISES[exercise_id]['name']
 
-            if success:
+            if success and backfill:
+                total = await self.bot.exercise_backfill.start(user['riot_puuid'], exercise_id)
+                if total is None:
+                    message = (
+                        f"Exercice **{ex_name}** active ! Aucune game stockee pour l'instant: le backfill "
+                        f"demarrera apres la prochaine synchronisation des matchs (`/exercises backfill`)."
+                    )
+                else:
+                    message = (
+                        f"Exercice **{ex_name}** active ! Backfill de {total} game(s) de la saison lance, "
+                        f"suivez l'avancement avec `/exercises backfill`."
+                    )
+                await interaction.followup.send(message, ephemeral=True)
+            elif success:
                 await interaction.followup.send(
                     f"Exercice **{ex_name}** active ! Le tracking commencera au prochain check.",
                     ephemeral=True
@@ -136,6 +152,20 @@ class ExerciseCog(commands.Cog):
             pass
         return choices[:25]
 
+    @exercises_group.command(name="backfill", description="Voir l'avancement des backfills d'exercices")
+    async def backfill_status(self, interaction: discord.Interaction):
+        """Affiche l'avancement des backfills"""
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            embed = await self.bot.exercise_backfill.generate_progress_embed(str(interaction.user.id))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            print(f"[Exercises] Erreur backfill: {e}")
+            traceback.print_exc()
+            await interaction.followup.send(f"Erreur: {e}", ephemeral=True)
+
     @exercises_group.command(name="stats", description="Voir tes stats d'exercices")
     @app_commands.describe(user="Utilisateur cible (optionnel)")
     async def stats(self, interaction: discord.Interaction, user: discord.Member = None):
@@ -14,14 +14,37 @@ CACHE_TTL = {
     'REGISTERED_USER': None,   # Permanent
 }
 
+# Cache memoire devant api_cache: nombre max d'entrees par namespace de cle
+# (prefixe avant ':'), en objets Python deja parses. 0 = pas de cache memoire.
+MEMORY_CACHE_SIZE = {
+    'match': 500,           # ~quelques centaines de Ko parses par match
+    'timeline': 20,         # tres volumineux, on en garde peu
+    'match_history': 500,
+    'league': 500,
+    'mastery': 200,
+    'account': 1000,
+    'summoner': 1000,
+    'default': 200,
+}
+
+# Ecritures differees (api_cache, weekly/split stats): regroupees dans une
+# seule transaction toutes les N secondes ou des que le lot atteint la taille max
+WRITE_BEHIND_INTERVAL = 5
+WRITE_BEHIND_BATCH_SIZE = 500
+
 # Région supportée
 DEFAULT_REGION = 'EUW1'
 ROUTING_REGION = 'europe'  # Pour ACCOUNT-V1 et MATCH-V5
 
-# Rate Limiting
+# Rate Limiting (limites de depart pour une cle dev, remplacees ensuite par
+# les headers X-App-Rate-Limit / X-Method-Rate-Limit renvoyes par Riot)
 RATE_LIMIT = {
     'REQUESTS_PER_SECOND': 20,
     'REQUESTS_PER_TWO_MINUTES': 100,
+    # Requetes de fond (backfill): part de chaque fenetre laissee libre pour
+    # les commandes, et intervalle entre deux verifications
+    'BACKGROUND_HEADROOM': 0.5,
+    'BACKGROUND_POLL_INTERVAL': 0.5,
 }
 
 # Data Dragon
@@ -39,6 +62,13 @@ LEADERBOARD_DAILY_CHANNEL_ID = 1470463042767552584  # Set to Discord channel ID
 LEADERBOARD_WEEKLY_CHANNEL_ID = 1470463064821207196
 LEADERBOARD_HOUR = 10  # Heure d'envoi (Paris time)
 LEADERBOARD_MINUTE = 0
+# Rafraichissement des rangs: joueurs interroges en parallele (derriere le rate limiter)
+RANK_REFRESH_CONCURRENCY = 10
+# Historique des rangs: pleine resolution (horaire) sur les dernieres semaines,
+# puis un snapshot par jour; None = jamais de suppression au-dela
+RANK_HISTORY_FULL_RESOLUTION_DAYS = 28
+RANK_HISTORY_RETENTION_DAYS = 365
+RANK_HISTORY_COMPACTION_HOUR = 4
 
 # Danger Score Configuration (Clash Scout)
 DANGER_SCORE = {
@@ -59,6 +89,17 @@ DANGER_SCORE = {
     'SMURF_SCORE': 80,                      # Points bonus smurf detecte
 }
 
+# Cache des joueurs scoutes (Clash Scout): fraicheur par champ, en secondes.
+# Un nouveau scout ne re-fetch que les champs perimes.
+SCOUT_CACHE_TTL = {
+    'ACCOUNT': 86400,          # 24h (Riot ID)
+    'RANK': 300,               # 5 min
+    'MATCH_HISTORY': 300,      # 5 min (IDs + analyse des games recentes)
+    'MASTERY': 21600,          # 6h
+    'SEASON_STATS': 21600,     # 6h (scraping leagueofgraphs)
+}
+SCOUT_CACHE_SIZE = 200         # Joueurs gardes en memoire (LRU)
+
 # Role detection (Clash Scout)
 ROLE_DETECTION = {
     'HISTORY_GAMES': 20,                    # Games a analyser pour detecter role
@@ -87,6 +128,13 @@ TILT_CHANNEL_ID = 1470464009877717022  # Set to Discord channel ID (int)
 # Check interval in minutes (30 = check every 30 min)
 TILT_CHECK_INTERVAL_MINUTES = 30
 
+# Match feed: new ranked matches are discovered once per tick for every player
+# (tilt, challenges and exercises read from it). Players scanned in parallel,
+# API calls still go through the shared rate limiter.
+MATCH_FEED_CONCURRENCY = 5
+# Ticks ou un match reste introuvable (404, erreurs) avant de le sauter
+MATCH_FEED_MAX_FETCH_ATTEMPTS = 3
+
 # Loss streak messages - 5 messages per threshold (3, 4, 5, 6+)
 # {player} will be replaced with the player's name
 # {count} will be replaced with the streak count
@@ -581,3 +629,10 @@ TRAINING_EXERCISES = {
         ],
     },
 }
+
+# Backfill d'un exercice sur la saison (/exercises enable ... backfill:True):
+# timelines recuperees en basse priorite, N en parallele, checkpoint tous les N matchs
+EXERCISE_BACKFILL_CONCURRENCY = 2
+EXERCISE_BACKFILL_BATCH_SIZE = 10
+# Reprises ou une timeline reste introuvable avant de sauter le match
+EXERCISE_BACKFILL_MAX_FETCH_ATTEMPTS = 3
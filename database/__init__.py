@@ -2,5 +2,6 @@
 Package de gestion de la base de données SQLite
 """
 from .manager import DatabaseManager
+from .player_stats import PlayerStats
 
-__all__ = ['DatabaseManager']
+__all__ = ['DatabaseManager', 'PlayerStats']
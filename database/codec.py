@@ -0,0 +1,28 @@
+"""
+Encodage des reponses API stockees dans api_cache
+"""
+import json
+import zlib
+from typing import Any, Tuple
+
+# Valeurs de la colonne api_cache.codec
+CODEC_JSON = 0        # texte json.dumps brut (lignes historiques)
+CODEC_ZLIB_JSON = 1   # JSON compact compresse zlib
+
+CURRENT_CODEC = CODEC_ZLIB_JSON
+ZLIB_LEVEL = 6
+
+
+def encode(data: Any) -> Tuple[bytes, int]:
+    """Serialise un objet pour api_cache, retourne (payload, codec)"""
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(raw, ZLIB_LEVEL), CURRENT_CODEC
+
+
+def decode(payload: Any, codec: int) -> Any:
+    """Deserialise une ligne de api_cache selon son codec"""
+    if codec == CODEC_ZLIB_JSON:
+        return json.loads(zlib.decompress(payload))
+    if codec == CODEC_JSON:
+        return json.loads(payload)
+    raise ValueError(f"Codec de cache inconnu: {codec}")
@@ -2,22 +2,266 @@
 Gestionnaire de base de données SQLite avec support asynchrone
 """
 import aiosqlite
-import json
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from .models import SCHEMA
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from config import (
+    MEMORY_CACHE_SIZE, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_BATCH_SIZE,
+    RANK_HISTORY_FULL_RESOLUTION_DAYS, RANK_HISTORY_RETENTION_DAYS,
+)
+from .models import SCHEMA, SQLITE_PRAGMAS, MIGRATIONS, PARTICIPANT_FIELDS
+from . import codec
+from .memory_cache import MemoryCache
+from .player_stats import PlayerStats
+
+
+# Requetes des ecritures differees (une cle unique par ligne -> les doublons
+# d'un meme lot se fusionnent, seule la derniere valeur est ecrite)
+SQL_SET_CACHE = """INSERT OR REPLACE INTO api_cache (cache_key, response_data, codec, cached_at, expires_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?)"""
+
+SQL_SAVE_WEEKLY_PLAYER_STATS = """INSERT INTO weekly_player_stats
+    (riot_puuid, week_start, stats, games_counted, last_match_id, champs_won, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(riot_puuid, week_start)
+    DO UPDATE SET stats = excluded.stats, games_counted = excluded.games_counted,
+        last_match_id = excluded.last_match_id, champs_won = excluded.champs_won,
+        updated_at = CURRENT_TIMESTAMP"""
+
+SQL_SAVE_WEEKLY_SUMMARY_STATS = """INSERT INTO weekly_summaries
+    (week_start, riot_puuid, games, wins, losses, kills, deaths, assists, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(week_start, riot_puuid)
+    DO UPDATE SET games = excluded.games, wins = excluded.wins, losses = excluded.losses,
+        kills = excluded.kills, deaths = excluded.deaths, assists = excluded.assists,
+        updated_at = CURRENT_TIMESTAMP"""
+
+SQL_SAVE_SPLIT_PLAYER_STATS = """INSERT INTO split_player_stats
+    (riot_puuid, season_split, stats, games_counted, last_match_id, champs_won, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(riot_puuid, season_split)
+    DO UPDATE SET stats = excluded.stats, games_counted = excluded.games_counted,
+        last_match_id = excluded.last_match_id, champs_won = excluded.champs_won,
+        updated_at = CURRENT_TIMESTAMP"""
+
+SQL_STORE_MATCH = """INSERT OR IGNORE INTO matches (match_id, game_creation, game_duration, queue_id, game_version)
+    VALUES (?, ?, ?, ?, ?)"""
+
+SQL_STORE_PARTICIPANT = f"""INSERT OR IGNORE INTO match_participants
+    (match_id, puuid, game_creation, {', '.join(PARTICIPANT_FIELDS)})
+    VALUES (?, ?, ?, {', '.join('?' for _ in PARTICIPANT_FIELDS)})"""
+
+SQL_SET_MATCH_CURSOR = """INSERT INTO match_cursors (riot_puuid, consumer, last_match_id, last_match_time, updated_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(riot_puuid, consumer)
+    DO UPDATE SET last_match_id = excluded.last_match_id, last_match_time = excluded.last_match_time,
+        updated_at = CURRENT_TIMESTAMP"""
+
+# Colonnes de matches renvoyees avec chaque ligne participant (noms Riot)
+SQL_SELECT_PARTICIPANTS = """SELECT p.*, m.game_creation AS gameCreation, m.game_duration AS gameDuration,
+    m.queue_id AS queueId
+    FROM match_participants p JOIN matches m ON m.match_id = p.match_id"""
+
+# Insere un snapshot sauf s'il est identique au dernier du joueur pour cette file
+SQL_INSERT_RANK_SNAPSHOT = """
+INSERT INTO rank_history (riot_puuid, queue_type, tier, rank, league_points, wins, losses)
+SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7
+WHERE NOT EXISTS (
+    SELECT 1 FROM (
+        SELECT tier, rank, league_points, wins, losses FROM rank_history
+        WHERE riot_puuid = ?1 AND queue_type = ?2
+        ORDER BY recorded_at DESC, id DESC LIMIT 1
+    ) last
+    WHERE last.tier IS ?3 AND last.rank IS ?4 AND last.league_points IS ?5
+      AND last.wins IS ?6 AND last.losses IS ?7
+)
+"""
+
+# Avant le seuil: garde le dernier snapshot de chaque jour
+SQL_DOWNSAMPLE_RANK_HISTORY = """
+DELETE FROM rank_history WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY riot_puuid, queue_type, date(recorded_at)
+            ORDER BY recorded_at DESC, id DESC
+        ) AS position
+        FROM rank_history
+        WHERE recorded_at < datetime('now', ?)
+    ) WHERE position > 1
+)
+"""
+
+# Supprime les snapshots identiques au precedent (ne garde que les changements)
+SQL_DEDUPE_RANK_HISTORY = """
+DELETE FROM rank_history WHERE id IN (
+    SELECT id FROM (
+        SELECT id, tier, rank, league_points, wins, losses,
+            LAG(id) OVER w AS prev_id,
+            LAG(tier) OVER w AS prev_tier,
+            LAG(rank) OVER w AS prev_rank,
+            LAG(league_points) OVER w AS prev_lp,
+            LAG(wins) OVER w AS prev_wins,
+            LAG(losses) OVER w AS prev_losses
+        FROM rank_history
+        WINDOW w AS (PARTITION BY riot_puuid, queue_type ORDER BY recorded_at, id)
+    )
+    WHERE prev_id IS NOT NULL
+      AND tier IS prev_tier AND rank IS prev_rank AND league_points IS prev_lp
+      AND wins IS prev_wins AND losses IS prev_losses
+)
+"""
+
+# Retention: avant le seuil, garde uniquement le dernier snapshot de chaque
+# joueur/file (la valeur "au temps t" reste connue apres le seuil)
+SQL_EXPIRE_RANK_HISTORY = """
+DELETE FROM rank_history WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY riot_puuid, queue_type ORDER BY recorded_at DESC, id DESC
+        ) AS position
+        FROM rank_history
+        WHERE recorded_at < datetime('now', ?)
+    ) WHERE position > 1
+)
+"""
+
+# Rang de chaque joueur enregistre a chaque instant cible (dernier snapshot
+# <= target_time), pour chaque queue; {queues} / {targets}: listes de (?)
+SQL_RANKS_AS_OF = """WITH queues(queue_type) AS (VALUES {queues}),
+    targets(target_time) AS (VALUES {targets}),
+    players(riot_puuid) AS (SELECT DISTINCT riot_puuid FROM users)
+    SELECT t.target_time AS as_of, h.*
+    FROM players p CROSS JOIN queues q CROSS JOIN targets t
+    JOIN rank_history h ON h.id = (
+        SELECT id FROM rank_history
+        WHERE riot_puuid = p.riot_puuid AND queue_type = q.queue_type AND recorded_at <= t.target_time
+        ORDER BY recorded_at DESC LIMIT 1
+    )"""
 
 
 class DatabaseManager:
     def __init__(self, db_path: str = "lolbot.db"):
         self.db_path = db_path
+        # Tier memoire devant api_cache (objets deja parses)
+        self.memory_cache = MemoryCache(MEMORY_CACHE_SIZE)
+        # Connexion longue duree (ouverte dans initialize), un seul worker thread
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        # Ecritures differees: sql -> {cle de ligne: parametres}
+        self._pending: Dict[str, Dict[Tuple, Tuple]] = {}
+        self._pending_count = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        # match_ids deja envoyes vers matches/match_participants
+        self._stored_matches: set = set()
 
     async def initialize(self):
         """Initialise la base de données et crée les tables"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.executescript(SCHEMA)
+
+            for table, column, definition in MIGRATIONS:
+                cursor = await db.execute(f"PRAGMA table_info({table})")
+                columns = {row['name'] for row in await cursor.fetchall()}
+                if column not in columns:
+                    print(f"[DB] Migration: ajout de {table}.{column}")
+                    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
             await db.commit()
 
+    async def _open(self) -> aiosqlite.Connection:
+        """Ouvre la connexion partagee et applique les pragmas"""
+        db = await aiosqlite.connect(self.db_path)
+        db.row_factory = aiosqlite.Row
+        for pragma in SQLITE_PRAGMAS:
+            await db.execute(f"PRAGMA {pragma}")
+        return db
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Acces exclusif a la connexion partagee (ouverte a la demande).
+
+        Les operations sont serialisees par un lock pour qu'une transaction ne
+        se melange pas avec celle d'une autre coroutine. Une transaction non
+        commitee en sortie de bloc est annulee, comme le faisait la fermeture
+        d'une connexion ephemere.
+        """
+        async with self._lock:
+            if self._db is None:
+                self._db = await self._open()
+            db = self._db
+            try:
+                yield db
+            finally:
+                if db.in_transaction:
+                    await db.rollback()
+
+    async def close(self):
+        """Ecrit les lignes en attente puis ferme la connexion partagee"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
+
+        async with self._lock:
+            if self._db is not None:
+                await self._db.close()
+                self._db = None
+
+    # ==================== Write-behind ====================
+
+    async def _enqueue(self, sql: str, rows: List[Tuple[Tuple, Tuple]]):
+        """
+        Met des lignes (cle, parametres) en attente d'ecriture.
+
+        Le lot est ecrit des qu'il atteint WRITE_BEHIND_BATCH_SIZE lignes,
+        sinon au plus tard WRITE_BEHIND_INTERVAL secondes apres la premiere.
+        """
+        pending = self._pending.setdefault(sql, {})
+        for key, params in rows:
+            if key not in pending:
+                self._pending_count += 1
+            pending[key] = params
+
+        if self._pending_count >= WRITE_BEHIND_BATCH_SIZE:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        """Flush differe declenche par la premiere ecriture en attente"""
+        await asyncio.sleep(WRITE_BEHIND_INTERVAL)
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[DB] Erreur flush write-behind: {e}")
+
+    async def flush(self):
+        """Ecrit toutes les lignes en attente dans une seule transaction"""
+        if not self._pending_count:
+            return
+
+        batch, self._pending = self._pending, {}
+        count, self._pending_count = self._pending_count, 0
+
+        try:
+            async with self.connection() as db:
+                for sql, rows in batch.items():
+                    await db.executemany(sql, list(rows.values()))
+                await db.commit()
+        except BaseException:
+            # Remettre le lot en attente sans ecraser les valeurs plus recentes
+            for sql, rows in batch.items():
+                pending = self._pending.setdefault(sql, {})
+                for key, params in rows.items():
+                    if key not in pending:
+                        pending[key] = params
+                        self._pending_count += 1
+            raise
+
+        print(f"[DB] Write-behind: {count} ligne(s) ecrite(s)")
+
     # ==================== Users ====================
 
     async def add_user(
@@ -31,7 +275,7 @@ class DatabaseManager:
         account_alias: Optional[str] = None
     ) -> bool:
         """Ajoute un compte Riot pour un utilisateur Discord"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             # Vérifier si c'est le premier compte
             cursor = await db.execute(
                 "SELECT COUNT(*) FROM users WHERE discord_id = ?",
@@ -54,8 +298,7 @@ class DatabaseManager:
 
     async def get_user(self, discord_id: str, alias: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Récupère un compte utilisateur (principal par défaut)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
 
             if alias:
                 print(f"[DB] Query: SELECT * FROM users WHERE discord_id = {repr(discord_id)} AND account_alias = {repr(alias)}")
@@ -76,8 +319,7 @@ class DatabaseManager:
 
     async def get_all_users(self, discord_id: str) -> List[Dict[str, Any]]:
         """Récupère tous les comptes d'un utilisateur Discord"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM users WHERE discord_id = ? ORDER BY is_primary DESC, created_at ASC",
                 (discord_id,)
@@ -87,7 +329,7 @@ class DatabaseManager:
 
     async def remove_user(self, discord_id: str, alias: Optional[str] = None) -> bool:
         """Supprime un compte utilisateur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             if alias:
                 await db.execute(
                     "DELETE FROM users WHERE discord_id = ? AND account_alias = ?",
@@ -129,9 +371,20 @@ class DatabaseManager:
 
     async def get_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Récupère une entrée du cache si elle n'est pas expirée"""
-        async with aiosqlite.connect(self.db_path) as db:
+        cached = self.memory_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Ecriture pas encore flushee (evincee du tier memoire entre-temps)
+        pending = self._pending.get(SQL_SET_CACHE, {}).get((cache_key,))
+        if pending is not None:
+            _, payload, payload_codec, expires_at = pending
+            if not expires_at or datetime.fromisoformat(expires_at) > datetime.now():
+                return codec.decode(payload, payload_codec)
+
+        async with self.connection() as db:
             cursor = await db.execute(
-                """SELECT response_data, expires_at FROM api_cache
+                """SELECT response_data, codec, expires_at FROM api_cache
                 WHERE cache_key = ?""",
                 (cache_key,)
             )
@@ -140,12 +393,14 @@ class DatabaseManager:
             if not row:
                 return None
 
-            response_data, expires_at = row
+            payload, payload_codec, expires_at = row
 
             # Vérifier l'expiration
+            remaining = None
             if expires_at:
                 expiry = datetime.fromisoformat(expires_at)
-                if datetime.now() > expiry:
+                remaining = (expiry - datetime.now()).total_seconds()
+                if remaining <= 0:
                     # Cache expiré, le supprimer
                     await db.execute(
                         "DELETE FROM api_cache WHERE cache_key = ?",
@@ -154,25 +409,41 @@ class DatabaseManager:
                     await db.commit()
                     return None
 
-            return json.loads(response_data)
+            data = codec.decode(payload, payload_codec)
+
+        # Ligne historique en JSON texte: la re-ecrire compressee (en differe)
+        if payload_codec != codec.CURRENT_CODEC:
+            new_payload, new_codec = codec.encode(data)
+            await self._enqueue(SQL_SET_CACHE, [
+                ((cache_key,), (cache_key, new_payload, new_codec, expires_at))
+            ])
+
+        self.memory_cache.set(cache_key, data, remaining)
+        return data
 
     async def set_cache(self, cache_key: str, response_data: Dict[str, Any], ttl: Optional[int] = None):
-        """Stocke une entrée dans le cache"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Stocke une entrée dans le cache (memoire + SQLite en differe)"""
+        await self.set_cache_many([(cache_key, response_data, ttl)])
+
+    async def set_cache_many(self, entries: List[Tuple[str, Dict[str, Any], Optional[int]]]):
+        """Stocke plusieurs entrées (cache_key, response_data, ttl) dans le cache"""
+        rows = []
+        for cache_key, response_data, ttl in entries:
+            self.memory_cache.set(cache_key, response_data, ttl)
             expires_at = None
             if ttl:
                 expires_at = (datetime.now() + timedelta(seconds=ttl)).isoformat()
+            payload, payload_codec = codec.encode(response_data)
+            rows.append(((cache_key,), (cache_key, payload, payload_codec, expires_at)))
 
-            await db.execute(
-                """INSERT OR REPLACE INTO api_cache (cache_key, response_data, cached_at, expires_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP, ?)""",
-                (cache_key, json.dumps(response_data), expires_at)
-            )
-            await db.commit()
+        await self._enqueue(SQL_SET_CACHE, rows)
 
     async def clear_expired_cache(self):
         """Nettoie les entrées de cache expirées"""
-        async with aiosqlite.connect(self.db_path) as db:
+        self.memory_cache.purge_expired()
+        await self.flush()
+
+        async with self.connection() as db:
             await db.execute(
                 "DELETE FROM api_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
                 (datetime.now().isoformat(),)
@@ -181,7 +452,10 @@ class DatabaseManager:
 
     async def clear_cache_by_pattern(self, pattern: str):
         """Supprime les entrées de cache correspondant à un motif"""
-        async with aiosqlite.connect(self.db_path) as db:
+        self.memory_cache.invalidate(pattern)
+        await self.flush()
+
+        async with self.connection() as db:
             await db.execute(
                 "DELETE FROM api_cache WHERE cache_key LIKE ?",
                 (f"%{pattern}%",)
@@ -190,43 +464,73 @@ class DatabaseManager:
 
     # ==================== Rank History ====================
 
-    async def save_rank_snapshot(
-        self,
-        riot_puuid: str,
-        queue_type: str,
-        tier: str,
-        rank: str,
-        league_points: int,
-        wins: int,
-        losses: int
-    ):
-        """Sauvegarde un snapshot du rang d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """INSERT INTO rank_history
-                (riot_puuid, queue_type, tier, rank, league_points, wins, losses)
-                VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (riot_puuid, queue_type, tier, rank, league_points, wins, losses)
-            )
+    async def save_rank_snapshots(self, snapshots: List[Tuple[str, str, str, str, int, int, int]]) -> int:
+        """
+        Sauvegarde plusieurs snapshots en une transaction.
+        snapshots: (riot_puuid, queue_type, tier, rank, league_points, wins, losses)
+        Retourne le nombre de snapshots inseres (les inchanges sont ignores).
+        """
+        if not snapshots:
+            return 0
+        async with self.connection() as db:
+            changes_before = db.total_changes
+            await db.executemany(SQL_INSERT_RANK_SNAPSHOT, snapshots)
+            inserted = db.total_changes - changes_before
             await db.commit()
+        return inserted
+
+    async def compact_rank_history(self) -> int:
+        """
+        Compacte rank_history; retourne le nombre de lignes supprimees.
+
+        - garde tout sur RANK_HISTORY_FULL_RESOLUTION_DAYS jours
+        - au-dela: un snapshot par jour (le dernier) et par file
+        - au-dela de RANK_HISTORY_RETENTION_DAYS: ne garde que le dernier
+          snapshot de chaque joueur/file
+        - supprime les snapshots identiques au precedent (la valeur "au temps t"
+          reste la meme)
+        """
+        full_resolution = f"-{RANK_HISTORY_FULL_RESOLUTION_DAYS} days"
+        async with self.connection() as db:
+            deleted = 0
+            cursor = await db.execute(SQL_DOWNSAMPLE_RANK_HISTORY, (full_resolution,))
+            deleted += cursor.rowcount
+            if RANK_HISTORY_RETENTION_DAYS:
+                cursor = await db.execute(
+                    SQL_EXPIRE_RANK_HISTORY, (f"-{RANK_HISTORY_RETENTION_DAYS} days",)
+                )
+                deleted += cursor.rowcount
+            cursor = await db.execute(SQL_DEDUPE_RANK_HISTORY)
+            deleted += cursor.rowcount
+            await db.commit()
+        return deleted
 
-    async def get_rank_at_time(
+    async def get_ranks_as_of(
         self,
-        riot_puuid: str,
-        queue_type: str,
-        target_time: str
-    ) -> Optional[Dict[str, Any]]:
-        """Recupere le rang d'un joueur a un moment donne (le plus proche avant target_time)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                """SELECT * FROM rank_history
-                WHERE riot_puuid = ? AND queue_type = ? AND recorded_at <= ?
-                ORDER BY recorded_at DESC LIMIT 1""",
-                (riot_puuid, queue_type, target_time)
-            )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+        queue_types: List[str],
+        target_times: List[str]
+    ) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """
+        Rang de tous les joueurs enregistres a plusieurs instants, en une requete.
+        Retourne {(riot_puuid, queue_type, target_time): dernier snapshot
+        <= target_time} (absent si aucun).
+        """
+        if not queue_types or not target_times:
+            return {}
+        query = SQL_RANKS_AS_OF.format(
+            queues=', '.join('(?)' for _ in queue_types),
+            targets=', '.join('(?)' for _ in target_times),
+        )
+        async with self.connection() as db:
+            cursor = await db.execute(query, [*queue_types, *target_times])
+            rows = await cursor.fetchall()
+
+        ranks = {}
+        for row in rows:
+            snapshot = dict(row)
+            as_of = snapshot.pop('as_of')
+            ranks[(snapshot['riot_puuid'], snapshot['queue_type'], as_of)] = snapshot
+        return ranks
 
     async def get_latest_rank(
         self,
@@ -234,8 +538,7 @@ class DatabaseManager:
         queue_type: str
     ) -> Optional[Dict[str, Any]]:
         """Recupere le dernier rang enregistre d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT * FROM rank_history
                 WHERE riot_puuid = ? AND queue_type = ?
@@ -247,23 +550,22 @@ class DatabaseManager:
 
     async def get_all_registered_puuids(self) -> List[str]:
         """Recupere tous les PUUIDs des utilisateurs enregistres"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT DISTINCT riot_puuid FROM users"
             )
             rows = await cursor.fetchall()
             return [row[0] for row in rows]
 
-    async def get_user_by_puuid(self, riot_puuid: str) -> Optional[Dict[str, Any]]:
-        """Recupere un utilisateur par son PUUID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                "SELECT * FROM users WHERE riot_puuid = ? LIMIT 1",
-                (riot_puuid,)
-            )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+    async def get_users_by_puuid(self) -> Dict[str, Dict[str, Any]]:
+        """Tous les utilisateurs, par PUUID (le premier compte enregistre pour chaque PUUID)"""
+        async with self.connection() as db:
+            cursor = await db.execute("SELECT * FROM users ORDER BY rowid")
+            rows = await cursor.fetchall()
+        users = {}
+        for row in rows:
+            users.setdefault(row['riot_puuid'], dict(row))
+        return users
 
     # ==================== Clash Teams ====================
 
@@ -274,7 +576,7 @@ class DatabaseManager:
         member_discord_ids: List[str]
     ) -> Optional[int]:
         """Cree une equipe Clash avec ses membres. Retourne l'ID de l'equipe."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             try:
                 # Creer l'equipe
                 cursor = await db.execute(
@@ -303,8 +605,7 @@ class DatabaseManager:
         creator_discord_id: str
     ) -> Optional[Dict[str, Any]]:
         """Recupere une equipe Clash par son nom et createur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT * FROM clash_teams
                 WHERE team_name = ? AND created_by_discord_id = ?""",
@@ -332,8 +633,7 @@ class DatabaseManager:
 
     async def get_clash_team_by_id(self, team_id: int) -> Optional[Dict[str, Any]]:
         """Recupere une equipe Clash par son ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM clash_teams WHERE id = ?",
                 (team_id,)
@@ -360,8 +660,7 @@ class DatabaseManager:
 
     async def get_user_clash_teams(self, discord_id: str) -> List[Dict[str, Any]]:
         """Recupere toutes les equipes dont l'utilisateur fait partie"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             # Equipes creees par l'utilisateur
             cursor = await db.execute(
                 """SELECT ct.*, 'creator' as role
@@ -403,7 +702,7 @@ class DatabaseManager:
 
     async def delete_clash_team(self, team_id: int) -> bool:
         """Supprime une equipe Clash"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             # Supprimer d'abord les membres (meme si CASCADE devrait le faire)
             await db.execute(
                 "DELETE FROM clash_team_members WHERE team_id = ?",
@@ -419,8 +718,7 @@ class DatabaseManager:
 
     async def get_clash_team_members_data(self, team_id: int) -> List[Dict[str, Any]]:
         """Recupere les donnees des membres d'une equipe (puuid, game_name, etc.)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT u.riot_puuid, u.summoner_id, u.game_name, u.tag_line, u.region,
                           ctm.position
@@ -437,8 +735,7 @@ class DatabaseManager:
 
     async def get_tilt_state(self, riot_puuid: str) -> Optional[Dict[str, Any]]:
         """Recupere l'etat de streak d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM tilt_tracker WHERE riot_puuid = ?",
                 (riot_puuid,)
@@ -455,7 +752,7 @@ class DatabaseManager:
         last_match_id: str
     ):
         """Met a jour l'etat de streak d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.execute(
                 """INSERT OR REPLACE INTO tilt_tracker
                 (riot_puuid, streak_type, streak_count, last_notified_count, last_match_id, updated_at)
@@ -466,7 +763,7 @@ class DatabaseManager:
 
     async def reset_tilt_state(self, riot_puuid: str):
         """Reset l'etat de streak d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.execute(
                 "DELETE FROM tilt_tracker WHERE riot_puuid = ?",
                 (riot_puuid,)
@@ -477,8 +774,7 @@ class DatabaseManager:
 
     async def get_weekly_challenges(self, week_start: str, discord_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Recupere les challenges de la semaine"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             if discord_id:
                 # Get global + personal challenges for this user
                 cursor = await db.execute(
@@ -507,7 +803,7 @@ class DatabaseManager:
         assigned_to: Optional[str] = None
     ) -> bool:
         """Cree un challenge pour la semaine"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             try:
                 await db.execute(
                     """INSERT INTO weekly_challenges
@@ -522,7 +818,7 @@ class DatabaseManager:
 
     async def deactivate_week_challenges(self, week_start: str):
         """Desactive tous les challenges d'une semaine"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.execute(
                 "UPDATE weekly_challenges SET is_active = 0 WHERE week_start = ?",
                 (week_start,)
@@ -531,36 +827,14 @@ class DatabaseManager:
 
     # ==================== Challenge Completions ====================
 
-    async def get_challenge_completion(
-        self,
-        challenge_id: str,
-        week_start: str,
-        discord_id: str
-    ) -> Optional[Dict[str, Any]]:
-        """Verifie si un joueur a complete un challenge"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+    async def get_week_completions(self, week_start: str) -> List[Dict[str, Any]]:
+        """Recupere toutes les completions d'une semaine (tous challenges, tous joueurs)"""
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT * FROM challenge_completions
-                WHERE challenge_id = ? AND week_start = ? AND discord_id = ?""",
-                (challenge_id, week_start, discord_id)
-            )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
-
-    async def get_challenge_completions_for_week(
-        self,
-        challenge_id: str,
-        week_start: str
-    ) -> List[Dict[str, Any]]:
-        """Recupere toutes les completions d'un challenge pour une semaine"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                """SELECT * FROM challenge_completions
-                WHERE challenge_id = ? AND week_start = ?
-                ORDER BY completed_at ASC""",
-                (challenge_id, week_start)
+                WHERE week_start = ?
+                ORDER BY completed_at ASC, id ASC""",
+                (week_start,)
             )
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
@@ -574,7 +848,7 @@ class DatabaseManager:
         points_awarded: int
     ) -> bool:
         """Enregistre la completion d'un challenge"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             try:
                 await db.execute(
                     """INSERT INTO challenge_completions
@@ -595,7 +869,7 @@ class DatabaseManager:
         season_split: str
     ) -> int:
         """Recupere les points d'un joueur pour une saison"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT total_points FROM challenge_points
                 WHERE discord_id = ? AND season_split = ?""",
@@ -611,7 +885,7 @@ class DatabaseManager:
         points: int
     ):
         """Ajoute des points a un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.execute(
                 """INSERT INTO challenge_points (discord_id, season_split, total_points, updated_at)
                 VALUES (?, ?, ?, CURRENT_TIMESTAMP)
@@ -627,8 +901,7 @@ class DatabaseManager:
         limit: int = 20
     ) -> List[Dict[str, Any]]:
         """Recupere le leaderboard des challenges"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT cp.discord_id, cp.total_points, u.game_name, u.tag_line
                 FROM challenge_points cp
@@ -643,7 +916,7 @@ class DatabaseManager:
 
     async def apply_penalty_to_all(self, season_split: str, penalty_points: int):
         """Applique une penalite a tous les joueurs enregistres"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             # Get all registered discord_ids
             cursor = await db.execute(
                 "SELECT DISTINCT discord_id FROM users WHERE is_primary = 1"
@@ -662,46 +935,7 @@ class DatabaseManager:
 
             await db.commit()
 
-    # ==================== Weekly Stats Cache ====================
-
-    async def get_weekly_stat(
-        self,
-        riot_puuid: str,
-        week_start: str,
-        stat_type: str
-    ) -> Optional[Dict[str, Any]]:
-        """Recupere une stat hebdomadaire cachee"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                """SELECT * FROM weekly_stats_cache
-                WHERE riot_puuid = ? AND week_start = ? AND stat_type = ?""",
-                (riot_puuid, week_start, stat_type)
-            )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
-
-    async def update_weekly_stat(
-        self,
-        riot_puuid: str,
-        week_start: str,
-        stat_type: str,
-        stat_value: float,
-        games_counted: int,
-        last_match_id: str
-    ):
-        """Met a jour une stat hebdomadaire"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """INSERT INTO weekly_stats_cache
-                (riot_puuid, week_start, stat_type, stat_value, games_counted, last_match_id, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(riot_puuid, week_start, stat_type)
-                DO UPDATE SET stat_value = ?, games_counted = ?, last_match_id = ?, updated_at = CURRENT_TIMESTAMP""",
-                (riot_puuid, week_start, stat_type, stat_value, games_counted, last_match_id,
-                 stat_value, games_counted, last_match_id)
-            )
-            await db.commit()
+    # ==================== Weekly Stats Cache (ancien format, lecture seule) ====================
 
     async def get_all_weekly_stats(
         self,
@@ -709,8 +943,8 @@ class DatabaseManager:
         week_start: str
     ) -> Dict[str, Dict[str, Any]]:
         """Recupere toutes les stats hebdomadaires d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        await self.flush()
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT * FROM weekly_stats_cache
                 WHERE riot_puuid = ? AND week_start = ?""",
@@ -721,64 +955,26 @@ class DatabaseManager:
 
     async def clear_old_weekly_stats(self, weeks_to_keep: int = 4):
         """Nettoie les stats hebdomadaires anciennes"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """DELETE FROM weekly_stats_cache
-                WHERE week_start < date('now', ? || ' days')""",
-                (f"-{weeks_to_keep * 7}",)
-            )
+        await self.flush()
+        async with self.connection() as db:
+            for table in ('weekly_stats_cache', 'weekly_player_stats'):
+                await db.execute(
+                    f"""DELETE FROM {table}
+                    WHERE week_start < date('now', ? || ' days')""",
+                    (f"-{weeks_to_keep * 7}",)
+                )
             await db.commit()
 
     async def get_all_primary_users(self) -> List[Dict[str, Any]]:
         """Recupere tous les utilisateurs avec leur compte principal"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM users WHERE is_primary = 1"
             )
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
-    # ==================== Split Stats Cache ====================
-
-    async def get_split_stat(
-        self,
-        riot_puuid: str,
-        season_split: str,
-        stat_type: str
-    ) -> Optional[Dict[str, Any]]:
-        """Recupere une stat de split cachee"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                """SELECT * FROM split_stats_cache
-                WHERE riot_puuid = ? AND season_split = ? AND stat_type = ?""",
-                (riot_puuid, season_split, stat_type)
-            )
-            row = await cursor.fetchone()
-            return dict(row) if row else None
-
-    async def update_split_stat(
-        self,
-        riot_puuid: str,
-        season_split: str,
-        stat_type: str,
-        stat_value: float,
-        games_counted: int,
-        last_match_id: str
-    ):
-        """Met a jour une stat de split"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """INSERT INTO split_stats_cache
-                (riot_puuid, season_split, stat_type, stat_value, games_counted, last_match_id, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(riot_puuid, season_split, stat_type)
-                DO UPDATE SET stat_value = ?, games_counted = ?, last_match_id = ?, updated_at = CURRENT_TIMESTAMP""",
-                (riot_puuid, season_split, stat_type, stat_value, games_counted, last_match_id,
-                 stat_value, games_counted, last_match_id)
-            )
-            await db.commit()
+    # ==================== Split Stats Cache (ancien format, lecture seule) ====================
 
     async def get_all_split_stats(
         self,
@@ -786,8 +982,8 @@ class DatabaseManager:
         season_split: str
     ) -> Dict[str, Dict[str, Any]]:
         """Recupere toutes les stats de split d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        await self.flush()
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT * FROM split_stats_cache
                 WHERE riot_puuid = ? AND season_split = ?""",
@@ -796,9 +992,144 @@ class DatabaseManager:
             rows = await cursor.fetchall()
             return {row['stat_type']: dict(row) for row in rows}
 
+    # ==================== Player Stats (une ligne par joueur) ====================
+
+    async def get_weekly_player_stats(self, riot_puuid: str, week_start: str) -> Optional[PlayerStats]:
+        """Stats de la semaine d'un joueur (None si aucune)"""
+        await self.flush()
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM weekly_player_stats WHERE riot_puuid = ? AND week_start = ?",
+                (riot_puuid, week_start)
+            )
+            row = await cursor.fetchone()
+        if row:
+            return PlayerStats.from_row(row)
+
+        # Semaine commencee avec l'ancien format (une ligne par stat)
+        legacy = await self.get_all_weekly_stats(riot_puuid, week_start)
+        return PlayerStats.from_stat_rows(legacy.values()) if legacy else None
+
+    async def get_all_weekly_player_stats(self, week_start: str) -> Dict[str, PlayerStats]:
+        """Stats de la semaine de tous les joueurs, {puuid: PlayerStats}"""
+        await self.flush()
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM weekly_player_stats WHERE week_start = ?",
+                (week_start,)
+            )
+            result = {row['riot_puuid']: PlayerStats.from_row(row) for row in await cursor.fetchall()}
+
+            # Joueurs encore dans l'ancien format
+            cursor = await db.execute(
+                "SELECT * FROM weekly_stats_cache WHERE week_start = ?",
+                (week_start,)
+            )
+            legacy: Dict[str, List[Dict[str, Any]]] = {}
+            for row in await cursor.fetchall():
+                if row['riot_puuid'] not in result:
+                    legacy.setdefault(row['riot_puuid'], []).append(dict(row))
+
+        for riot_puuid, rows in legacy.items():
+            result[riot_puuid] = PlayerStats.from_stat_rows(rows)
+        return result
+
+    async def save_weekly_player_stats(self, riot_puuid: str, week_start: str, stats: PlayerStats):
+        """Enregistre les stats de la semaine d'un joueur (ecriture differee)"""
+        await self._enqueue(SQL_SAVE_WEEKLY_PLAYER_STATS, [(
+            (riot_puuid, week_start),
+            (riot_puuid, week_start, stats.pack(), stats.games_counted,
+             stats.last_match_id, stats.champs_won_str())
+        )])
+        # Resume de la retrospective, ecrit dans le meme flush
+        await self._enqueue_weekly_summary(riot_puuid, week_start, stats)
+
+    async def _enqueue_weekly_summary(self, riot_puuid: str, week_start: str, stats: PlayerStats):
+        """Met en attente les agregats de weekly_summaries tires des stats de la semaine"""
+        await self._enqueue(SQL_SAVE_WEEKLY_SUMMARY_STATS, [(
+            (week_start, riot_puuid),
+            (week_start, riot_puuid, int(stats.wins + stats.losses), int(stats.wins),
+             int(stats.losses), int(stats.kills), int(stats.deaths), int(stats.assists))
+        )])
+
+    async def save_weekly_summary_lp(self, week_start: str, lps: List[Tuple[str, int]]):
+        """
+        Met a jour le LP Solo/Duo de la semaine: lps = [(riot_puuid, rank_to_lp)].
+        lp_start est fixe au premier rafraichissement de la semaine.
+        """
+        if not lps:
+            return
+        async with self.connection() as db:
+            await db.executemany(
+                """INSERT INTO weekly_summaries (week_start, riot_puuid, lp_start, lp_end, updated_at)
+                VALUES (?1, ?2, ?3, ?3, CURRENT_TIMESTAMP)
+                ON CONFLICT(week_start, riot_puuid)
+                DO UPDATE SET lp_start = COALESCE(lp_start, excluded.lp_end),
+                    lp_end = excluded.lp_end, updated_at = CURRENT_TIMESTAMP""",
+                [(week_start, riot_puuid, lp) for riot_puuid, lp in lps]
+            )
+            await db.commit()
+
+    async def get_weekly_summaries(self, week_start: str) -> List[Dict[str, Any]]:
+        """Resumes de la semaine des joueurs ayant joue, avec leur game_name"""
+        await self._seed_weekly_summaries(week_start)
+        async with self.connection() as db:
+            cursor = await db.execute(
+                """SELECT * FROM (
+                    SELECT s.*, (SELECT game_name FROM users u WHERE u.riot_puuid = s.riot_puuid LIMIT 1) AS game_name
+                    FROM weekly_summaries s WHERE s.week_start = ? AND s.games > 0
+                ) WHERE game_name IS NOT NULL""",
+                (week_start,)
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def _seed_weekly_summaries(self, week_start: str):
+        """
+        Complete weekly_summaries depuis les stats de la semaine des joueurs
+        sans resume (stats ecrites avant la table, ou ancien format par stat).
+        """
+        await self.flush()
+        async with self.connection() as db:
+            cursor = await db.execute(
+                """SELECT riot_puuid FROM weekly_player_stats WHERE week_start = ?1
+                UNION SELECT riot_puuid FROM weekly_stats_cache WHERE week_start = ?1
+                EXCEPT SELECT riot_puuid FROM weekly_summaries WHERE week_start = ?1 AND games > 0""",
+                (week_start,)
+            )
+            missing = [row['riot_puuid'] for row in await cursor.fetchall()]
+
+        for riot_puuid in missing:
+            stats = await self.get_weekly_player_stats(riot_puuid, week_start)
+            if stats and stats.wins + stats.losses > 0:
+                await self._enqueue_weekly_summary(riot_puuid, week_start, stats)
+        await self.flush()
+
+    async def get_split_player_stats(self, riot_puuid: str, season_split: str) -> Optional[PlayerStats]:
+        """Stats du split d'un joueur (None si aucune)"""
+        await self.flush()
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM split_player_stats WHERE riot_puuid = ? AND season_split = ?",
+                (riot_puuid, season_split)
+            )
+            row = await cursor.fetchone()
+        if row:
+            return PlayerStats.from_row(row)
+
+        legacy = await self.get_all_split_stats(riot_puuid, season_split)
+        return PlayerStats.from_stat_rows(legacy.values()) if legacy else None
+
+    async def save_split_player_stats(self, riot_puuid: str, season_split: str, stats: PlayerStats):
+        """Enregistre les stats du split d'un joueur (ecriture differee)"""
+        await self._enqueue(SQL_SAVE_SPLIT_PLAYER_STATS, [(
+            (riot_puuid, season_split),
+            (riot_puuid, season_split, stats.pack(), stats.games_counted,
+             stats.last_match_id, stats.champs_won_str())
+        )])
+
     async def reset_all_challenge_points(self, season_split: str):
         """Reset tous les scores de challenges a 0 pour un split"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             await db.execute(
                 "UPDATE challenge_points SET total_points = 0, updated_at = CURRENT_TIMESTAMP WHERE season_split = ?",
                 (season_split,)
@@ -807,18 +1138,20 @@ class DatabaseManager:
 
     async def reset_split_stats(self, season_split: str):
         """Reset toutes les stats d'un split (pour nouveau split)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "DELETE FROM split_stats_cache WHERE season_split = ?",
-                (season_split,)
-            )
+        await self.flush()
+        async with self.connection() as db:
+            for table in ('split_stats_cache', 'split_player_stats'):
+                await db.execute(
+                    f"DELETE FROM {table} WHERE season_split = ?",
+                    (season_split,)
+                )
             await db.commit()
 
     # ==================== Training Exercises ====================
 
     async def enable_exercise(self, riot_puuid: str, exercise_id: str) -> bool:
         """Active le tracking d'un exercice pour un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             try:
                 await db.execute(
                     """INSERT INTO exercise_tracking (riot_puuid, exercise_id)
@@ -831,19 +1164,22 @@ class DatabaseManager:
                 return False
 
     async def disable_exercise(self, riot_puuid: str, exercise_id: str) -> bool:
-        """Desactive le tracking d'un exercice pour un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Desactive le tracking d'un exercice pour un joueur (et son backfill)"""
+        async with self.connection() as db:
             cursor = await db.execute(
                 "DELETE FROM exercise_tracking WHERE riot_puuid = ? AND exercise_id = ?",
                 (riot_puuid, exercise_id)
             )
+            await db.execute(
+                "DELETE FROM exercise_backfills WHERE riot_puuid = ? AND exercise_id = ?",
+                (riot_puuid, exercise_id)
+            )
             await db.commit()
             return cursor.rowcount > 0
 
     async def get_enabled_exercises(self, riot_puuid: str) -> List[Dict[str, Any]]:
         """Recupere les exercices actives d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM exercise_tracking WHERE riot_puuid = ?",
                 (riot_puuid,)
@@ -853,48 +1189,116 @@ class DatabaseManager:
 
     async def get_all_exercise_users(self) -> List[str]:
         """Recupere tous les PUUIDs ayant au moins un exercice active"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             cursor = await db.execute(
                 "SELECT DISTINCT riot_puuid FROM exercise_tracking"
             )
             rows = await cursor.fetchall()
             return [row[0] for row in rows]
 
-    async def update_exercise_last_match(self, riot_puuid: str, exercise_id: str, last_match_id: str):
-        """Met a jour le curseur de dernier match traite pour un exercice"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+    async def save_exercise_results(
+        self,
+        riot_puuid: str,
+        attempts: List[Tuple[str, str, bool, int]],
+        last_matches: Dict[str, str]
+    ):
+        """
+        Enregistre un lot de tentatives et avance les curseurs des exercices,
+        dans une seule transaction.
+        attempts: (exercise_id, match_id, success, match_timestamp)
+        last_matches: exercise_id -> dernier match traite
+        """
+        async with self.connection() as db:
+            await db.executemany(
+                """INSERT OR IGNORE INTO exercise_attempts
+                (riot_puuid, exercise_id, match_id, success, match_timestamp)
+                VALUES (?, ?, ?, ?, ?)""",
+                [(riot_puuid, *attempt) for attempt in attempts]
+            )
+            await db.executemany(
                 """UPDATE exercise_tracking SET last_match_id = ?
                 WHERE riot_puuid = ? AND exercise_id = ?""",
-                (last_match_id, riot_puuid, exercise_id)
+                [(match_id, riot_puuid, exercise_id) for exercise_id, match_id in last_matches.items()]
+            )
+            await db.commit()
+
+    async def create_exercise_backfill(
+        self,
+        riot_puuid: str,
+        exercise_id: str,
+        until_time: Optional[int],
+        total: int
+    ):
+        """
+        Cree (ou relance depuis le debut) le backfill d'un exercice.
+        until_time None: borne fixee plus tard (resolve_exercise_backfill).
+        """
+        async with self.connection() as db:
+            await db.execute(
+                """INSERT OR REPLACE INTO exercise_backfills
+                (riot_puuid, exercise_id, status, until_time, checkpoint_time, total, processed)
+                VALUES (?, ?, 'pending', ?, NULL, ?, 0)""",
+                (riot_puuid, exercise_id, until_time, total)
             )
             await db.commit()
 
-    async def record_exercise_attempt(
+    async def update_exercise_backfill(
         self,
         riot_puuid: str,
         exercise_id: str,
-        match_id: str,
-        success: bool,
-        match_timestamp: int
+        status: str,
+        checkpoint_time: Optional[int] = None,
+        processed: Optional[int] = None
     ) -> bool:
-        """Enregistre une tentative d'exercice"""
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                await db.execute(
-                    """INSERT INTO exercise_attempts
-                    (riot_puuid, exercise_id, match_id, success, match_timestamp)
-                    VALUES (?, ?, ?, ?, ?)""",
-                    (riot_puuid, exercise_id, match_id, success, match_timestamp)
-                )
-                await db.commit()
-                return True
-            except aiosqlite.IntegrityError:
-                return False
+        """
+        Met a jour l'etat d'un backfill (checkpoint et compteur si fournis).
+        Retourne False si le backfill n'existe plus (exercice desactive).
+        """
+        async with self.connection() as db:
+            cursor = await db.execute(
+                """UPDATE exercise_backfills
+                SET status = ?, checkpoint_time = COALESCE(?, checkpoint_time),
+                    processed = COALESCE(?, processed), updated_at = CURRENT_TIMESTAMP
+                WHERE riot_puuid = ? AND exercise_id = ?""",
+                (status, checkpoint_time, processed, riot_puuid, exercise_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def resolve_exercise_backfill(self, riot_puuid: str, exercise_id: str, until_time: int, total: int) -> bool:
+        """Fixe la borne et le total d'un backfill cree sans historique"""
+        async with self.connection() as db:
+            cursor = await db.execute(
+                """UPDATE exercise_backfills
+                SET until_time = ?, total = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE riot_puuid = ? AND exercise_id = ?""",
+                (until_time, total, riot_puuid, exercise_id)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def get_exercise_backfills(self, riot_puuid: str) -> List[Dict[str, Any]]:
+        """Backfills d'un joueur"""
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM exercise_backfills WHERE riot_puuid = ?",
+                (riot_puuid,)
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_unfinished_exercise_backfills(self) -> List[Dict[str, Any]]:
+        """Backfills en attente ou interrompus (a reprendre au demarrage)"""
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM exercise_backfills WHERE status IN ('pending', 'running')"
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
 
     async def get_exercise_stats(self, riot_puuid: str, exercise_id: str) -> Dict[str, int]:
         """Recupere les stats d'un exercice (total et succes)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT COUNT(*) as total, SUM(CASE WHEN success THEN 1 ELSE 0 END) as success
                 FROM exercise_attempts
@@ -906,7 +1310,7 @@ class DatabaseManager:
 
     async def get_all_exercise_stats(self, riot_puuid: str) -> Dict[str, Dict[str, int]]:
         """Recupere les stats de tous les exercices d'un joueur"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connection() as db:
             cursor = await db.execute(
                 """SELECT exercise_id,
                        COUNT(*) as total,
@@ -918,3 +1322,161 @@ class DatabaseManager:
             )
             rows = await cursor.fetchall()
             return {row[0]: {'total': row[1] or 0, 'success': row[2] or 0} for row in rows}
+
+    # ==================== Matches ====================
+
+    async def store_match(self, match_data: Dict[str, Any]):
+        """
+        Normalise un match (match-v5) dans matches / match_participants.
+
+        Ecriture differee et idempotente (INSERT OR IGNORE): un match est
+        immuable, seul le premier fetch est enregistre.
+        """
+        match_id = match_data.get('metadata', {}).get('matchId')
+        if not match_id or match_id in self._stored_matches:
+            return
+
+        info = match_data.get('info', {})
+        game_creation = info.get('gameCreation', 0)
+
+        participant_rows = []
+        for p in info.get('participants', []):
+            values = []
+            for path in PARTICIPANT_FIELDS.values():
+                value = p
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                if isinstance(value, bool):
+                    value = int(value)
+                values.append(value)
+            participant_rows.append((
+                (match_id, p.get('puuid')),
+                (match_id, p.get('puuid'), game_creation, *values)
+            ))
+
+        await self._enqueue(SQL_STORE_MATCH, [(
+            (match_id,),
+            (match_id, game_creation, info.get('gameDuration', 0), info.get('queueId'), info.get('gameVersion'))
+        )])
+        await self._enqueue(SQL_STORE_PARTICIPANT, participant_rows)
+        self._stored_matches.add(match_id)
+
+    @staticmethod
+    def _participant_row(row: aiosqlite.Row) -> Dict[str, Any]:
+        """Ligne -> dict, sans les colonnes NULL (champ absent du JSON Riot)"""
+        return {key: row[key] for key in row.keys() if row[key] is not None}
+
+    async def get_match_participants(self, puuid: str, match_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Lignes d'un joueur pour une liste de matchs, {match_id: participant}.
+
+        Les lignes ont les memes cles que le participant Riot, plus
+        gameCreation, gameDuration et queueId. Les matchs absents de la table
+        sont absents du resultat.
+        """
+        await self.flush()
+        result = {}
+        async with self.connection() as db:
+            # Limite de variables SQLite: requetes par paquets
+            for i in range(0, len(match_ids), 500):
+                chunk = match_ids[i:i + 500]
+                cursor = await db.execute(
+                    f"""{SQL_SELECT_PARTICIPANTS}
+                    WHERE p.puuid = ? AND p.match_id IN ({', '.join('?' for _ in chunk)})""",
+                    (puuid, *chunk)
+                )
+                for row in await cursor.fetchall():
+                    result[row['match_id']] = self._participant_row(row)
+        return result
+
+    async def get_player_matches(
+        self,
+        puuid: str,
+        since: Optional[int] = None,
+        queue_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        until: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Matchs stockes d'un joueur, du plus recent au plus ancien.
+
+        since / until: game_creation minimum / maximum inclus (ms epoch)
+        """
+        await self.flush()
+        query = f"{SQL_SELECT_PARTICIPANTS} WHERE p.puuid = ?"
+        params: List[Any] = [puuid]
+        if since is not None:
+            query += " AND p.game_creation >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND p.game_creation <= ?"
+            params.append(until)
+        if queue_id is not None:
+            query += " AND m.queue_id = ?"
+            params.append(queue_id)
+        query += " ORDER BY p.game_creation DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        async with self.connection() as db:
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [self._participant_row(row) for row in rows]
+
+    async def get_delivered_matches(self, riot_puuid: str, after: int) -> List[Dict[str, Any]]:
+        """
+        Matchs classes ingeres par le feed avec game_creation > after (ms epoch),
+        du plus ancien au plus recent. Bornes au curseur du feed: un match plus
+        ancien pas encore fetche (echec) n'est jamais saute par un consommateur.
+        """
+        feed_cursor = await self.get_match_cursor(riot_puuid, 'feed')
+        if not feed_cursor:
+            return []
+        rows = await self.get_player_matches(
+            riot_puuid, since=after + 1, queue_id=420, until=feed_cursor['last_match_time']
+        )
+        rows.reverse()
+        return rows
+
+    async def get_match_cursor(self, riot_puuid: str, consumer: str) -> Optional[Dict[str, Any]]:
+        """Dernier match traite par un consommateur (last_match_id, last_match_time)"""
+        await self.flush()
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT * FROM match_cursors WHERE riot_puuid = ? AND consumer = ?",
+                (riot_puuid, consumer)
+            )
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def set_match_cursor(self, riot_puuid: str, consumer: str, last_match_id: str, last_match_time: int):
+        """
+        Avance le curseur d'un consommateur (ecriture differee, dans la meme
+        transaction que les stats mises en attente avant lui).
+        """
+        await self._enqueue(SQL_SET_MATCH_CURSOR, [(
+            (riot_puuid, consumer),
+            (riot_puuid, consumer, last_match_id, last_match_time)
+        )])
+
+    # ==================== Timeline Features ====================
+
+    async def get_timeline_features(self, match_id: str) -> Optional[bytes]:
+        """Features de timeline stockees pour un match (blob TimelineIndex.pack)"""
+        async with self.connection() as db:
+            cursor = await db.execute(
+                "SELECT features FROM timeline_features WHERE match_id = ?",
+                (match_id,)
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def save_timeline_features(self, match_id: str, features: bytes):
+        """Stocke les features de timeline d'un match (remplace une version precedente)"""
+        async with self.connection() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO timeline_features (match_id, features) VALUES (?, ?)",
+                (match_id, features)
+            )
+            await db.commit()
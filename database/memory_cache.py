@@ -0,0 +1,89 @@
+"""
+Cache memoire LRU/TTL devant la table api_cache
+"""
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+class MemoryCache:
+    """
+    Cache en memoire des reponses API deja parsees, par namespace.
+
+    Le namespace est le prefixe de la cle de cache ('match', 'timeline',
+    'league', ...). Chaque namespace a sa propre taille max (LRU) pour qu'une
+    rafale de timelines n'evince pas les matchs. Les entrees expirent au
+    meme moment que la ligne SQLite correspondante.
+    """
+
+    def __init__(self, sizes: Dict[str, int]):
+        self.sizes = sizes
+        self.default_size = sizes.get('default', 0)
+        # namespace -> OrderedDict(cache_key -> (expires_at monotonic ou None, data))
+        self._entries: Dict[str, OrderedDict] = {}
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def namespace(cache_key: str) -> str:
+        """Namespace d'une cle ('match:EUW1_123' -> 'match')"""
+        return cache_key.split(':', 1)[0]
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """Retourne l'objet cache ou None (absent ou expire)"""
+        entries = self._entries.get(self.namespace(cache_key))
+        entry: Optional[Tuple[Optional[float], Any]] = entries.get(cache_key) if entries else None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, data = entry
+        if expires_at is not None and time.monotonic() > expires_at:
+            del entries[cache_key]
+            self.misses += 1
+            return None
+
+        entries.move_to_end(cache_key)
+        self.hits += 1
+        return data
+
+    def set(self, cache_key: str, data: Any, ttl: Optional[float] = None):
+        """Stocke un objet; ttl en secondes (None = permanent)"""
+        namespace = self.namespace(cache_key)
+        max_size = self.sizes.get(namespace, self.default_size)
+        if max_size <= 0:
+            return
+
+        entries = self._entries.setdefault(namespace, OrderedDict())
+        expires_at = time.monotonic() + ttl if ttl else None
+        entries[cache_key] = (expires_at, data)
+        entries.move_to_end(cache_key)
+
+        while len(entries) > max_size:
+            entries.popitem(last=False)
+
+    def invalidate(self, pattern: str):
+        """Supprime les entrees dont la cle contient pattern"""
+        for entries in self._entries.values():
+            for cache_key in [k for k in entries if pattern in k]:
+                del entries[cache_key]
+
+    def purge_expired(self):
+        """Supprime toutes les entrees expirees"""
+        now = time.monotonic()
+        for entries in self._entries.values():
+            expired = [k for k, (expires_at, _) in entries.items() if expires_at is not None and now > expires_at]
+            for cache_key in expired:
+                del entries[cache_key]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Taille par namespace et taux de hit"""
+        total = self.hits + self.misses
+        return {
+            'sizes': {ns: len(entries) for ns, entries in self._entries.items()},
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total * 100) if total else 0.0,
+        }
@@ -2,6 +2,15 @@
 Schéma de la base de données SQLite
 """
 
+# Pragmas appliques a l'ouverture de la connexion partagee
+SQLITE_PRAGMAS = [
+    "journal_mode = WAL",       # lecteurs non bloques par les ecritures
+    "synchronous = NORMAL",     # fsync au checkpoint seulement (sur en WAL)
+    "cache_size = -32000",      # 32 Mo de cache de pages
+    "mmap_size = 268435456",    # 256 Mo mappes en memoire
+    "temp_store = MEMORY",
+]
+
 SCHEMA = """
 -- Table des utilisateurs Discord avec leurs comptes Riot
 CREATE TABLE IF NOT EXISTS users (
@@ -22,7 +31,8 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE TABLE IF NOT EXISTS api_cache (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     cache_key TEXT UNIQUE NOT NULL,
-    response_data TEXT NOT NULL,
+    response_data BLOB NOT NULL,
+    codec INTEGER NOT NULL DEFAULT 0,  -- voir database/codec.py (0 = JSON texte)
     cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expires_at TIMESTAMP
 );
@@ -67,6 +77,8 @@ CREATE INDEX IF NOT EXISTS idx_cache_expires ON api_cache(expires_at);
 CREATE INDEX IF NOT EXISTS idx_rank_history_puuid ON rank_history(riot_puuid);
 CREATE INDEX IF NOT EXISTS idx_rank_history_date ON rank_history(recorded_at);
 CREATE INDEX IF NOT EXISTS idx_rank_history_queue ON rank_history(queue_type);
+-- Rang "as-of" (dernier snapshot <= t) d'un joueur sur une queue: une recherche d'index
+CREATE INDEX IF NOT EXISTS idx_rank_history_lookup ON rank_history(riot_puuid, queue_type, recorded_at);
 CREATE INDEX IF NOT EXISTS idx_clash_teams_creator ON clash_teams(created_by_discord_id);
 CREATE INDEX IF NOT EXISTS idx_clash_team_members_team ON clash_team_members(team_id);
 CREATE INDEX IF NOT EXISTS idx_clash_team_members_discord ON clash_team_members(discord_id);
@@ -164,6 +176,49 @@ CREATE TABLE IF NOT EXISTS split_stats_cache (
 CREATE INDEX IF NOT EXISTS idx_split_stats_puuid ON split_stats_cache(riot_puuid);
 CREATE INDEX IF NOT EXISTS idx_split_stats_split ON split_stats_cache(season_split);
 
+-- Stats agregees, une ligne par joueur et par semaine / split
+-- (remplacent weekly_stats_cache / split_stats_cache, lues en secours)
+CREATE TABLE IF NOT EXISTS weekly_player_stats (
+    riot_puuid TEXT NOT NULL,
+    week_start DATE NOT NULL,
+    stats BLOB NOT NULL,                    -- PlayerStats.pack() (database/player_stats.py)
+    games_counted INTEGER DEFAULT 0,
+    last_match_id TEXT,                     -- Last match counted
+    champs_won TEXT DEFAULT '',             -- championIds won on, comma-separated
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (riot_puuid, week_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weekly_player_stats_week ON weekly_player_stats(week_start);
+
+-- Resume de la semaine pour la retrospective, tenu a jour a chaque ingestion
+-- (stats de matchs) et a chaque rafraichissement des rangs (LP Solo/Duo)
+CREATE TABLE IF NOT EXISTS weekly_summaries (
+    week_start DATE NOT NULL,
+    riot_puuid TEXT NOT NULL,
+    games INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0,
+    kills INTEGER DEFAULT 0,
+    deaths INTEGER DEFAULT 0,
+    assists INTEGER DEFAULT 0,
+    lp_start INTEGER,                       -- rank_to_lp au premier rafraichissement de la semaine
+    lp_end INTEGER,                         -- rank_to_lp au dernier rafraichissement
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (week_start, riot_puuid)
+);
+
+CREATE TABLE IF NOT EXISTS split_player_stats (
+    riot_puuid TEXT NOT NULL,
+    season_split TEXT NOT NULL,
+    stats BLOB NOT NULL,
+    games_counted INTEGER DEFAULT 0,
+    last_match_id TEXT,
+    champs_won TEXT DEFAULT '',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (riot_puuid, season_split)
+);
+
 -- ==================== TRAINING EXERCISES ====================
 
 -- Player exercise subscriptions (which exercises are enabled)
@@ -192,4 +247,163 @@ CREATE TABLE IF NOT EXISTS exercise_attempts (
 
 CREATE INDEX IF NOT EXISTS idx_exercise_attempts_puuid ON exercise_attempts(riot_puuid);
 CREATE INDEX IF NOT EXISTS idx_exercise_attempts_exercise ON exercise_attempts(exercise_id);
+
+-- Backfill d'un exercice sur les matchs de la saison anterieurs a son activation
+CREATE TABLE IF NOT EXISTS exercise_backfills (
+    riot_puuid TEXT NOT NULL,
+    exercise_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, running, done, failed
+    until_time INTEGER,                     -- gameCreation max a traiter (ms), la suite passe par le check normal;
+                                            -- NULL tant que le joueur n'a aucun match stocke
+    checkpoint_time INTEGER,                -- gameCreation du dernier match traite (ms)
+    total INTEGER DEFAULT 0,
+    processed INTEGER DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (riot_puuid, exercise_id)
+);
+
+-- ==================== MATCHES ====================
+
+-- Infos generales d'un match (match-v5), remplies au premier fetch
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    game_creation INTEGER NOT NULL,         -- ms epoch
+    game_duration INTEGER NOT NULL,         -- secondes
+    queue_id INTEGER,
+    game_version TEXT
+);
+
+-- Une ligne par joueur et par match. Les colonnes de stats gardent les noms
+-- des champs Riot (participant) pour que dict(row) remplace le JSON brut.
+CREATE TABLE IF NOT EXISTS match_participants (
+    match_id TEXT NOT NULL,
+    puuid TEXT NOT NULL,
+    game_creation INTEGER NOT NULL,         -- copie de matches.game_creation (index)
+    participantId INTEGER,
+    teamId INTEGER,
+    championId INTEGER,
+    championName TEXT,
+    teamPosition TEXT,
+    win INTEGER,
+    kills INTEGER,
+    deaths INTEGER,
+    assists INTEGER,
+    goldEarned INTEGER,
+    goldSpent INTEGER,
+    totalDamageDealtToChampions INTEGER,
+    physicalDamageDealtToChampions INTEGER,
+    magicDamageDealtToChampions INTEGER,
+    trueDamageDealtToChampions INTEGER,
+    totalDamageTaken INTEGER,
+    turretKills INTEGER,
+    turretTakedowns INTEGER,
+    inhibitorKills INTEGER,
+    dragonKills INTEGER,
+    baronKills INTEGER,
+    riftHeraldTakedowns INTEGER,            -- challenges.riftHeraldTakedowns
+    visionScore INTEGER,
+    wardsPlaced INTEGER,
+    wardsKilled INTEGER,
+    detectorWardsPlaced INTEGER,
+    totalMinionsKilled INTEGER,
+    neutralMinionsKilled INTEGER,
+    doubleKills INTEGER,
+    tripleKills INTEGER,
+    quadraKills INTEGER,
+    pentaKills INTEGER,
+    firstBloodKill INTEGER,
+    firstBloodAssist INTEGER,
+    firstTowerKill INTEGER,
+    timeCCingOthers INTEGER,
+    longestTimeSpentLiving INTEGER,
+    totalTimeSpentDead INTEGER,
+    item0 INTEGER,
+    item1 INTEGER,
+    item2 INTEGER,
+    item3 INTEGER,
+    item4 INTEGER,
+    item5 INTEGER,
+    item6 INTEGER,
+    PRIMARY KEY (match_id, puuid)
+);
+
+CREATE INDEX IF NOT EXISTS idx_match_participants_puuid ON match_participants(puuid, game_creation);
+
+-- Dernier match traite par consommateur (challenges, exercices...) pour ne
+-- demander a match-v5 que les matchs poses apres (startTime)
+CREATE TABLE IF NOT EXISTS match_cursors (
+    riot_puuid TEXT NOT NULL,
+    consumer TEXT NOT NULL,                 -- 'challenges', 'exercise:<id>', ...
+    last_match_id TEXT NOT NULL,
+    last_match_time INTEGER NOT NULL,       -- gameCreation du match (ms epoch)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (riot_puuid, consumer)
+);
+
+-- Features compactes des timelines (TimelineIndex.pack), gardees sans TTL:
+-- la timeline brute n'est pas conservee
+CREATE TABLE IF NOT EXISTS timeline_features (
+    match_id TEXT PRIMARY KEY,
+    features BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 """
+
+
+# Colonnes de match_participants extraites du participant Riot:
+# nom de colonne -> chemin dans le JSON (les champs imbriques sont aplatis)
+PARTICIPANT_FIELDS = {
+    'participantId': ('participantId',),
+    'teamId': ('teamId',),
+    'championId': ('championId',),
+    'championName': ('championName',),
+    'teamPosition': ('teamPosition',),
+    'win': ('win',),
+    'kills': ('kills',),
+    'deaths': ('deaths',),
+    'assists': ('assists',),
+    'goldEarned': ('goldEarned',),
+    'goldSpent': ('goldSpent',),
+    'totalDamageDealtToChampions': ('totalDamageDealtToChampions',),
+    'physicalDamageDealtToChampions': ('physicalDamageDealtToChampions',),
+    'magicDamageDealtToChampions': ('magicDamageDealtToChampions',),
+    'trueDamageDealtToChampions': ('trueDamageDealtToChampions',),
+    'totalDamageTaken': ('totalDamageTaken',),
+    'turretKills': ('turretKills',),
+    'turretTakedowns': ('turretTakedowns',),
+    'inhibitorKills': ('inhibitorKills',),
+    'dragonKills': ('dragonKills',),
+    'baronKills': ('baronKills',),
+    'riftHeraldTakedowns': ('challenges', 'riftHeraldTakedowns'),
+    'visionScore': ('visionScore',),
+    'wardsPlaced': ('wardsPlaced',),
+    'wardsKilled': ('wardsKilled',),
+    'detectorWardsPlaced': ('detectorWardsPlaced',),
+    'totalMinionsKilled': ('totalMinionsKilled',),
+    'neutralMinionsKilled': ('neutralMinionsKilled',),
+    'doubleKills': ('doubleKills',),
+    'tripleKills': ('tripleKills',),
+    'quadraKills': ('quadraKills',),
+    'pentaKills': ('pentaKills',),
+    'firstBloodKill': ('firstBloodKill',),
+    'firstBloodAssist': ('firstBloodAssist',),
+    'firstTowerKill': ('firstTowerKill',),
+    'timeCCingOthers': ('timeCCingOthers',),
+    'longestTimeSpentLiving': ('longestTimeSpentLiving',),
+    'totalTimeSpentDead': ('totalTimeSpentDead',),
+    'item0': ('item0',),
+    'item1': ('item1',),
+    'item2': ('item2',),
+    'item3': ('item3',),
+    'item4': ('item4',),
+    'item5': ('item5',),
+    'item6': ('item6',),
+}
+
+
+# Colonnes ajoutees apres coup: (table, colonne, definition). Appliquees par
+# DatabaseManager.initialize() sur les bases existantes ou elles manquent.
+MIGRATIONS = [
+    ("api_cache", "codec", "INTEGER NOT NULL DEFAULT 0"),
+]
@@ -0,0 +1,127 @@
+"""
+Stats agregees d'un joueur (semaine ou split) en une seule ligne
+"""
+import struct
+from typing import Optional, Dict, Any, Iterable
+
+# Ordre de stockage dans la colonne stats (float64 little-endian).
+# Ajouter les nouvelles stats A LA FIN uniquement: les lignes plus anciennes
+# (plus courtes) sont completees avec les valeurs par defaut a la lecture.
+STAT_FIELDS = (
+    # Cumulative stats (sum across all games)
+    'gold_earned', 'gold_spent', 'kills', 'deaths', 'assists',
+    'wins', 'losses', 'games_played',
+    # Damage
+    'damage_dealt', 'damage_dealt_physical', 'damage_dealt_magic',
+    'damage_dealt_true', 'damage_taken',
+    # Objectives
+    'turret_kills', 'turret_takedowns', 'inhibitor_kills',
+    'dragon_kills', 'baron_kills', 'rift_herald_kills',
+    # Vision
+    'vision_score_total', 'wards_placed', 'wards_killed', 'control_wards_placed',
+    # Farm
+    'cs_total', 'jungle_cs',
+    # Multi-kills
+    'double_kills', 'triple_kills', 'quadra_kills', 'penta_kills',
+    # First objectives
+    'first_blood_kills', 'first_blood_assists', 'first_tower_kills',
+    # CC / time
+    'cc_time', 'time_played', 'longest_life', 'time_dead',
+    # Per-game records (max/min)
+    'max_kills_game', 'max_deaths_game', 'max_cs_game', 'max_damage_game',
+    'max_gold_game', 'max_vision_game', 'min_vision_game', 'min_damage_game',
+    'max_cs_per_min', 'max_damage_taken_game',
+    # Special achievements (count of games where condition met)
+    'games_with_penta', 'games_with_quadra', 'games_with_triple', 'games_with_double',
+    'games_11cs_min', 'games_zero_deaths', 'games_20_kills',
+    'win_no_defensive', 'games_baron_and_dragon',
+    # Unique tracking
+    'unique_champ_wins',
+)
+
+STAT_FIELD_SET = frozenset(STAT_FIELDS)
+
+# Valeurs initiales differentes de 0 (records "min")
+STAT_DEFAULTS = {
+    'min_vision_game': 999,
+    'min_damage_game': 999999,
+}
+
+_STRUCT_CACHE: Dict[int, struct.Struct] = {}
+
+
+def _struct_for(count: int) -> struct.Struct:
+    packer = _STRUCT_CACHE.get(count)
+    if packer is None:
+        packer = _STRUCT_CACHE[count] = struct.Struct(f'<{count}d')
+    return packer
+
+
+class PlayerStats:
+    """
+    Stats d'un joueur sur une periode (semaine ou split).
+
+    Un attribut par stat de STAT_FIELDS, plus games_counted, last_match_id
+    (dernier match compte) et champs_won (championIds gagnes).
+    """
+
+    __slots__ = STAT_FIELDS + ('games_counted', 'last_match_id', 'champs_won')
+
+    def __init__(self):
+        for name in STAT_FIELDS:
+            setattr(self, name, STAT_DEFAULTS.get(name, 0))
+        self.games_counted = 0
+        self.last_match_id: Optional[str] = None
+        self.champs_won: set = set()
+
+    def get(self, stat: str, default: float = 0) -> float:
+        """Valeur d'une stat stockee, default si la stat n'existe pas"""
+        return getattr(self, stat) if stat in STAT_FIELD_SET else default
+
+    # ==================== Serialisation ====================
+
+    def pack(self) -> bytes:
+        """Stats -> blob (float64 dans l'ordre de STAT_FIELDS)"""
+        return _struct_for(len(STAT_FIELDS)).pack(*(float(getattr(self, name)) for name in STAT_FIELDS))
+
+    def champs_won_str(self) -> str:
+        """championIds gagnes, separes par des virgules"""
+        return ','.join(sorted(self.champs_won))
+
+    @classmethod
+    def from_row(cls, row: Any) -> 'PlayerStats':
+        """Ligne weekly_player_stats / split_player_stats -> PlayerStats"""
+        player_stats = cls()
+        blob = row['stats']
+        values = _struct_for(len(blob) // 8).unpack(blob)
+        for name, value in zip(STAT_FIELDS, values):
+            setattr(player_stats, name, value)
+        player_stats.games_counted = row['games_counted'] or 0
+        player_stats.last_match_id = row['last_match_id']
+        player_stats.champs_won = _parse_champs(row['champs_won'])
+        return player_stats
+
+    @classmethod
+    def from_stat_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'PlayerStats':
+        """Ancien format (une ligne par stat_type) -> PlayerStats"""
+        player_stats = cls()
+        for row in rows:
+            stat_type = row['stat_type']
+            if stat_type == 'champs_won_list':
+                # Liste stockee dans last_match_id
+                player_stats.champs_won = _parse_champs(row.get('last_match_id'))
+                continue
+            if stat_type in STAT_FIELD_SET:
+                setattr(player_stats, stat_type, row['stat_value'])
+            if stat_type == 'games_played':
+                player_stats.games_counted = row.get('games_counted') or 0
+                player_stats.last_match_id = row.get('last_match_id')
+        return player_stats
+
+
+def _parse_champs(value: Optional[str]) -> set:
+    if not value or not isinstance(value, str):
+        return set()
+    champs = set(value.split(','))
+    champs.discard('')
+    return champs
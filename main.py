@@ -18,6 +18,8 @@ from modules.leaderboard import LeaderboardModule
 from modules.tilt_detector import TiltDetector
 from modules.weekly_challenges import WeeklyChallenges
 from modules.training_exercises import TrainingExercises
+from modules.exercise_backfill import ExerciseBackfill
+from modules.match_feed import MatchFeed
 import config
 
 
@@ -56,6 +58,8 @@ class LoLBot(commands.Bot):
         self.tilt_detector = TiltDetector(self.riot_api, self.db_manager, self)
         self.challenges_module = WeeklyChallenges(self.riot_api, self.db_manager, self)
         self.exercises_module = TrainingExercises(self.riot_api, self.db_manager, self)
+        self.exercise_backfill = ExerciseBackfill(self.exercises_module, self.db_manager)
+        self.match_feed = MatchFeed(self.riot_api, self.db_manager)
 
     async def setup_hook(self):
         """Configuration initiale du bot"""
@@ -83,9 +87,13 @@ class LoLBot(commands.Bot):
         # Demarrer les taches planifiees
         self.daily_leaderboard.start()
         self.hourly_rank_update.start()
+        self.rank_history_compaction.start()
         self.tilt_and_challenges_check.start()
         self.monday_challenge_leaderboard.start()
 
+        # Reprendre les backfills d'exercices interrompus
+        await self.exercise_backfill.resume_all()
+
         print("[Setup] Bot pret!")
 
     async def on_ready(self):
@@ -162,7 +170,7 @@ class LoLBot(commands.Bot):
         """Met a jour les rangs toutes les heures et nettoie le cache expire"""
         try:
             count = await self.leaderboard_module.update_all_ranks()
-            print(f"[RankUpdate] {count} rangs mis a jour")
+            print(f"[RankUpdate] {count} rang(s) modifie(s)")
             await self.db_manager.clear_expired_cache()
         except Exception as e:
             print(f"[RankUpdate] Erreur: {e}")
@@ -172,6 +180,15 @@ class LoLBot(commands.Bot):
         """Attend que le bot soit pret"""
         await self.wait_until_ready()
 
+    @tasks.loop(time=time(hour=config.RANK_HISTORY_COMPACTION_HOUR, minute=0, tzinfo=PARIS_TZ))
+    async def rank_history_compaction(self):
+        """Compacte l'historique des rangs une fois par jour"""
+        try:
+            deleted = await self.db_manager.compact_rank_history()
+            print(f"[RankHistory] {deleted} snapshots supprimes")
+        except Exception as e:
+            print(f"[RankHistory] Erreur compaction: {e}")
+
     @tasks.loop(minutes=config.TILT_CHECK_INTERVAL_MINUTES)
     async def tilt_and_challenges_check(self):
         """Verifie les tilts et challenges toutes les 30 minutes"""
@@ -179,6 +196,15 @@ class LoLBot(commands.Bot):
         if not config.TILT_CHANNEL_ID and not config.CHALLENGE_ANNOUNCEMENTS_CHANNEL_ID:
             return
 
+        # Discover and fetch new matches once for every player; consumers
+        # read them back from match_participants past their own cursor
+        try:
+            await self.match_feed.poll()
+        except Exception as e:
+            print(f"[MatchFeed] Erreur: {e}")
+            traceback.print_exc()
+            return
+
         for guild in self.guilds:
             try:
                 # Tilt detection (online users only)
@@ -190,28 +216,33 @@ class LoLBot(commands.Bot):
                             embed = self.tilt_detector.create_tilt_embed(notif)
                             await tilt_channel.send(embed=embed)
                             print(f"[Tilt] Notification envoyee pour {notif['game_name']}")
-
-                # Training exercises check (silent, no announcements)
-                try:
-                    await self.exercises_module.check_all_players()
-                except Exception as e:
-                    print(f"[Exercises] Erreur check: {e}")
-                    traceback.print_exc()
-
-                # Challenge progress check (all registered users)
-                completions = await self.challenges_module.check_all_players()
-                if config.CHALLENGE_ANNOUNCEMENTS_CHANNEL_ID:
-                    announce_channel = self.get_channel(config.CHALLENGE_ANNOUNCEMENTS_CHANNEL_ID)
-                    if announce_channel:
-                        for completion in completions:
-                            embed = self.challenges_module.create_completion_embed(completion)
-                            await announce_channel.send(embed=embed)
-                            print(f"[Challenges] Completion envoyee: {completion['game_name']} - {completion['challenge_name']}")
-
             except Exception as e:
                 print(f"[TiltChallenges] Erreur pour guild {guild.name}: {e}")
                 traceback.print_exc()
 
+        # Training exercises check (silent, no announcements)
+        try:
+            await self.exercises_module.check_all_players()
+            # Backfills waiting for the player's first stored matches
+            await self.exercise_backfill.resume_all()
+        except Exception as e:
+            print(f"[Exercises] Erreur check: {e}")
+            traceback.print_exc()
+
+        # Challenge progress check (all registered users)
+        try:
+            completions = await self.challenges_module.check_all_players()
+            if config.CHALLENGE_ANNOUNCEMENTS_CHANNEL_ID:
+                announce_channel = self.get_channel(config.CHALLENGE_ANNOUNCEMENTS_CHANNEL_ID)
+                if announce_channel:
+                    for completion in completions:
+                        embed = self.challenges_module.create_completion_embed(completion)
+                        await announce_channel.send(embed=embed)
+                        print(f"[Challenges] Completion envoyee: {completion['game_name']} - {completion['challenge_name']}")
+        except Exception as e:
+            print(f"[Challenges] Erreur check: {e}")
+            traceback.print_exc()
+
     @tilt_and_challenges_check.before_loop
     async def before_tilt_check(self):
         """Attend que le bot soit pret"""
@@ -290,9 +321,12 @@ class LoLBot(commands.Bot):
         print("[Bot] Arret du bot...")
         self.daily_leaderboard.cancel()
         self.hourly_rank_update.cancel()
+        self.rank_history_compaction.cancel()
         self.tilt_and_challenges_check.cancel()
         self.monday_challenge_leaderboard.cancel()
+        await self.exercise_backfill.stop()
         await self.riot_client.close()
+        await self.db_manager.close()
         await super().close()
 
 
@@ -0,0 +1,209 @@
+"""
+Compilation des definitions de challenges en predicats
+"""
+import operator
+from typing import Callable, Dict, Any, Tuple, Optional, Iterable, List
+
+import config
+from database.player_stats import PlayerStats, STAT_FIELD_SET
+
+# Operator mapping for condition evaluation
+OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+# Stats calculees a partir des stats stockees
+COMPUTED_STATS: Dict[str, Callable[[PlayerStats], float]] = {
+    'avg_kda': lambda s: (s.kills + s.assists) / max(s.deaths, 1),
+    'weekly_winrate': lambda s: (s.wins / (s.wins + s.losses)) * 100 if s.wins + s.losses > 0 else 0,
+    'cs_per_min_avg': lambda s: s.cs_total / (s.time_played / 60 if s.time_played > 0 else 1),
+    'avg_vision': lambda s: s.vision_score_total / max(s.games_played, 1),
+    'avg_damage': lambda s: s.damage_dealt / max(s.games_played, 1),
+    'avg_gold': lambda s: s.gold_earned / max(s.games_played, 1),
+}
+
+# Ancien format: alias de stat_type vers la stat stockee
+LEGACY_STAT_ALIASES = {
+    'gold': 'gold_earned',
+    'towers': 'turret_takedowns',
+}
+
+# Ancien format: stat_types jamais valides ici (suivis ailleurs ou pas encore implementes)
+LEGACY_NEVER_COMPLETE = {'win_streak', 'lp_gain', 'wins_on_main'}
+
+Result = Tuple[bool, float]
+NOT_COMPLETED: Result = (False, 1.0)
+
+
+class StatSnapshot:
+    """
+    Stats d'un joueur a un instant donne, avec les stats calculees.
+
+    Les stats calculees (avg_kda, cs_per_min_avg, ...) sont evaluees une
+    seule fois ici puis partagees par tous les challenges du joueur.
+    """
+
+    __slots__ = ('stats', 'computed')
+
+    def __init__(self, stats: PlayerStats):
+        self.stats = stats
+        self.computed = {name: func(stats) for name, func in COMPUTED_STATS.items()}
+
+
+class CompiledChallenge:
+    """Definition de challenge compilee: check(snapshot) -> (completed, multiplier)"""
+
+    __slots__ = ('challenge_id', 'challenge_type', 'definition', 'scope', 'base_points', 'check')
+
+    def __init__(self, challenge_id: str, challenge_type: str, definition: Dict[str, Any]):
+        self.challenge_id = challenge_id
+        self.challenge_type = challenge_type
+        self.definition = definition
+        self.scope = definition.get('scope', 'weekly')
+        self.base_points = config.CHALLENGE_POINTS.get(definition.get('difficulty', 'medium'), 20)
+        self.check = compile_definition(challenge_id, definition)
+
+
+# ==================== Compilation ====================
+
+def _value_getter(challenge_id: str, stat: str) -> Callable[[StatSnapshot], float]:
+    """Accesseur de la valeur d'une stat dans un snapshot"""
+    if stat in STAT_FIELD_SET:
+        return operator.attrgetter(f'stats.{stat}')
+    if stat in COMPUTED_STATS:
+        return lambda snapshot: snapshot.computed[stat]
+    print(f"[Challenges] Stat inconnue '{stat}' dans {challenge_id}")
+    return lambda snapshot: 0
+
+
+def _compile_condition(challenge_id: str, condition: Dict) -> Callable[[StatSnapshot], Result]:
+    """Condition {'stat', 'op', 'value', 'multiplier'} -> predicat"""
+    get_value = _value_getter(challenge_id, condition.get('stat', ''))
+    op_str = condition.get('op', '>=')
+    target = condition.get('value', 0)
+    completed: Result = (True, condition.get('multiplier', 1.0))
+
+    op_func = OPS.get(op_str)
+    if not op_func:
+        print(f"[Challenges] Operateur inconnu '{op_str}' dans {challenge_id}")
+        return lambda snapshot: NOT_COMPLETED
+
+    return lambda snapshot: completed if op_func(get_value(snapshot), target) else NOT_COMPLETED
+
+
+def _compile_multi(challenge_id: str, definition: Dict) -> Callable[[StatSnapshot], Result]:
+    """{'conditions': [...], 'logic': 'and'/'or'} -> predicat"""
+    checks = [_compile_condition(challenge_id, cond) for cond in definition.get('conditions', [])]
+    logic = definition.get('logic', 'and').lower()
+    if logic not in ('and', 'or'):
+        print(f"[Challenges] Logique inconnue '{logic}' dans {challenge_id}")
+        return lambda snapshot: NOT_COMPLETED
+    combine = all if logic == 'and' else any
+
+    def check(snapshot: StatSnapshot) -> Result:
+        results = [condition(snapshot) for condition in checks]
+        multipliers = [mult for passed, mult in results if passed]
+        return combine(passed for passed, _ in results), max(multipliers, default=1.0)
+
+    return check
+
+
+def _compile_legacy(challenge_id: str, definition: Dict) -> Callable[[StatSnapshot], Result]:
+    """{'stat_type': ..., 'target': ...} -> predicat"""
+    stat_type = definition.get('stat_type')
+    target = definition.get('target', 0)
+
+    if stat_type == 'assaf':
+        zero_damage = (True, definition.get('zero_damage_multiplier', 3.0))
+
+        def check_assaf(snapshot: StatSnapshot) -> Result:
+            if snapshot.stats.min_damage_game == 0:
+                return zero_damage
+            return (True, 1.0) if snapshot.stats.min_vision_game < 10 else NOT_COMPLETED
+
+        return check_assaf
+
+    if stat_type == 'weekly_winrate':
+        min_games = definition.get('min_games', 0)
+
+        def check_winrate(snapshot: StatSnapshot) -> Result:
+            if snapshot.stats.wins + snapshot.stats.losses < min_games:
+                return NOT_COMPLETED
+            return (snapshot.computed['weekly_winrate'] >= target, 1.0)
+
+        return check_winrate
+
+    if stat_type in LEGACY_NEVER_COMPLETE:
+        return lambda snapshot: NOT_COMPLETED
+
+    stat = LEGACY_STAT_ALIASES.get(stat_type, stat_type)
+    if stat not in STAT_FIELD_SET and stat not in COMPUTED_STATS:
+        print(f"[Challenges] stat_type inconnu '{stat_type}' dans {challenge_id}")
+        return lambda snapshot: NOT_COMPLETED
+
+    get_value = _value_getter(challenge_id, stat)
+    return lambda snapshot: (get_value(snapshot) >= target, 1.0)
+
+
+def compile_definition(challenge_id: str, definition: Dict) -> Callable[[StatSnapshot], Result]:
+    """
+    Compile une definition de challenge en predicat snapshot -> (completed, multiplier).
+
+    Supports:
+    - Single condition: {'stat': 'kills', 'op': '>=', 'value': 100}
+    - Multiple conditions (AND/OR): {'conditions': [...], 'logic': 'and'}
+    - Legacy format: {'stat_type': 'gold', 'target': 500000}
+    - Computed stats: 'avg_kda', 'weekly_winrate', 'cs_per_min_avg', ...
+    """
+    if 'conditions' in definition:
+        check = _compile_multi(challenge_id, definition)
+    elif 'stat' in definition:
+        check = _compile_condition(challenge_id, definition)
+    else:
+        check = _compile_legacy(challenge_id, definition)
+
+    min_games = definition.get('min_games', 0)
+    if min_games <= 0:
+        return check
+
+    def check_min_games(snapshot: StatSnapshot) -> Result:
+        if snapshot.stats.games_played < min_games:
+            return NOT_COMPLETED
+        return check(snapshot)
+
+    return check_min_games
+
+
+def compile_challenges(
+    global_challenges: Optional[Dict[str, Dict]] = None,
+    personal_challenges: Optional[Dict[str, Dict]] = None
+) -> Dict[Tuple[str, str], CompiledChallenge]:
+    """Compile toutes les definitions: (challenge_type, challenge_id) -> CompiledChallenge"""
+    sources = (
+        ('global', config.GLOBAL_CHALLENGES if global_challenges is None else global_challenges),
+        ('personal', config.PERSONAL_CHALLENGES if personal_challenges is None else personal_challenges),
+    )
+    return {
+        (challenge_type, challenge_id): CompiledChallenge(challenge_id, challenge_type, definition)
+        for challenge_type, definitions in sources
+        for challenge_id, definition in definitions.items()
+    }
+
+
+def evaluate_challenges(
+    challenges: Iterable[CompiledChallenge],
+    weekly: StatSnapshot,
+    split: StatSnapshot
+) -> List[Tuple[CompiledChallenge, float]]:
+    """Evalue une liste de challenges sur les snapshots d'un joueur; retourne les completes"""
+    completed = []
+    for challenge in challenges:
+        passed, multiplier = challenge.check(split if challenge.scope == 'split' else weekly)
+        if passed:
+            completed.append((challenge, multiplier))
+    return completed
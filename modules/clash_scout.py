@@ -3,10 +3,11 @@ Module pour le scouting d'equipes adverses en Clash
 """
 import asyncio
 import math
+import time
 import traceback
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any, Tuple
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 import config
 from utils.scraper import scrape_champion_season_stats
@@ -107,6 +108,43 @@ class ScoutResult:
     threat_comparison: float = 0.0  # vs our team
 
 
+# Champs caches d'un joueur scout -> cle de config.SCOUT_CACHE_TTL
+CACHED_FIELDS = {
+    'account': 'ACCOUNT',
+    'ranks': 'RANK',
+    'masteries': 'MASTERY',
+    'match_history': 'MATCH_HISTORY',
+    'season_stats': 'SEASON_STATS',
+}
+
+
+@dataclass
+class MatchHistorySummary:
+    """Analyse des games recentes d'un joueur"""
+    recent_winrate: float = 0.0
+    recent_kda: float = 0.0
+    main_role: str = "UNKNOWN"
+    role_distribution: Dict[str, float] = field(default_factory=dict)
+    champion_stats: Dict[int, Dict] = field(default_factory=dict)  # champion_id -> {games, wins, kills, deaths, assists}
+
+
+@dataclass
+class CachedPlayer:
+    """Donnees brutes d'un joueur scout, chaque champ avec son heure de fetch"""
+    values: Dict[str, Any] = field(default_factory=dict)
+    fetched_at: Dict[str, float] = field(default_factory=dict)
+
+    def is_fresh(self, name: str) -> bool:
+        fetched_at = self.fetched_at.get(name)
+        if fetched_at is None:
+            return False
+        return time.monotonic() - fetched_at < config.SCOUT_CACHE_TTL[CACHED_FIELDS[name]]
+
+    def set(self, name: str, value: Any):
+        self.values[name] = value
+        self.fetched_at[name] = time.monotonic()
+
+
 class ClashScoutModule:
     """Module de scouting pour les Clash"""
 
@@ -116,6 +154,8 @@ class ClashScoutModule:
         self.db = db_manager
         # Limite le scraping à 1 requête à la fois pour éviter le 403
         self.scrape_semaphore = asyncio.Semaphore(1)
+        # puuid -> CachedPlayer (LRU, SCOUT_CACHE_SIZE joueurs)
+        self.player_cache: OrderedDict[str, CachedPlayer] = OrderedDict()
 
     async def scout_enemy_team(self, riot_id: str, tag: str) -> ScoutResult:
         """
@@ -221,7 +261,9 @@ class ClashScoutModule:
             # Utiliser l'endpoint LEAGUE pour avoir le summoner_id -> on peut pas
             # On va devoir faire une requete speciale
             url = f"{self.api.platform_base}/lol/summoner/v4/summoners/{summoner_id}"
-            summoner = await self.api.client.request(url, use_rate_limit=True)
+            summoner = await self.api.client.request(
+                url, use_rate_limit=True, method='summoner-v4.getBySummonerId'
+            )
 
             if not summoner:
                 return None
@@ -236,44 +278,104 @@ class ClashScoutModule:
             print(f"[ClashScout] Erreur fetch by summoner_id {summoner_id}: {e}")
             return None
 
+    def _cached_player(self, puuid: str) -> CachedPlayer:
+        """Entree du cache d'un joueur (creee si absente)"""
+        cached = self.player_cache.get(puuid)
+        if cached is None:
+            cached = self.player_cache[puuid] = CachedPlayer()
+            while len(self.player_cache) > config.SCOUT_CACHE_SIZE:
+                self.player_cache.popitem(last=False)
+        else:
+            self.player_cache.move_to_end(puuid)
+        return cached
+
+    async def _refresh_player(self, puuid: str, cached: CachedPlayer):
+        """
+        Re-fetch les champs perimes d'un joueur. Un fetch en echec garde
+        l'ancienne valeur (retente au prochain scout).
+        """
+        # Account, rank, mastery, match history (IDs) en parallele
+        fetchers = {
+            'account': (dict, lambda: self.api.get_account_by_puuid(puuid)),
+            'ranks': (list, lambda: self.api.get_league_entries_by_puuid(puuid)),
+            'masteries': (list, lambda: self.api.get_champion_masteries(puuid, count=10)),
+            'match_history': (list, lambda: self.api.get_match_history(
+                puuid, count=config.DANGER_SCORE['RECENT_GAMES_COUNT']
+            )),
+        }
+        stale = [name for name in fetchers if not cached.is_fresh(name)]
+        results = await asyncio.gather(*(fetchers[name][1]() for name in stale), return_exceptions=True)
+        fetched = dict(zip(stale, results))
+        for name in ('account', 'ranks', 'masteries'):
+            if name in fetched and isinstance(fetched[name], fetchers[name][0]):
+                cached.set(name, fetched[name])
+
+        account = cached.values.get('account') or {}
+        game_name = account.get('gameName', 'Unknown')
+        tag_line = account.get('tagLine', '???')
+
+        async def refresh_match_history():
+            match_ids = fetched.get('match_history')
+            if isinstance(match_ids, list):
+                match_ids = match_ids[:config.DANGER_SCORE['RECENT_GAMES_COUNT']]
+                cached.set('match_history', await self._analyze_match_history(puuid, match_ids))
+
+        async def refresh_season_stats():
+            if cached.is_fresh('season_stats'):
+                return
+            region = config.DEFAULT_REGION.lower().rstrip('0123456789')
+            async with self.scrape_semaphore:
+                await asyncio.sleep(2)  # Rate limit: 1 scrape toutes les 2s min
+                season_stats = await asyncio.to_thread(scrape_champion_season_stats, game_name, tag_line, region)
+            # Scrape vide (echec ou profil introuvable): pas mis en cache
+            if season_stats:
+                cached.set('season_stats', season_stats)
+
+        # Scrape season stats + analyse match history en parallele
+        await asyncio.gather(refresh_season_stats(), refresh_match_history())
+
     async def fetch_player_data(self, puuid: str) -> Optional[PlayerData]:
-        """Recupere toutes les donnees d'un joueur"""
+        """
+        Recupere toutes les donnees d'un joueur. Seuls les champs perimes
+        (config.SCOUT_CACHE_TTL) sont re-fetches, le reste vient du cache.
+        """
         try:
-            # Fetch en parallele: account (nom), rank, mastery, match history
-            account, ranks, masteries, match_ids = await asyncio.gather(
-                self.api.get_account_by_puuid(puuid),
-                self.api.get_league_entries_by_puuid(puuid),
-                self.api.get_champion_masteries(puuid, count=10),
-                self.api.get_match_history(puuid, count=config.DANGER_SCORE['RECENT_GAMES_COUNT']),
-                return_exceptions=True
+            cached = self._cached_player(puuid)
+            await self._refresh_player(puuid, cached)
+
+            account = cached.values.get('account') or {}
+            ranks = cached.values.get('ranks') or []
+            masteries = cached.values.get('masteries') or []
+            history = cached.values.get('match_history') or MatchHistorySummary()
+            season_stats = cached.values.get('season_stats') or {}
+
+            player = PlayerData(
+                puuid=puuid,
+                game_name=account.get('gameName', 'Unknown'),
+                tag_line=account.get('tagLine', '???'),
+                recent_winrate=history.recent_winrate,
+                recent_kda=history.recent_kda,
+                main_role=history.main_role,
+                role_distribution=dict(history.role_distribution),
             )
-
-            if isinstance(account, dict):
-                game_name = account.get('gameName', 'Unknown')
-                tag_line = account.get('tagLine', '???')
-            else:
-                game_name = 'Unknown'
-                tag_line = '???'
-
-            player = PlayerData(puuid=puuid, game_name=game_name, tag_line=tag_line)
+            match_champ_stats = history.champion_stats
 
             # Traiter les rangs
-            if isinstance(ranks, list) and ranks:
-                for rank_data in ranks:
-                    queue = rank_data.get('queueType')
-                    if queue not in ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR'):
-                        continue
-                    rank_info = RankInfo(
-                        tier=rank_data.get('tier', ''),
-                        rank=rank_data.get('rank', ''),
-                        lp=rank_data.get('leaguePoints', 0),
-                        wins=rank_data.get('wins', 0),
-                        losses=rank_data.get('losses', 0)
-                    )
-                    if queue == 'RANKED_SOLO_5x5':
-                        player.rank = rank_info
-                    else:
-                        player.flex_rank = rank_info
+            for rank_data in ranks:
+                queue = rank_data.get('queueType')
+                if queue not in ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR'):
+                    continue
+                rank_info = RankInfo(
+                    tier=rank_data.get('tier', ''),
+                    rank=rank_data.get('rank', ''),
+                    lp=rank_data.get('leaguePoints', 0),
+                    wins=rank_data.get('wins', 0),
+                    losses=rank_data.get('losses', 0)
+                )
+                if queue == 'RANKED_SOLO_5x5':
+                    player.rank = rank_info
+                else:
+                    player.flex_rank = rank_info
 
             # Lookups pour construction du champion list
             # Charge les donnees Data Dragon si pas encore fait
@@ -289,24 +391,8 @@ class ClashScoutModule:
                     id_to_name[champ_id] = display_name
 
             mastery_by_id = {}  # champion_id → mastery points
-            if isinstance(masteries, list):
-                for m in masteries:
-                    mastery_by_id[m.get('championId')] = m.get('championPoints', 0)
-
-            # Scrape season stats + analyse match history en parallele
-            region = config.DEFAULT_REGION.lower().rstrip('0123456789')
-            match_ids_to_use = match_ids[:config.DANGER_SCORE['RECENT_GAMES_COUNT']] if isinstance(match_ids, list) and match_ids else []
-
-            async def protected_scrape():
-                async with self.scrape_semaphore:
-                    await asyncio.sleep(2)  # Rate limit: 1 scrape toutes les 2s min
-                    return await asyncio.to_thread(scrape_champion_season_stats, game_name, tag_line, region)
-
-            season_stats, match_champ_stats = await asyncio.gather(
-                protected_scrape(),
-                self._analyze_match_history(player, match_ids_to_use)
-            )
-            match_champ_stats = match_champ_stats or {}
+            for m in masteries:
+                mastery_by_id[m.get('championId')] = m.get('championPoints', 0)
 
             # Total games saison pour le calcul OTP %
             player.total_season_games = sum(s['games'] for s in season_stats.values()) if season_stats else 0
@@ -352,7 +438,7 @@ class ClashScoutModule:
                         ))
             else:
                 # Fallback: mastery top 10 comme base
-                for m in (masteries if isinstance(masteries, list) else []):
+                for m in masteries:
                     champ_id = m.get('championId')
                     player.top_champions.append(ChampionData(
                         champion_id=champ_id,
@@ -393,25 +479,17 @@ class ClashScoutModule:
             traceback.print_exc()
             return None
 
-    async def _analyze_match_history(self, player: PlayerData, match_ids: List[str]) -> Dict[int, Dict]:
-        """Analyse l'historique de matchs. Retourne {champion_id: {games, wins, kills, deaths, assists}}."""
+    async def _analyze_match_history(self, puuid: str, match_ids: List[str]) -> MatchHistorySummary:
+        """Analyse l'historique de matchs (winrate, KDA, roles, stats par champion)."""
+        summary = MatchHistorySummary()
         if not match_ids:
-            return {}
+            return summary
 
-        # Fetch les details des matchs (en parallele par batch pour eviter rate limit)
-        batch_size = 5
-        matches = []
-
-        for i in range(0, len(match_ids), batch_size):
-            batch = match_ids[i:i + batch_size]
-            tasks = [self.api.get_match(match_id) for match_id in batch]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for r in results:
-                if isinstance(r, dict):
-                    matches.append(r)
+        # Lignes du joueur (match_participants), fetch seulement des matchs non stockes
+        matches = await self.api.get_match_participants(match_ids, puuid)
 
         if not matches:
-            return {}
+            return summary
 
         # Analyser les matchs
         role_counts = defaultdict(int)
@@ -421,20 +499,7 @@ class ClashScoutModule:
         total_assists = 0
         wins = 0
 
-        for match in matches:
-            info = match.get('info', {})
-            participants = info.get('participants', [])
-
-            # Trouver le joueur dans le match
-            player_data = None
-            for p in participants:
-                if p.get('puuid') == player.puuid:
-                    player_data = p
-                    break
-
-            if not player_data:
-                continue
-
+        for player_data in matches.values():
             # Role
             role = player_data.get('teamPosition', 'UNKNOWN')
             if role:
@@ -464,22 +529,23 @@ class ClashScoutModule:
         # Calculer les stats finales
         total_games = len(matches)
         if total_games > 0:
-            player.recent_winrate = (wins / total_games) * 100
+            summary.recent_winrate = (wins / total_games) * 100
             if total_deaths > 0:
-                player.recent_kda = (total_kills + total_assists) / total_deaths
+                summary.recent_kda = (total_kills + total_assists) / total_deaths
             else:
-                player.recent_kda = total_kills + total_assists
+                summary.recent_kda = total_kills + total_assists
 
         # Role principal
         if role_counts:
             total_roles = sum(role_counts.values())
-            player.role_distribution = {
+            summary.role_distribution = {
                 role: (count / total_roles) * 100
                 for role, count in role_counts.items()
             }
-            player.main_role = max(role_counts, key=role_counts.get)
+            summary.main_role = max(role_counts, key=role_counts.get)
 
-        return champion_stats
+        summary.champion_stats = champion_stats
+        return summary
 
     def calculate_danger_score(
         self,
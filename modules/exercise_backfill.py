@@ -0,0 +1,241 @@
+"""
+Module Exercise Backfill - Evaluation d'un exercice sur l'historique de la saison
+"""
+import asyncio
+import traceback
+from typing import Optional, List, Dict, Any, Tuple
+
+import discord
+
+import config
+from modules.match_feed import season_start_ms
+
+STATUS_LABELS = {
+    'pending': 'En attente',
+    'running': 'En cours',
+    'done': 'Termine',
+    'failed': 'Echec',
+}
+
+
+class ExerciseBackfill:
+    """
+    Backfill opt-in d'un exercice nouvellement active.
+
+    Evalue l'exercice sur les matchs classes de la saison deja stockes par le
+    feed, jusqu'au match sur lequel le tracking normal a demarre. Les
+    timelines sont recuperees en basse priorite (le rate limiter garde de la
+    marge pour les commandes), EXERCISE_BACKFILL_CONCURRENCY a la fois pour
+    tous les backfills. Un checkpoint est ecrit apres chaque lot: un backfill
+    interrompu (redemarrage) reprend la ou il s'etait arrete.
+
+    Sans aucun match stocke (compte lie depuis le dernier tick), le backfill
+    reste en attente: sa borne est fixee des que le feed a ingere l'historique.
+    """
+
+    def __init__(self, exercises_module, db_manager):
+        self.exercises = exercises_module
+        self.db = db_manager
+        self._semaphore = asyncio.Semaphore(config.EXERCISE_BACKFILL_CONCURRENCY)
+        # (riot_puuid, exercise_id) -> tache du backfill
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        # (riot_puuid, exercise_id, match_id) -> reprises ou la timeline a echoue
+        self._fetch_failures: Dict[Tuple[str, str, str], int] = {}
+
+    async def start(self, riot_puuid: str, exercise_id: str) -> Optional[int]:
+        """
+        Demarre le tracking d'un exercice avec backfill.
+        Retourne le nombre de matchs a evaluer, ou None si le joueur n'a encore
+        aucun match stocke (backfill en attente de l'historique).
+        """
+        latest_row = await self.exercises.start_tracking(riot_puuid, exercise_id)
+        if not latest_row:
+            await self.db.create_exercise_backfill(riot_puuid, exercise_id, None, 0)
+            return None
+
+        until_time = latest_row['gameCreation']
+        rows = await self._history(riot_puuid, until_time, None)
+        await self.db.create_exercise_backfill(riot_puuid, exercise_id, until_time, len(rows))
+        self._launch(riot_puuid, exercise_id)
+        return len(rows)
+
+    async def resume_all(self):
+        """Relance les backfills en attente ou interrompus (demarrage du bot, puis a chaque tick)"""
+        for backfill in await self.db.get_unfinished_exercise_backfills():
+            self._launch(backfill['riot_puuid'], backfill['exercise_id'])
+
+    async def stop(self):
+        """Annule les backfills en cours (repris au prochain demarrage)"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def _launch(self, riot_puuid: str, exercise_id: str):
+        key = (riot_puuid, exercise_id)
+        if key in self._tasks:
+            return
+        task = asyncio.create_task(self._run(riot_puuid, exercise_id))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _history(self, riot_puuid: str, until_time: int, checkpoint_time: Optional[int]) -> List[Dict[str, Any]]:
+        """Matchs classes de la saison a evaluer, du plus ancien au plus recent"""
+        since = season_start_ms() if checkpoint_time is None else checkpoint_time + 1
+        rows = await self.db.get_player_matches(riot_puuid, since=since, queue_id=420)
+        rows.reverse()
+        return [row for row in rows if row['gameCreation'] <= until_time]
+
+    async def _run(self, riot_puuid: str, exercise_id: str):
+        """Execute (ou reprend) un backfill"""
+        exercise_def = config.TRAINING_EXERCISES.get(exercise_id)
+        backfill = next(
+            (b for b in await self.db.get_exercise_backfills(riot_puuid) if b['exercise_id'] == exercise_id),
+            None
+        )
+        if not backfill:
+            return
+        if not exercise_def:
+            await self.db.update_exercise_backfill(riot_puuid, exercise_id, 'failed')
+            return
+
+        processed = backfill['processed'] or 0
+
+        try:
+            until_time = backfill['until_time']
+            if until_time is None:
+                until_time = await self._resolve_until_time(riot_puuid, exercise_id)
+                if until_time is None:
+                    return  # Still no stored match, retried on the next tick
+                rows = await self._history(riot_puuid, until_time, None)
+                if not await self.db.resolve_exercise_backfill(riot_puuid, exercise_id, until_time, len(rows)):
+                    return
+            else:
+                rows = await self._history(riot_puuid, until_time, backfill['checkpoint_time'])
+            print(f"[Backfill] {exercise_id} pour {riot_puuid}: {len(rows)} match(s) a evaluer")
+
+            if not await self.db.update_exercise_backfill(riot_puuid, exercise_id, 'running'):
+                return
+
+            for i in range(0, len(rows), config.EXERCISE_BACKFILL_BATCH_SIZE):
+                batch = rows[i:i + config.EXERCISE_BACKFILL_BATCH_SIZE]
+                results = await asyncio.gather(
+                    *(self._evaluate(row, exercise_id, exercise_def) for row in batch)
+                )
+
+                # Checkpoint only up to the first timeline that failed to fetch:
+                # that match and the rest are retried on the next resume_all
+                attempts = []
+                evaluated = 0
+                for row, match_attempts in zip(batch, results):
+                    if match_attempts is None and not self._give_up(riot_puuid, exercise_id, row['match_id']):
+                        break
+                    attempts.extend(match_attempts or [])
+                    evaluated += 1
+
+                # Attempts first, then the checkpoint: a resumed batch is re-evaluated
+                # and INSERT OR IGNORE keeps attempts unique
+                await self.db.save_exercise_results(riot_puuid, attempts, {})
+                if evaluated:
+                    processed += evaluated
+                    still_enabled = await self.db.update_exercise_backfill(
+                        riot_puuid, exercise_id, 'running',
+                        checkpoint_time=batch[evaluated - 1]['gameCreation'], processed=processed
+                    )
+                    if not still_enabled:
+                        print(f"[Backfill] {exercise_id} desactive, arret")
+                        return
+
+                if evaluated < len(batch):
+                    print(f"[Backfill] {exercise_id} pour {riot_puuid}: timeline non recuperee, reprise au prochain tick")
+                    await self.db.update_exercise_backfill(riot_puuid, exercise_id, 'pending')
+                    return
+
+            await self.db.update_exercise_backfill(riot_puuid, exercise_id, 'done')
+            print(f"[Backfill] {exercise_id} pour {riot_puuid}: termine ({processed} match(s))")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Backfill] Erreur {exercise_id} pour {riot_puuid}: {e}")
+            traceback.print_exc()
+            await self.db.update_exercise_backfill(riot_puuid, exercise_id, 'failed')
+
+    async def _resolve_until_time(self, riot_puuid: str, exercise_id: str) -> Optional[int]:
+        """
+        Borne d'un backfill cree sans historique: le match sur lequel le
+        tracking normal a demarre (curseur de l'exercice), sinon le dernier
+        match stocke, sur lequel le tracking demarre alors.
+        """
+        match_cursor = await self.db.get_match_cursor(riot_puuid, f"exercise:{exercise_id}")
+        if match_cursor:
+            return match_cursor['last_match_time']
+        latest_row = await self.exercises.start_tracking(riot_puuid, exercise_id)
+        return latest_row['gameCreation'] if latest_row else None
+
+    async def _evaluate(
+        self,
+        player_data: Dict[str, Any],
+        exercise_id: str,
+        exercise_def: Dict
+    ) -> Optional[List[Tuple[str, str, bool, int]]]:
+        """
+        Evalue l'exercice sur un match (timeline en basse priorite).
+        Retourne None si la timeline n'a pas pu etre recuperee, [] si le match
+        n'a rien a evaluer (pas de participantId, game trop courte).
+        """
+        if not player_data.get('participantId'):
+            return []
+        async with self._semaphore:
+            timeline = await self.exercises.get_timeline(player_data['match_id'], low_priority=True)
+        if not timeline:
+            return None
+        return self.exercises.evaluate_match(player_data, timeline, [(exercise_id, exercise_def)])
+
+    def _give_up(self, riot_puuid: str, exercise_id: str, match_id: str) -> bool:
+        """
+        Compte un echec de timeline; True si le match doit etre saute
+        (EXERCISE_BACKFILL_MAX_FETCH_ATTEMPTS reprises sans succes).
+        """
+        key = (riot_puuid, exercise_id, match_id)
+        failures = self._fetch_failures.get(key, 0) + 1
+        if failures < config.EXERCISE_BACKFILL_MAX_FETCH_ATTEMPTS:
+            self._fetch_failures[key] = failures
+            return False
+        self._fetch_failures.pop(key, None)
+        print(f"[Backfill] Timeline {match_id} toujours introuvable, match ignore")
+        return True
+
+    # ==================== Embed ====================
+
+    async def generate_progress_embed(self, discord_id: str) -> discord.Embed:
+        """Avancement des backfills d'un joueur"""
+        user = await self.db.get_user(discord_id)
+        embed = discord.Embed(
+            title="Backfill des exercices",
+            color=discord.Color.blue()
+        )
+        if not user:
+            embed.description = "Aucun compte lie. Utilisez `/link` d'abord."
+            return embed
+
+        backfills = await self.db.get_exercise_backfills(user['riot_puuid'])
+        if not backfills:
+            embed.description = "Aucun backfill. Utilisez `/exercises enable <id> backfill:True`."
+            return embed
+
+        for backfill in backfills:
+            ex_def = config.TRAINING_EXERCISES.get(backfill['exercise_id'], {})
+            total = backfill['total'] or 0
+            processed = min(backfill['processed'] or 0, total)
+            percent = processed / total * 100 if total else 100.0
+            status = STATUS_LABELS.get(backfill['status'], backfill['status'])
+            if backfill['until_time'] is None:
+                value = f"{status} - en attente de l'historique des matchs"
+            else:
+                value = f"{status} - {processed}/{total} matchs ({percent:.0f}%)"
+            embed.add_field(
+                name=f"{ex_def.get('name', backfill['exercise_id'])} (`{backfill['exercise_id']}`)",
+                value=value,
+                inline=False
+            )
+        return embed
@@ -1,11 +1,15 @@
 """
 Module pour le leaderboard quotidien
 """
+import asyncio
+import time
 import discord
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from zoneinfo import ZoneInfo
 
+import config
+
 # Ordre des tiers (du plus bas au plus haut)
 TIER_ORDER = {
     'IRON': 0, 'BRONZE': 1, 'SILVER': 2, 'GOLD': 3,
@@ -91,6 +95,24 @@ def get_tier_from_rank(tier: str, rank: str) -> str:
     return f"{tier.capitalize()} {rank}"
 
 
+class RankSnapshot:
+    """
+    Entrees league des joueurs, fetchees lors d'un meme rafraichissement.
+
+    Gardee en memoire par LeaderboardModule: le leaderboard, la retrospective
+    et /leaderboard la relisent tant qu'elle a moins de CACHE_TTL['RANK'].
+    """
+
+    __slots__ = ('ranks', 'fetched_at')
+
+    def __init__(self, ranks: Dict[str, List[Dict[str, Any]]]):
+        self.ranks = ranks
+        self.fetched_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < config.CACHE_TTL['RANK']
+
+
 class LeaderboardModule:
     """Gere le leaderboard et les snapshots de rang"""
 
@@ -98,142 +120,206 @@ class LeaderboardModule:
         self.api = riot_api
         self.data_dragon = data_dragon
         self.db = db_manager
+        # Derniers rangs fetches (update_all_ranks / get_current_ranks)
+        self.rank_snapshot: Optional[RankSnapshot] = None
+
+    async def _fetch_all_ranks(self, puuids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Entrees league de chaque joueur, en parallele (le rate limiter regule).
+        Les joueurs dont le fetch echoue sont absents du resultat.
+        """
+        semaphore = asyncio.Semaphore(config.RANK_REFRESH_CONCURRENCY)
+
+        async def fetch_ranks(puuid: str) -> Optional[List[Dict[str, Any]]]:
+            async with semaphore:
+                try:
+                    return await self.api.get_league_entries_by_puuid(puuid)
+                except Exception as e:
+                    print(f"[Leaderboard] Erreur update {puuid}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(fetch_ranks(puuid) for puuid in puuids))
+        return {puuid: ranks for puuid, ranks in zip(puuids, results) if ranks is not None}
+
+    async def get_current_ranks(self, puuids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Rangs actuels des joueurs: relus depuis le dernier rafraichissement
+        s'il est encore frais, seuls les joueurs absents sont fetches.
+        """
+        snapshot = self.rank_snapshot
+        if not snapshot or not snapshot.is_fresh():
+            snapshot = self.rank_snapshot = RankSnapshot(await self._fetch_all_ranks(puuids))
+        else:
+            missing = [puuid for puuid in puuids if puuid not in snapshot.ranks]
+            if missing:
+                snapshot.ranks.update(await self._fetch_all_ranks(missing))
+
+        return {puuid: snapshot.ranks[puuid] for puuid in puuids if puuid in snapshot.ranks}
 
     async def update_all_ranks(self) -> int:
-        """Met a jour les rangs de tous les joueurs enregistres"""
+        """Met a jour les rangs de tous les joueurs enregistres; retourne le nombre de rangs changes"""
         puuids = await self.db.get_all_registered_puuids()
-        updated = 0
 
-        for puuid in puuids:
-            try:
-                ranks = await self.api.get_league_entries_by_puuid(puuid)
-                if not ranks:
-                    continue
+        # Fetch en parallele (nouveau snapshot en memoire), puis une seule ecriture
+        all_ranks = await self._fetch_all_ranks(puuids)
+        self.rank_snapshot = RankSnapshot(all_ranks)
 
-                for rank_data in ranks:
-                    queue_type = rank_data.get('queueType', '')
-                    if queue_type not in ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR'):
-                        continue
+        snapshots = []
+        for puuid, ranks in all_ranks.items():
+            for rank_data in ranks:
+                queue_type = rank_data.get('queueType', '')
+                if queue_type not in ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR'):
+                    continue
 
-                    await self.db.save_rank_snapshot(
-                        riot_puuid=puuid,
-                        queue_type=queue_type,
-                        tier=rank_data.get('tier', ''),
-                        rank=rank_data.get('rank', ''),
-                        league_points=rank_data.get('leaguePoints', 0),
-                        wins=rank_data.get('wins', 0),
-                        losses=rank_data.get('losses', 0)
-                    )
-                    updated += 1
+                snapshots.append((
+                    puuid,
+                    queue_type,
+                    rank_data.get('tier', ''),
+                    rank_data.get('rank', ''),
+                    rank_data.get('leaguePoints', 0),
+                    rank_data.get('wins', 0),
+                    rank_data.get('losses', 0),
+                ))
 
-            except Exception as e:
-                print(f"[Leaderboard] Erreur update {puuid}: {e}")
+        inserted = await self.db.save_rank_snapshots(snapshots)
 
-        return updated
+        # LP Solo/Duo de la semaine pour la retrospective
+        now = datetime.now(PARIS_TZ)
+        week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
+        await self.db.save_weekly_summary_lp(week_start, [
+            (puuid, rank_to_lp(tier, rank, lp))
+            for puuid, queue_type, tier, rank, lp, _, _ in snapshots
+            if queue_type == 'RANKED_SOLO_5x5' and tier
+        ])
+        return inserted
 
     async def get_leaderboard_data(self, queue_type: str) -> List[Dict[str, Any]]:
         """Recupere les donnees du leaderboard pour une queue"""
+        leaderboards = await self.get_leaderboards([queue_type])
+        return leaderboards[queue_type]
+
+    async def get_leaderboards(self, queue_types: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Donnees du leaderboard de plusieurs queues.
+        Rangs actuels fetches une fois par joueur, utilisateurs et rangs
+        historiques (24h, lundi) charges en une requete chacun.
+        """
         puuids = await self.db.get_all_registered_puuids()
         now = datetime.now(PARIS_TZ)
 
         # Il y a exactement 24 heures
-        time_24h_ago = now - timedelta(hours=24)
+        time_24h_ago = (now - timedelta(hours=24)).isoformat()
 
         # Lundi de cette semaine a minuit
         days_since_monday = now.weekday()
         monday = now - timedelta(days=days_since_monday)
-        monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
+        monday = monday.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+        users = await self.db.get_users_by_puuid()
+        history = await self.db.get_ranks_as_of(queue_types, [time_24h_ago, monday])
+        all_ranks = await self.get_current_ranks(puuids)
+
+        leaderboards = {}
+        for queue_type in queue_types:
+            players = []
+
+            for puuid in puuids:
+                try:
+                    # Donnees actuelles depuis l'API
+                    current_rank = None
+                    for r in all_ranks.get(puuid, []):
+                        if r.get('queueType') == queue_type:
+                            current_rank = r
+                            break
+
+                    if not current_rank:
+                        continue
+
+                    # Donnees utilisateur
+                    user = users.get(puuid)
+                    if not user:
+                        continue
 
-        players = []
+                    players.append(self._leaderboard_entry(
+                        puuid, user, current_rank,
+                        history.get((puuid, queue_type, time_24h_ago)),
+                        history.get((puuid, queue_type, monday))
+                    ))
 
-        for puuid in puuids:
-            try:
-                # Donnees actuelles depuis l'API
-                ranks = await self.api.get_league_entries_by_puuid(puuid)
-                current_rank = None
-                for r in (ranks or []):
-                    if r.get('queueType') == queue_type:
-                        current_rank = r
-                        break
+                except Exception as e:
+                    print(f"[Leaderboard] Erreur {puuid}: {e}")
 
-                if not current_rank:
-                    continue
+            # Trier par LP total (desc)
+            players.sort(key=lambda p: p['total_lp'], reverse=True)
+            leaderboards[queue_type] = players
 
-                # Donnees utilisateur
-                user = await self.db.get_user_by_puuid(puuid)
-                if not user:
-                    continue
+        return leaderboards
 
-                current_lp = rank_to_lp(
-                    current_rank.get('tier', ''),
-                    current_rank.get('rank', ''),
-                    current_rank.get('leaguePoints', 0)
-                )
+    def _leaderboard_entry(
+        self,
+        puuid: str,
+        user: Dict[str, Any],
+        current_rank: Dict[str, Any],
+        rank_24h_ago: Optional[Dict[str, Any]],
+        rank_monday: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Ligne du leaderboard d'un joueur (rang actuel + snapshots 24h / lundi)"""
+        current_lp = rank_to_lp(
+            current_rank.get('tier', ''),
+            current_rank.get('rank', ''),
+            current_rank.get('leaguePoints', 0)
+        )
 
-                # Rang il y a 24h
-                rank_24h_ago = await self.db.get_rank_at_time(
-                    puuid, queue_type, time_24h_ago.isoformat()
-                )
-                lp_24h_ago = rank_to_lp(
-                    rank_24h_ago.get('tier', '') if rank_24h_ago else '',
-                    rank_24h_ago.get('rank', '') if rank_24h_ago else '',
-                    rank_24h_ago.get('league_points', 0) if rank_24h_ago else 0
-                ) if rank_24h_ago else current_lp
-
-                # Rang du lundi
-                rank_monday = await self.db.get_rank_at_time(
-                    puuid, queue_type, monday.isoformat()
-                )
-                lp_monday = rank_to_lp(
-                    rank_monday.get('tier', '') if rank_monday else '',
-                    rank_monday.get('rank', '') if rank_monday else '',
-                    rank_monday.get('league_points', 0) if rank_monday else 0
-                ) if rank_monday else current_lp
-
-                # Calculer les changements
-                lp_change_24h = current_lp - lp_24h_ago
-                lp_change_week = current_lp - lp_monday
-
-                # Detecter promotion/demotion (changement de tier sur 24h)
-                prev_tier = rank_24h_ago.get('tier', '') if rank_24h_ago else current_rank.get('tier', '')
-                curr_tier = current_rank.get('tier', '')
-                prev_tier_value = TIER_ORDER.get(prev_tier.upper(), 0) if prev_tier else 0
-                curr_tier_value = TIER_ORDER.get(curr_tier.upper(), 0) if curr_tier else 0
-
-                promotion = curr_tier_value > prev_tier_value
-                demotion = curr_tier_value < prev_tier_value
-
-                # Streak - commented out for now
-                # streak = 0
-                # if current_rank.get('hotStreak'):
-                #     streak = 3
-
-                players.append({
-                    'puuid': puuid,
-                    'username': f"{user['game_name']}#{user['tag_line']}",
-                    'display_name': user['game_name'],
-                    'tier': current_rank.get('tier', ''),
-                    'rank': current_rank.get('rank', ''),
-                    'lp': current_rank.get('leaguePoints', 0),
-                    'total_lp': current_lp,
-                    'lp_change_24h': lp_change_24h,
-                    'lp_change_week': lp_change_week,
-                    'wins': current_rank.get('wins', 0),
-                    'losses': current_rank.get('losses', 0),
-                    # 'streak': streak,
-                    # 'hot_streak': current_rank.get('hotStreak', False),
-                    'promotion': promotion,
-                    'demotion': demotion,
-                    'new_division': get_tier_from_rank(curr_tier, current_rank.get('rank', ''))
-                })
-
-            except Exception as e:
-                print(f"[Leaderboard] Erreur {puuid}: {e}")
-
-        # Trier par LP total (desc)
-        players.sort(key=lambda p: p['total_lp'], reverse=True)
-
-        return players
+        # Rang il y a 24h
+        lp_24h_ago = rank_to_lp(
+            rank_24h_ago.get('tier', ''),
+            rank_24h_ago.get('rank', ''),
+            rank_24h_ago.get('league_points', 0)
+        ) if rank_24h_ago else current_lp
+
+        # Rang du lundi
+        lp_monday = rank_to_lp(
+            rank_monday.get('tier', ''),
+            rank_monday.get('rank', ''),
+            rank_monday.get('league_points', 0)
+        ) if rank_monday else current_lp
+
+        # Calculer les changements
+        lp_change_24h = current_lp - lp_24h_ago
+        lp_change_week = current_lp - lp_monday
+
+        # Detecter promotion/demotion (changement de tier sur 24h)
+        prev_tier = rank_24h_ago.get('tier', '') if rank_24h_ago else current_rank.get('tier', '')
+        curr_tier = current_rank.get('tier', '')
+        prev_tier_value = TIER_ORDER.get(prev_tier.upper(), 0) if prev_tier else 0
+        curr_tier_value = TIER_ORDER.get(curr_tier.upper(), 0) if curr_tier else 0
+
+        promotion = curr_tier_value > prev_tier_value
+        demotion = curr_tier_value < prev_tier_value
+
+        # Streak - commented out for now
+        # streak = 0
+        # if current_rank.get('hotStreak'):
+        #     streak = 3
+
+        return {
+            'puuid': puuid,
+            'username': f"{user['game_name']}#{user['tag_line']}",
+            'display_name': user['game_name'],
+            'tier': current_rank.get('tier', ''),
+            'rank': current_rank.get('rank', ''),
+            'lp': current_rank.get('leaguePoints', 0),
+            'total_lp': current_lp,
+            'lp_change_24h': lp_change_24h,
+            'lp_change_week': lp_change_week,
+            'wins': current_rank.get('wins', 0),
+            'losses': current_rank.get('losses', 0),
+            # 'streak': streak,
+            # 'hot_streak': current_rank.get('hotStreak', False),
+            'promotion': promotion,
+            'demotion': demotion,
+            'new_division': get_tier_from_rank(curr_tier, current_rank.get('rank', ''))
+        }
 
     def create_leaderboard_embed(
         self,
@@ -319,14 +405,16 @@ class LeaderboardModule:
         embeds = []
         all_messages = []
 
+        leaderboards = await self.get_leaderboards(["RANKED_SOLO_5x5", "RANKED_FLEX_SR"])
+
         # Solo Queue
-        solo_players = await self.get_leaderboard_data("RANKED_SOLO_5x5")
+        solo_players = leaderboards["RANKED_SOLO_5x5"]
         solo_embed, solo_msgs = self.create_leaderboard_embed("RANKED_SOLO_5x5", solo_players)
         embeds.append(solo_embed)
         all_messages.extend(solo_msgs)
 
         # Flex Queue
-        flex_players = await self.get_leaderboard_data("RANKED_FLEX_SR")
+        flex_players = leaderboards["RANKED_FLEX_SR"]
         flex_embed, flex_msgs = self.create_leaderboard_embed("RANKED_FLEX_SR", flex_players)
         embeds.append(flex_embed)
         all_messages.extend(flex_msgs)
@@ -375,46 +463,29 @@ class LeaderboardModule:
         return "\n".join(lines)
 
     async def generate_weekly_retrospective(self, week_start: str) -> discord.Embed:
-        """Genere un embed retrospective de la semaine avec les awards"""
-        # Get Solo/Duo leaderboard data (LP changes over the week)
-        solo_players = await self.get_leaderboard_data("RANKED_SOLO_5x5")
-
-        # Get weekly stats for all players
-        puuids = await self.db.get_all_registered_puuids()
+        """
+        Genere un embed retrospective de la semaine avec les awards.
+        Lu depuis weekly_summaries (aucun appel Riot).
+        """
         player_stats = []
-
-        for puuid in puuids:
-            user = await self.db.get_user_by_puuid(puuid)
-            if not user:
-                continue
-
-            weekly = await self.db.get_all_weekly_stats(puuid, week_start)
-            if not weekly:
-                continue
-
-            games = weekly.get('games_played', {}).get('stat_value', 0)
-            if games < 1:
-                continue
-
-            kills = weekly.get('kills', {}).get('stat_value', 0)
-            deaths = weekly.get('deaths', {}).get('stat_value', 0)
-            assists = weekly.get('assists', {}).get('stat_value', 0)
-            wins = weekly.get('wins', {}).get('stat_value', 0)
-            losses = weekly.get('losses', {}).get('stat_value', 0)
+        for summary in await self.db.get_weekly_summaries(week_start):
+            kills = summary['kills']
+            deaths = summary['deaths']
+            assists = summary['assists']
+            wins = summary['wins']
+            losses = summary['losses']
 
             total_games = wins + losses
             winrate = (wins / total_games * 100) if total_games > 0 else 0
             kda = ((kills + assists) / deaths) if deaths > 0 else kills + assists
 
-            # Find LP change from leaderboard data
+            # LP change over the week (Solo/Duo)
             lp_change = 0
-            for p in solo_players:
-                if p['puuid'] == puuid:
-                    lp_change = p['lp_change_week']
-                    break
+            if summary['lp_start'] is not None and summary['lp_end'] is not None:
+                lp_change = summary['lp_end'] - summary['lp_start']
 
             player_stats.append({
-                'name': user['game_name'],
+                'name': summary['game_name'],
                 'games': int(total_games),
                 'kills': int(kills),
                 'deaths': int(deaths),
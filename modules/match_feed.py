@@ -0,0 +1,126 @@
+"""
+Module Match Feed - Ingestion commune des nouveaux matchs classes
+"""
+import asyncio
+import traceback
+from typing import Dict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import config
+
+PARIS_TZ = ZoneInfo("Europe/Paris")
+
+
+def season_start_ms() -> int:
+    """Debut de la saison (config.SEASON_START_DATE, heure de Paris) en ms epoch"""
+    return int(
+        datetime.strptime(config.SEASON_START_DATE, '%Y-%m-%d')
+        .replace(tzinfo=PARIS_TZ)
+        .timestamp()
+    ) * 1000
+
+
+class MatchFeed:
+    """
+    Decouvre une seule fois par tick les nouveaux matchs classes de chaque
+    joueur et fetch chaque match une seule fois (stocke dans match_participants).
+
+    Le curseur 'feed' marque la limite des matchs ingeres sans trou. Les
+    modules abonnes (challenges, exercices) relisent match_participants depuis
+    leur propre curseur jusqu'a celui du feed (get_delivered_matches): un
+    consommateur en erreur ou interrompu reprend ses matchs au tick suivant.
+    """
+
+    CONSUMER = 'feed'
+
+    def __init__(self, riot_api, db_manager):
+        self.api = riot_api
+        self.db = db_manager
+        # match_id -> ticks consecutifs ou le fetch a echoue
+        self._fetch_failures: Dict[str, int] = {}
+
+    async def poll(self) -> int:
+        """
+        Ingere les nouveaux matchs de tous les joueurs suivis (match_participants
+        et curseur du feed). Retourne le nombre de matchs ingeres.
+        """
+        users = await self.db.get_all_primary_users()
+        puuids = list(dict.fromkeys(
+            [user['riot_puuid'] for user in users] + await self.db.get_all_exercise_users()
+        ))
+
+        semaphore = asyncio.Semaphore(config.MATCH_FEED_CONCURRENCY)
+
+        async def poll_one(riot_puuid: str) -> int:
+            async with semaphore:
+                try:
+                    return await self._poll_player(riot_puuid)
+                except Exception as e:
+                    print(f"[MatchFeed] Erreur pour {riot_puuid}: {e}")
+                    traceback.print_exc()
+                    return 0
+
+        results = await asyncio.gather(*(poll_one(puuid) for puuid in puuids))
+
+        total = sum(results)
+        if total:
+            players = sum(1 for count in results if count)
+            print(f"[MatchFeed] {total} nouveau(x) match(s) pour {players} joueur(s)")
+        return total
+
+    async def _poll_player(self, riot_puuid: str) -> int:
+        """
+        Ingere les nouveaux matchs d'un joueur depuis le curseur du feed (toute
+        la saison au premier passage). Retourne le nombre de matchs ingeres.
+        """
+        start_time = season_start_ms() // 1000
+        last_match_id = None
+
+        match_cursor = await self.db.get_match_cursor(riot_puuid, self.CONSUMER)
+        if match_cursor:
+            last_match_id = match_cursor['last_match_id']
+            start_time = max(start_time, match_cursor['last_match_time'] // 1000)
+
+        match_ids = await self.api.get_match_ids_since(riot_puuid, start_time, queue=420)
+
+        # Stop at the last match already delivered
+        new_match_ids = []
+        for match_id in match_ids:
+            if match_id == last_match_id:
+                break
+            new_match_ids.append(match_id)
+
+        if not new_match_ids:
+            return 0
+
+        # Each match is fetched once and stored in match_participants
+        rows = await self.api.get_match_participants(new_match_ids, riot_puuid)
+
+        # The cursor only moves up to the first match that failed to fetch
+        # (oldest first): the missing one and the ones after it are retried.
+        # A match still missing after MATCH_FEED_MAX_FETCH_ATTEMPTS ticks
+        # (404, purged match) is skipped so it cannot block the player's feed
+        ingested = 0
+        cursor_id, cursor_time = None, start_time * 1000
+        for match_id in reversed(new_match_ids):
+            row = rows.get(match_id)
+            if row is None:
+                failures = self._fetch_failures.get(match_id, 0) + 1
+                if failures < config.MATCH_FEED_MAX_FETCH_ATTEMPTS:
+                    self._fetch_failures[match_id] = failures
+                    print(f"[MatchFeed] {match_id} non recupere ({failures}/{config.MATCH_FEED_MAX_FETCH_ATTEMPTS}), reessai au prochain tick")
+                    break
+                self._fetch_failures.pop(match_id, None)
+                print(f"[MatchFeed] {match_id} toujours introuvable, ignore")
+                cursor_id = match_id
+                continue
+
+            self._fetch_failures.pop(match_id, None)
+            cursor_id, cursor_time = match_id, row['gameCreation']
+            ingested += 1
+
+        if cursor_id:
+            await self.db.set_match_cursor(riot_puuid, self.CONSUMER, cursor_id, cursor_time)
+
+        return ingested
@@ -63,16 +63,18 @@ class TiltDetector:
         Verifie le streak d'un joueur et retourne une notification si necessaire.
         """
         try:
-            # Get recent ranked matches (solo/duo and flex)
-            match_ids = await self.api.get_match_history(
-                puuid=riot_puuid,
-                count=10,
-                queue=420  # Ranked Solo/Duo
+            # Recent ranked matches, from the store kept up to date by MatchFeed
+            recent = await self.db.get_player_matches(
+                riot_puuid,
+                queue_id=420,  # Ranked Solo/Duo
+                limit=10
             )
 
-            if not match_ids:
+            if not recent:
                 return None
 
+            match_ids = [row['match_id'] for row in recent]
+
             # Get current tilt state
             tilt_state = await self.db.get_tilt_state(riot_puuid)
             last_match_id = tilt_state['last_match_id'] if tilt_state else None
@@ -87,11 +89,8 @@ class TiltDetector:
             if not new_match_ids:
                 return None
 
-            # Get match details and compute streak
-            streak_type, streak_count = await self._compute_streak(
-                riot_puuid=riot_puuid,
-                match_ids=match_ids
-            )
+            # Compute streak
+            streak_type, streak_count = self._compute_streak(recent)
 
             if streak_count < 3:
                 # Reset tilt state if streak broken
@@ -142,50 +141,26 @@ class TiltDetector:
             print(f"[TiltDetector] Error checking {game_name}: {e}")
             return None
 
-    async def _compute_streak(
-        self,
-        riot_puuid: str,
-        match_ids: List[str]
-    ) -> Tuple[str, int]:
+    def _compute_streak(self, recent: List[Dict[str, Any]]) -> Tuple[str, int]:
         """
-        Calcule le streak actuel a partir des matchs.
+        Calcule le streak actuel a partir des matchs (du plus recent au plus ancien).
         Retourne (type, count) ou type est 'win' ou 'loss'.
         """
         streak_type = None
         streak_count = 0
 
-        for match_id in match_ids:
-            try:
-                match_data = await self.api.get_match(match_id)
-                if not match_data:
-                    continue
-
-                # Find player in participants
-                participants = match_data.get('info', {}).get('participants', [])
-                player_data = None
-                for p in participants:
-                    if p.get('puuid') == riot_puuid:
-                        player_data = p
-                        break
-
-                if not player_data:
-                    continue
-
-                won = player_data.get('win', False)
-                current_type = 'win' if won else 'loss'
-
-                if streak_type is None:
-                    streak_type = current_type
-                    streak_count = 1
-                elif current_type == streak_type:
-                    streak_count += 1
-                else:
-                    # Streak broken
-                    break
-
-            except Exception as e:
-                print(f"[TiltDetector] Error processing match {match_id}: {e}")
-                continue
+        for player_data in recent:
+            won = player_data.get('win', False)
+            current_type = 'win' if won else 'loss'
+
+            if streak_type is None:
+                streak_type = current_type
+                streak_count = 1
+            elif current_type == streak_type:
+                streak_count += 1
+            else:
+                # Streak broken
+                break
 
         return streak_type or 'none', streak_count
 
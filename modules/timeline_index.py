@@ -0,0 +1,178 @@
+"""
+Features compactes d'une timeline de match pour les extracteurs d'exercices
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Optional, List, Dict, Any, Tuple
+
+# Version du format binaire (a incrementer si FRAME_FIELDS / EVENT_FIELDS changent)
+FEATURES_VERSION = 1
+
+# Valeurs gardees par participant et par frame: nom -> extraction depuis participantFrames
+FRAME_FIELDS = {
+    'gold': lambda pf: pf.get('totalGold', 0),
+    'cs': lambda pf: pf.get('minionsKilled', 0) + pf.get('jungleMinionsKilled', 0),
+    'level': lambda pf: pf.get('level', 0),
+    'damage': lambda pf: pf.get('damageStats', {}).get('totalDamageDoneToChampions', 0),
+}
+FRAME_FIELD_NAMES = tuple(FRAME_FIELDS)
+
+# Evenements gardes: (type, champ qui designe le participant) -> timestamps
+EVENT_FIELDS = (
+    ('CHAMPION_KILL', 'killerId'),
+    ('CHAMPION_KILL', 'victimId'),
+    ('WARD_PLACED', 'creatorId'),
+)
+
+_HEADER = struct.Struct('<BHB')  # version, nombre de frames, nombre de participants
+_EVENT_HEADER = struct.Struct('<BBH')  # index dans EVENT_FIELDS, participantId, nombre
+
+
+def _int_array(values=()) -> array:
+    return array('i', values)
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(data: bytes) -> array:
+    values = array('i')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class TimelineIndex:
+    """
+    Timeline d'un match reduite aux valeurs utiles aux exercices.
+
+    - frame_times: timestamps des frames (tries)
+    - frames: (champ, participantId) -> valeur a chaque frame (gold, cs, level, damage)
+    - events: (type, champ, participantId) -> timestamps tries des evenements
+
+    Quelques Ko au lieu des ~640 Ko de la timeline brute; stockee telle quelle
+    (pack/unpack) pour re-evaluer les exercices sans refaire l'appel Riot.
+    """
+
+    __slots__ = ('frame_times', 'participant_ids', 'frames', 'events')
+
+    def __init__(self):
+        self.frame_times = _int_array()
+        self.participant_ids: Tuple[int, ...] = ()
+        self.frames: Dict[Tuple[str, int], array] = {}
+        self.events: Dict[Tuple[str, str, int], array] = {}
+
+    @classmethod
+    def from_timeline(cls, timeline_data: Optional[Dict[str, Any]]) -> Optional['TimelineIndex']:
+        """Reponse de l'API timeline -> features (None si pas de frames)"""
+        raw_frames = (timeline_data or {}).get('info', {}).get('frames', [])
+        if not raw_frames:
+            return None
+
+        index = cls()
+        index.frame_times = _int_array(frame.get('timestamp', 0) for frame in raw_frames)
+        index.participant_ids = tuple(sorted({
+            int(pid) for frame in raw_frames for pid in frame.get('participantFrames', {})
+        }))
+
+        for pid in index.participant_ids:
+            participant_frames = [frame.get('participantFrames', {}).get(str(pid)) or {} for frame in raw_frames]
+            for name, extract in FRAME_FIELDS.items():
+                index.frames[(name, pid)] = _int_array(extract(pf) for pf in participant_frames)
+
+        events: Dict[Tuple[str, str, int], List[int]] = {}
+        for frame in raw_frames:
+            for event in frame.get('events', []):
+                event_type = event.get('type')
+                for field_type, field in EVENT_FIELDS:
+                    participant_id = event.get(field)
+                    if event_type == field_type and participant_id is not None:
+                        events.setdefault((event_type, field, participant_id), []).append(event.get('timestamp', 0))
+        index.events = {key: _int_array(sorted(timestamps)) for key, timestamps in events.items()}
+        return index
+
+    # ==================== Serialisation ====================
+
+    def pack(self) -> bytes:
+        """Features -> blob (int32 little-endian)"""
+        parts = [
+            _HEADER.pack(FEATURES_VERSION, len(self.frame_times), len(self.participant_ids)),
+            bytes(self.participant_ids),
+            _to_bytes(self.frame_times),
+        ]
+        for pid in self.participant_ids:
+            for name in FRAME_FIELD_NAMES:
+                parts.append(_to_bytes(self.frames[(name, pid)]))
+
+        event_keys = [(i, key) for i, (event_type, field) in enumerate(EVENT_FIELDS)
+                      for key in self.events if key[:2] == (event_type, field)]
+        parts.append(struct.pack('<H', len(event_keys)))
+        for field_index, key in event_keys:
+            timestamps = self.events[key]
+            parts.append(_EVENT_HEADER.pack(field_index, key[2], len(timestamps)))
+            parts.append(_to_bytes(timestamps))
+        return b''.join(parts)
+
+    @classmethod
+    def unpack(cls, blob: bytes) -> Optional['TimelineIndex']:
+        """Blob -> features (None si le format n'est plus celui de FEATURES_VERSION)"""
+        version, frame_count, participant_count = _HEADER.unpack_from(blob)
+        if version != FEATURES_VERSION:
+            return None
+
+        index = cls()
+        offset = _HEADER.size
+        index.participant_ids = tuple(blob[offset:offset + participant_count])
+        offset += participant_count
+
+        size = frame_count * 4
+        index.frame_times = _from_bytes(blob[offset:offset + size])
+        offset += size
+        for pid in index.participant_ids:
+            for name in FRAME_FIELD_NAMES:
+                index.frames[(name, pid)] = _from_bytes(blob[offset:offset + size])
+                offset += size
+
+        (event_key_count,) = struct.unpack_from('<H', blob, offset)
+        offset += 2
+        for _ in range(event_key_count):
+            field_index, participant_id, count = _EVENT_HEADER.unpack_from(blob, offset)
+            offset += _EVENT_HEADER.size
+            event_type, field = EVENT_FIELDS[field_index]
+            index.events[(event_type, field, participant_id)] = _from_bytes(blob[offset:offset + count * 4])
+            offset += count * 4
+        return index
+
+    # ==================== Lecture ====================
+
+    def frame_position(self, time_ms: int) -> Optional[int]:
+        """Indice de la derniere frame dont le timestamp est <= time_ms"""
+        position = bisect_right(self.frame_times, time_ms)
+        return position - 1 if position else None
+
+    def frame_value(self, name: str, participant_id: int, time_ms: int) -> int:
+        """Valeur d'un champ de FRAME_FIELDS pour un participant a time_ms (0 si inconnue)"""
+        position = self.frame_position(time_ms)
+        values = self.frames.get((name, participant_id))
+        if position is None or values is None:
+            return 0
+        return values[position]
+
+    def frame_values(self, name: str, time_ms: int) -> Dict[int, int]:
+        """Valeur d'un champ pour tous les participants a time_ms"""
+        position = self.frame_position(time_ms)
+        if position is None:
+            return {}
+        return {pid: self.frames[(name, pid)][position] for pid in self.participant_ids}
+
+    def count_events(self, event_type: str, field: str, participant_id: int, time_ms: int) -> int:
+        """Nombre d'evenements event_type ou field == participant_id, jusqu'a time_ms inclus"""
+        timestamps = self.events.get((event_type, field, participant_id))
+        return bisect_right(timestamps, time_ms) if timestamps else 0
@@ -3,15 +3,13 @@ Module Training Exercises - Exercices per-game bases sur les timelines
 """
 import operator
 import traceback
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timezone
 
 import discord
 
 import config
-
-PARIS_TZ = ZoneInfo("Europe/Paris")
+from modules.timeline_index import TimelineIndex
 
 # Operator mapping for condition evaluation
 OPS = {
@@ -34,117 +32,53 @@ class TrainingExercises:
 
     # ==================== Timeline Stat Extractors ====================
 
-    def _get_frame_at_time(self, frames: List[Dict], time_ms: int) -> Optional[Dict]:
-        """Retourne la frame la plus proche avant time_ms"""
-        target_frame = None
-        for frame in frames:
-            if frame.get('timestamp', 0) <= time_ms:
-                target_frame = frame
-            else:
-                break
-        return target_frame
-
-    def _get_participant_frame(self, frame: Dict, participant_id: int) -> Optional[Dict]:
-        """Extrait les donnees d'un participant depuis une frame"""
-        if not frame or 'participantFrames' not in frame:
-            return None
-        return frame['participantFrames'].get(str(participant_id))
-
-    def _get_events_before_time(self, frames: List[Dict], time_ms: int) -> List[Dict]:
-        """Recupere tous les evenements avant un timestamp"""
-        events = []
-        for frame in frames:
-            for event in frame.get('events', []):
-                if event.get('timestamp', 0) <= time_ms:
-                    events.append(event)
-        return events
-
-    def deaths_before_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def deaths_before_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Compte les morts du joueur avant un timestamp"""
-        events = self._get_events_before_time(frames, time_ms)
-        return sum(
-            1 for e in events
-            if e.get('type') == 'CHAMPION_KILL' and e.get('victimId') == participant_id
-        )
+        return timeline.count_events('CHAMPION_KILL', 'victimId', participant_id, time_ms)
 
-    def kills_before_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def kills_before_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Compte les kills du joueur avant un timestamp"""
-        events = self._get_events_before_time(frames, time_ms)
-        return sum(
-            1 for e in events
-            if e.get('type') == 'CHAMPION_KILL' and e.get('killerId') == participant_id
-        )
+        return timeline.count_events('CHAMPION_KILL', 'killerId', participant_id, time_ms)
 
-    def total_cs_at_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def total_cs_at_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """CS total (minions + jungle) a un timestamp"""
-        frame = self._get_frame_at_time(frames, time_ms)
-        pf = self._get_participant_frame(frame, participant_id)
-        if not pf:
-            return 0
-        return pf.get('minionsKilled', 0) + pf.get('jungleMinionsKilled', 0)
+        return timeline.frame_value('cs', participant_id, time_ms)
 
-    def damage_to_champions_at_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def damage_to_champions_at_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Degats aux champions a un timestamp"""
-        frame = self._get_frame_at_time(frames, time_ms)
-        pf = self._get_participant_frame(frame, participant_id)
-        if not pf:
-            return 0
-        damage_stats = pf.get('damageStats', {})
-        return damage_stats.get('totalDamageDoneToChampions', 0)
+        return timeline.frame_value('damage', participant_id, time_ms)
 
-    def gold_at_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def gold_at_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Gold total a un timestamp"""
-        frame = self._get_frame_at_time(frames, time_ms)
-        pf = self._get_participant_frame(frame, participant_id)
-        if not pf:
-            return 0
-        return pf.get('totalGold', 0)
+        return timeline.frame_value('gold', participant_id, time_ms)
 
-    def gold_advantage_at_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def gold_advantage_at_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Avantage de gold par rapport a la moyenne ennemie a un timestamp"""
-        frame = self._get_frame_at_time(frames, time_ms)
-        if not frame or 'participantFrames' not in frame:
-            return 0
-
-        pf = self._get_participant_frame(frame, participant_id)
-        if not pf:
+        golds = timeline.frame_values('gold', time_ms)
+        if participant_id not in golds:
             return 0
 
-        player_gold = pf.get('totalGold', 0)
+        player_gold = golds[participant_id]
         # Determine enemy team (participants 1-5 vs 6-10)
         is_team_one = participant_id <= 5
-        enemy_golds = []
-        for pid_str, data in frame['participantFrames'].items():
-            pid = int(pid_str)
-            if is_team_one and pid > 5:
-                enemy_golds.append(data.get('totalGold', 0))
-            elif not is_team_one and pid <= 5:
-                enemy_golds.append(data.get('totalGold', 0))
+        enemy_golds = [gold for pid, gold in golds.items() if (pid > 5) == is_team_one]
 
         if not enemy_golds:
             return 0
         enemy_avg = sum(enemy_golds) / len(enemy_golds)
         return int(player_gold - enemy_avg)
 
-    def level_at_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def level_at_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Niveau du joueur a un timestamp"""
-        frame = self._get_frame_at_time(frames, time_ms)
-        pf = self._get_participant_frame(frame, participant_id)
-        if not pf:
-            return 0
-        return pf.get('level', 0)
+        return timeline.frame_value('level', participant_id, time_ms)
 
-    def wards_placed_before_time(self, frames: List[Dict], participant_id: int, time_ms: int) -> int:
+    def wards_placed_before_time(self, timeline: TimelineIndex, participant_id: int, time_ms: int) -> int:
         """Compte les wards posees avant un timestamp"""
-        events = self._get_events_before_time(frames, time_ms)
-        return sum(
-            1 for e in events
-            if e.get('type') == 'WARD_PLACED' and e.get('creatorId') == participant_id
-        )
+        return timeline.count_events('WARD_PLACED', 'creatorId', participant_id, time_ms)
 
     # ==================== Condition Evaluation ====================
 
-    def _evaluate_condition(self, condition: Dict, frames: List[Dict], participant_id: int) -> bool:
+    def _evaluate_condition(self, condition: Dict, timeline: TimelineIndex, participant_id: int) -> bool:
         """Evalue une condition d'exercice contre les donnees de timeline"""
         stat_name = condition['stat']
         op_str = condition['op']
@@ -157,7 +91,7 @@ class TrainingExercises:
             print(f"[Exercises] Extracteur inconnu: {stat_name}")
             return False
 
-        actual_value = extractor(frames, participant_id, time_ms)
+        actual_value = extractor(timeline, participant_id, time_ms)
         op_func = OPS.get(op_str)
         if not op_func:
             print(f"[Exercises] Operateur inconnu: {op_str}")
@@ -165,29 +99,24 @@ class TrainingExercises:
 
         return op_func(actual_value, target_value)
 
-    def _evaluate_exercise(self, exercise: Dict, frames: List[Dict], participant_id: int) -> bool:
+    def _evaluate_exercise(self, exercise: Dict, timeline: TimelineIndex, participant_id: int) -> bool:
         """Evalue toutes les conditions d'un exercice (AND logic)"""
         conditions = exercise.get('conditions', [])
         if not conditions:
             return False
 
         return all(
-            self._evaluate_condition(cond, frames, participant_id)
+            self._evaluate_condition(cond, timeline, participant_id)
             for cond in conditions
         )
 
     # ==================== Match Processing ====================
 
-    def _find_participant_id(self, match_data: Dict, puuid: str) -> Optional[int]:
-        """Trouve le participantId d'un joueur dans un match"""
-        participants = match_data.get('info', {}).get('participants', [])
-        for p in participants:
-            if p.get('puuid') == puuid:
-                return p.get('participantId')
-        return None
-
     async def check_all_players(self):
-        """Verifie les exercices pour tous les joueurs ayant des exercices actives"""
+        """
+        Verifie les exercices pour tous les joueurs ayant des exercices actives,
+        sur les matchs ingeres par MatchFeed depuis le curseur de chaque exercice.
+        """
         puuids = await self.db.get_all_exercise_users()
         if not puuids:
             return
@@ -200,113 +129,153 @@ class TrainingExercises:
                 traceback.print_exc()
 
     async def _process_player(self, riot_puuid: str):
-        """Traite les exercices d'un joueur"""
+        """Traite les exercices d'un joueur sur ses matchs ingeres depuis chaque curseur"""
         enabled = await self.db.get_enabled_exercises(riot_puuid)
         if not enabled:
             return
 
-        # Find the oldest last_match_id cursor across all exercises
-        # (to minimize API calls, process from the earliest unprocessed point)
-        last_match_ids = {}
-        oldest_cursor = None  # None means never processed
-        has_null_cursor = False
+        # processed_until -> matchs ingeres apres (exercices au meme curseur)
+        delivered: Dict[int, List[Dict[str, Any]]] = {}
 
-        for ex in enabled:
-            ex_id = ex['exercise_id']
-            lm = ex.get('last_match_id')
-            last_match_ids[ex_id] = lm
-            if lm is None:
-                has_null_cursor = True
-
-        # Fetch recent ranked matches
-        season_start_ts = int(
-            datetime.strptime(config.SEASON_START_DATE, '%Y-%m-%d')
-            .replace(tzinfo=PARIS_TZ)
-            .timestamp()
-        )
+        # Matches to evaluate, each with the exercises that still need it
+        pending: Dict[str, Dict[str, Any]] = {}
+        # exercise_id -> last match to process (cursor)
+        last_rows: Dict[str, Dict[str, Any]] = {}
+        latest_row: Optional[Dict[str, Any]] = None
 
-        all_match_ids = []
-        page_start = 0
-        while True:
-            batch = await self.api.get_match_history(
-                puuid=riot_puuid,
-                start=page_start,
-                count=100,
-                queue=420,
-                start_time=season_start_ts
-            )
-            if not batch:
-                break
-            all_match_ids.extend(batch)
-            if len(batch) < 100:
-                break
-            page_start += 100
-
-        if not all_match_ids:
-            return
-
-        # For each exercise, find which matches are new
         for ex in enabled:
             ex_id = ex['exercise_id']
             exercise_def = config.TRAINING_EXERCISES.get(ex_id)
             if not exercise_def:
                 continue
 
-            cursor = last_match_ids.get(ex_id)
+            cursor = ex.get('last_match_id')
+
+            if cursor is None:
+                # Newly enabled: track from the latest stored match. Past
+                # games are only evaluated by the opt-in backfill job
+                if latest_row is None:
+                    latest_row = await self.get_latest_ranked_match(riot_puuid)
+                if latest_row:
+                    last_rows[ex_id] = latest_row
+                continue
+            else:
+                processed_until = await self._cursor_time(riot_puuid, ex_id, cursor)
+                if processed_until is None:
+                    # Cursor match no longer stored: resume from the activation date
+                    processed_until = self._enabled_time(ex)
+                if processed_until not in delivered:
+                    delivered[processed_until] = await self.db.get_delivered_matches(riot_puuid, processed_until)
+                rows = delivered[processed_until]
+
+            if not rows:
+                continue
+
+            for player_data in rows:
+                entry = pending.setdefault(player_data['match_id'], {'row': player_data, 'exercises': []})
+                entry['exercises'].append((ex_id, exercise_def))
+            last_rows[ex_id] = rows[-1]
+
+        if not last_rows:
+            return
+
+        # Match-major: each timeline is fetched and indexed once for all exercises
+        attempts = []
+        for match_id, entry in sorted(pending.items(), key=lambda item: item[1]['row'].get('gameCreation', 0)):
+            player_data = entry['row']
+            try:
+                participant_id = player_data.get('participantId')
+                if not participant_id:
+                    continue
+
+                timeline = await self.get_timeline(match_id)
+                if not timeline:
+                    continue
 
-            # Find new matches after cursor
-            new_match_ids = []
-            for match_id in all_match_ids:
-                if match_id == cursor:
-                    break
-                new_match_ids.append(match_id)
+                attempts.extend(self.evaluate_match(player_data, timeline, entry['exercises']))
+            except Exception as e:
+                print(f"[Exercises] Erreur match {match_id}: {e}")
+                traceback.print_exc()
 
-            if not new_match_ids:
-                # No new matches, but if cursor is None, set it to latest
-                if cursor is None and all_match_ids:
-                    await self.db.update_exercise_last_match(riot_puuid, ex_id, all_match_ids[0])
+        # Attempts and cursors are written together
+        await self.db.save_exercise_results(
+            riot_puuid, attempts, {ex_id: row['match_id'] for ex_id, row in last_rows.items()}
+        )
+        for ex_id, row in last_rows.items():
+            await self.db.set_match_cursor(riot_puuid, f"exercise:{ex_id}", row['match_id'], row['gameCreation'])
+
+    def evaluate_match(
+        self,
+        player_data: Dict[str, Any],
+        timeline: TimelineIndex,
+        exercises: List[Tuple[str, Dict]]
+    ) -> List[Tuple[str, str, bool, int]]:
+        """
+        Evalue des exercices sur un match.
+        Retourne les tentatives (exercise_id, match_id, success, match_timestamp).
+        """
+        participant_id = player_data.get('participantId')
+        match_duration_ms = player_data.get('gameDuration', 0) * 1000
+        match_timestamp = player_data.get('gameCreation', 0)
+
+        attempts = []
+        for ex_id, exercise_def in exercises:
+            # Check if match was long enough for the exercise conditions
+            max_time = max(c.get('time_ms', 0) for c in exercise_def.get('conditions', []))
+            if match_duration_ms < max_time:
+                # Game ended before the exercise time window - skip
                 continue
 
-            # Process oldest first
-            new_match_ids.reverse()
-
-            for match_id in new_match_ids:
-                try:
-                    match_data = await self.api.get_match(match_id)
-                    if not match_data:
-                        continue
-
-                    timeline_data = await self.api.get_match_timeline(match_id)
-                    if not timeline_data:
-                        continue
-
-                    participant_id = self._find_participant_id(match_data, riot_puuid)
-                    if not participant_id:
-                        continue
-
-                    frames = timeline_data.get('info', {}).get('frames', [])
-                    if not frames:
-                        continue
-
-                    # Check if match was long enough for the exercise conditions
-                    match_duration_ms = match_data.get('info', {}).get('gameDuration', 0) * 1000
-                    max_time = max(c.get('time_ms', 0) for c in exercise_def.get('conditions', []))
-                    if match_duration_ms < max_time:
-                        # Game ended before the exercise time window - skip
-                        continue
-
-                    success = self._evaluate_exercise(exercise_def, frames, participant_id)
-                    match_timestamp = match_data.get('info', {}).get('gameCreation', 0)
-
-                    await self.db.record_exercise_attempt(
-                        riot_puuid, ex_id, match_id, success, match_timestamp
-                    )
-                except Exception as e:
-                    print(f"[Exercises] Erreur match {match_id}: {e}")
-                    traceback.print_exc()
-
-            # Update cursor to latest match
-            await self.db.update_exercise_last_match(riot_puuid, ex_id, all_match_ids[0])
+            success = self._evaluate_exercise(exercise_def, timeline, participant_id)
+            attempts.append((ex_id, player_data['match_id'], success, match_timestamp))
+        return attempts
+
+    async def get_latest_ranked_match(self, riot_puuid: str) -> Optional[Dict[str, Any]]:
+        """Dernier match classe stocke du joueur (None si aucun)"""
+        rows = await self.db.get_player_matches(riot_puuid, queue_id=420, limit=1)
+        return rows[0] if rows else None
+
+    async def start_tracking(self, riot_puuid: str, exercise_id: str) -> Optional[Dict[str, Any]]:
+        """Place le curseur d'un exercice sur le dernier match stocke; retourne ce match"""
+        latest_row = await self.get_latest_ranked_match(riot_puuid)
+        if latest_row:
+            await self.db.save_exercise_results(riot_puuid, [], {exercise_id: latest_row['match_id']})
+            await self.db.set_match_cursor(
+                riot_puuid, f"exercise:{exercise_id}", latest_row['match_id'], latest_row['gameCreation']
+            )
+        return latest_row
+
+    async def get_timeline(self, match_id: str, low_priority: bool = False) -> Optional[TimelineIndex]:
+        """
+        Features de timeline d'un match: lues en base, sinon extraites de la
+        timeline Riot (non mise en cache) puis stockees.
+        """
+        blob = await self.db.get_timeline_features(match_id)
+        if blob:
+            timeline = TimelineIndex.unpack(blob)
+            if timeline:
+                return timeline
+
+        timeline = TimelineIndex.from_timeline(
+            await self.api.get_match_timeline(match_id, use_cache=False, low_priority=low_priority)
+        )
+        if timeline:
+            await self.db.save_timeline_features(match_id, timeline.pack())
+        return timeline
+
+    async def _cursor_time(self, riot_puuid: str, exercise_id: str, last_match_id: str) -> Optional[int]:
+        """gameCreation du dernier match traite pour un exercice"""
+        match_cursor = await self.db.get_match_cursor(riot_puuid, f"exercise:{exercise_id}")
+        if match_cursor and match_cursor['last_match_id'] == last_match_id:
+            return match_cursor['last_match_time']
+        row = await self.api.get_match_participant(last_match_id, riot_puuid)
+        return row['gameCreation'] if row else None
+
+    @staticmethod
+    def _enabled_time(exercise: Dict[str, Any]) -> int:
+        """Date d'activation d'un exercice (enabled_at, UTC) en ms epoch"""
+        enabled_at = datetime.strptime(exercise['enabled_at'], '%Y-%m-%d %H:%M:%S')
+        return int(enabled_at.replace(tzinfo=timezone.utc).timestamp()) * 1000
 
     # ==================== Embed Generators ====================
 
@@ -3,15 +3,50 @@ Module Weekly Challenges - Gestion des defis hebdomadaires
 """
 import random
 import traceback
+from collections import defaultdict
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import discord
 
 import config
+from database.player_stats import PlayerStats
+from modules.challenge_conditions import StatSnapshot, compile_challenges, evaluate_challenges
+from modules.match_feed import season_start_ms
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
+
+class WeekCompletions:
+    """
+    Completions d'une semaine indexees en memoire.
+
+    Chargees en une seule requete puis tenues a jour au fil des
+    enregistrements, pour toute une passe de verification.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        # (challenge_id, discord_id) -> completion
+        self._by_player: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # challenge_id -> completions, dans l'ordre de completion
+        self._by_challenge: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: Dict[str, Any]):
+        """Ajoute une completion (deja enregistree en base)"""
+        self._by_player[(row['challenge_id'], row['discord_id'])] = row
+        self._by_challenge[row['challenge_id']].append(row)
+
+    def get(self, challenge_id: str, discord_id: str) -> Optional[Dict[str, Any]]:
+        """Completion d'un joueur pour un challenge, ou None"""
+        return self._by_player.get((challenge_id, discord_id))
+
+    def for_challenge(self, challenge_id: str) -> List[Dict[str, Any]]:
+        """Completions d'un challenge, la premiere en tete"""
+        return self._by_challenge.get(challenge_id, [])
+
+
 class WeeklyChallenges:
     """Gestion des challenges hebdomadaires"""
 
@@ -19,6 +54,8 @@ class WeeklyChallenges:
         self.api = riot_api
         self.db = db_manager
         self.bot = bot
+        # Definitions compilees une seule fois: (challenge_type, challenge_id) -> predicat
+        self.challenges = compile_challenges()
 
     def get_current_week_start(self) -> str:
         """Retourne la date du lundi de la semaine courante (format YYYY-MM-DD)"""
@@ -26,6 +63,10 @@ class WeeklyChallenges:
         monday = now - timedelta(days=now.weekday())
         return monday.strftime('%Y-%m-%d')
 
+    async def load_completions(self, week_start: str) -> WeekCompletions:
+        """Charge toutes les completions de la semaine en une requete"""
+        return WeekCompletions(await self.db.get_week_completions(week_start))
+
     async def initialize_weekly_challenges(self) -> tuple[List[Dict[str, Any]], bool]:
         """
         Initialise les challenges pour une nouvelle semaine.
@@ -87,270 +128,88 @@ class WeeklyChallenges:
 
     async def check_all_players(self) -> List[Dict[str, Any]]:
         """
-        Verifie la progression de tous les joueurs enregistres.
-        Retourne la liste des completions a annoncer.
+        Verifie la progression de tous les joueurs enregistres, depuis les
+        matchs ingeres par MatchFeed. Retourne la liste des completions a annoncer.
         """
         completions = []
         week_start = self.get_current_week_start()
 
         users = await self.db.get_all_primary_users()
+        week_completions = await self.load_completions(week_start)
 
+        # Players are handled sequentially, in user order, so that
+        # "first to complete" stays deterministic
         for user in users:
-            discord_id = user['discord_id']
-            riot_puuid = user['riot_puuid']
-            game_name = user['game_name']
-
-            # Update weekly stats from new matches
-            latest_match = await self._update_player_stats(riot_puuid, week_start)
-
-            # Check challenge completions
-            player_completions = await self._check_player_challenges(
-                discord_id=discord_id,
-                riot_puuid=riot_puuid,
-                game_name=game_name,
-                tag_line=user['tag_line'],
-                week_start=week_start,
-                latest_match_id=latest_match
-            )
+            try:
+                # Update weekly stats from new matches
+                latest_match = await self._update_player_stats(user['riot_puuid'], week_start)
+
+                # Check challenge completions
+                player_completions = await self._check_player_challenges(
+                    discord_id=user['discord_id'],
+                    riot_puuid=user['riot_puuid'],
+                    game_name=user['game_name'],
+                    tag_line=user['tag_line'],
+                    week_start=week_start,
+                    week_completions=week_completions,
+                    latest_match_id=latest_match
+                )
+            except Exception as e:
+                print(f"[Challenges] Error checking {user['game_name']}: {e}")
+                traceback.print_exc()
+                continue
 
             completions.extend(player_completions)
 
         return completions
 
-    async def _update_player_stats(self, riot_puuid: str, week_start: str) -> Optional[str]:
-        """Met a jour les stats hebdomadaires ET split d'un joueur depuis ses matchs recents.
+    async def _update_player_stats(
+        self,
+        riot_puuid: str,
+        week_start: str
+    ) -> Optional[str]:
+        """Met a jour les stats hebdomadaires ET split d'un joueur depuis ses matchs recents
+        (lignes match_participants ingerees par le feed, apres le curseur 'challenges').
         Retourne le dernier match_id traite, ou None."""
         try:
             season_split = config.CURRENT_SEASON_SPLIT
 
-            # Get cached weekly stats to find last processed match
-            cached_weekly = await self.db.get_all_weekly_stats(riot_puuid, week_start)
-            cached_split = await self.db.get_all_split_stats(riot_puuid, season_split)
-
-            last_match_id = None
-            if cached_weekly:
-                for stat_data in cached_weekly.values():
-                    if stat_data.get('last_match_id'):
-                        last_match_id = stat_data['last_match_id']
-                        break
-
-            # Compute season start timestamp for API filtering
-            season_start_ts = int(
-                datetime.strptime(config.SEASON_START_DATE, '%Y-%m-%d')
-                .replace(tzinfo=PARIS_TZ)
-                .timestamp()
-            )
-
-            # Fetch all ranked matches since season start (paginated, 100 per page)
-            all_match_ids = []
-            page_start = 0
-            while True:
-                batch = await self.api.get_match_history(
-                    puuid=riot_puuid,
-                    start=page_start,
-                    count=100,
-                    queue=420,  # Ranked Solo/Duo
-                    start_time=season_start_ts
-                )
-                if not batch:
-                    break
-                all_match_ids.extend(batch)
-                if len(batch) < 100:
-                    break
-                page_start += 100
-
-            if not all_match_ids:
-                return None
-
-            # Find new matches (stop at last processed match)
-            new_match_ids = []
-            for match_id in all_match_ids:
-                if match_id == last_match_id:
-                    break
-                new_match_ids.append(match_id)
-
-            if not new_match_ids:
+            # Current weekly and split aggregates (one row each)
+            stats = await self.db.get_weekly_player_stats(riot_puuid, week_start) or PlayerStats()
+            split_stats = await self.db.get_split_player_stats(riot_puuid, season_split) or PlayerStats()
+            last_match_id = stats.last_match_id
+
+            # Only games after the last processed one (cursor, or stats written
+            # before the feed existed); the whole season on the first pass
+            processed_until = season_start_ms() - 1
+            match_cursor = await self.db.get_match_cursor(riot_puuid, 'challenges')
+            if match_cursor:
+                processed_until = match_cursor['last_match_time']
+            elif last_match_id:
+                last_row = await self.api.get_match_participant(last_match_id, riot_puuid)
+                if last_row:
+                    processed_until = last_row['gameCreation']
+
+            new_rows = await self.db.get_delivered_matches(riot_puuid, processed_until)
+            if not new_rows:
                 return None
 
-            # Process new matches (oldest first)
-            new_match_ids.reverse()
-
-            # Initialize all stats from cache or defaults
-            def get_weekly(key, default=0):
-                return cached_weekly.get(key, {}).get('stat_value', default)
-
-            def get_split(key, default=0):
-                return cached_split.get(key, {}).get('stat_value', default)
-
-            stats = {
-                # Cumulative stats (sum across all games)
-                'gold_earned': get_weekly('gold_earned'),
-                'gold_spent': get_weekly('gold_spent'),
-                'kills': get_weekly('kills'),
-                'deaths': get_weekly('deaths'),
-                'assists': get_weekly('assists'),
-                'wins': get_weekly('wins'),
-                'losses': get_weekly('losses'),
-                'games_played': get_weekly('games_played'),
-
-                # Damage
-                'damage_dealt': get_weekly('damage_dealt'),
-                'damage_dealt_physical': get_weekly('damage_dealt_physical'),
-                'damage_dealt_magic': get_weekly('damage_dealt_magic'),
-                'damage_dealt_true': get_weekly('damage_dealt_true'),
-                'damage_taken': get_weekly('damage_taken'),
-
-                # Objectives
-                'turret_kills': get_weekly('turret_kills'),
-                'turret_takedowns': get_weekly('turret_takedowns'),
-                'inhibitor_kills': get_weekly('inhibitor_kills'),
-                'dragon_kills': get_weekly('dragon_kills'),
-                'baron_kills': get_weekly('baron_kills'),
-                'rift_herald_kills': get_weekly('rift_herald_kills'),
-
-                # Vision
-                'vision_score_total': get_weekly('vision_score_total'),
-                'wards_placed': get_weekly('wards_placed'),
-                'wards_killed': get_weekly('wards_killed'),
-                'control_wards_placed': get_weekly('control_wards_placed'),
-
-                # Farm
-                'cs_total': get_weekly('cs_total'),
-                'jungle_cs': get_weekly('jungle_cs'),
-
-                # Multi-kills
-                'double_kills': get_weekly('double_kills'),
-                'triple_kills': get_weekly('triple_kills'),
-                'quadra_kills': get_weekly('quadra_kills'),
-                'penta_kills': get_weekly('penta_kills'),
-
-                # First objectives
-                'first_blood_kills': get_weekly('first_blood_kills'),
-                'first_blood_assists': get_weekly('first_blood_assists'),
-                'first_tower_kills': get_weekly('first_tower_kills'),
-
-                # CC
-                'cc_time': get_weekly('cc_time'),
-
-                # Time
-                'time_played': get_weekly('time_played'),
-                'longest_life': get_weekly('longest_life'),
-                'time_dead': get_weekly('time_dead'),
-
-                # Per-game records (max/min)
-                'max_kills_game': get_weekly('max_kills_game'),
-                'max_deaths_game': get_weekly('max_deaths_game'),
-                'max_cs_game': get_weekly('max_cs_game'),
-                'max_damage_game': get_weekly('max_damage_game'),
-                'max_gold_game': get_weekly('max_gold_game'),
-                'max_vision_game': get_weekly('max_vision_game'),
-                'min_vision_game': get_weekly('min_vision_game', 999),
-                'min_damage_game': get_weekly('min_damage_game', 999999),
-                'max_cs_per_min': get_weekly('max_cs_per_min'),
-                'max_damage_taken_game': get_weekly('max_damage_taken_game'),
-
-                # Special achievements (count of games where condition met)
-                'games_with_penta': get_weekly('games_with_penta'),
-                'games_with_quadra': get_weekly('games_with_quadra'),
-                'games_with_triple': get_weekly('games_with_triple'),
-                'games_with_double': get_weekly('games_with_double'),
-                'games_11cs_min': get_weekly('games_11cs_min'),
-                'games_zero_deaths': get_weekly('games_zero_deaths'),
-                'games_20_kills': get_weekly('games_20_kills'),
-                'win_no_defensive': get_weekly('win_no_defensive'),
-                'games_baron_and_dragon': get_weekly('games_baron_and_dragon'),
-
-                # Unique tracking
-                'unique_champ_wins': get_weekly('unique_champ_wins'),
-            }
-            games_counted = int(cached_weekly.get('games_played', {}).get('games_counted', 0))
-
-            # Initialize split stats (same structure, different source)
-            split_stats = {
-                'gold_earned': get_split('gold_earned'),
-                'gold_spent': get_split('gold_spent'),
-                'kills': get_split('kills'),
-                'deaths': get_split('deaths'),
-                'assists': get_split('assists'),
-                'wins': get_split('wins'),
-                'losses': get_split('losses'),
-                'games_played': get_split('games_played'),
-                'damage_dealt': get_split('damage_dealt'),
-                'damage_taken': get_split('damage_taken'),
-                'turret_kills': get_split('turret_kills'),
-                'turret_takedowns': get_split('turret_takedowns'),
-                'dragon_kills': get_split('dragon_kills'),
-                'baron_kills': get_split('baron_kills'),
-                'vision_score_total': get_split('vision_score_total'),
-                'wards_placed': get_split('wards_placed'),
-                'wards_killed': get_split('wards_killed'),
-                'control_wards_placed': get_split('control_wards_placed'),
-                'cs_total': get_split('cs_total'),
-                'jungle_cs': get_split('jungle_cs'),
-                'double_kills': get_split('double_kills'),
-                'triple_kills': get_split('triple_kills'),
-                'quadra_kills': get_split('quadra_kills'),
-                'penta_kills': get_split('penta_kills'),
-                'first_blood_kills': get_split('first_blood_kills'),
-                'first_tower_kills': get_split('first_tower_kills'),
-                'cc_time': get_split('cc_time'),
-                'time_played': get_split('time_played'),
-                'games_with_penta': get_split('games_with_penta'),
-                'games_with_quadra': get_split('games_with_quadra'),
-                'games_zero_deaths': get_split('games_zero_deaths'),
-                'games_20_kills': get_split('games_20_kills'),
-                'games_11cs_min': get_split('games_11cs_min'),
-                'unique_champ_wins': get_split('unique_champ_wins'),
-                'games_baron_and_dragon': get_split('games_baron_and_dragon'),
-                # Max records (for split)
-                'max_kills_game': get_split('max_kills_game'),
-                'max_cs_per_min': get_split('max_cs_per_min'),
-                'max_damage_game': get_split('max_damage_game'),
-            }
-            split_games_counted = int(cached_split.get('games_played', {}).get('games_counted', 0))
-
-            # Track champions won on (for split)
-            # Stored as comma-separated string in last_match_id (TEXT column)
-            split_champs_won = set()
-            split_champs_str = cached_split.get('champs_won_list', {}).get('last_match_id', '')
-            if split_champs_str and isinstance(split_champs_str, str):
-                split_champs_won = set(split_champs_str.split(','))
-                split_champs_won.discard('')
-
-            # Track champions won on (for week)
-            champs_won = set()
-            champs_won_str = cached_weekly.get('champs_won_list', {}).get('last_match_id', '')
-            if champs_won_str and isinstance(champs_won_str, str):
-                champs_won = set(champs_won_str.split(','))
-                champs_won.discard('')
-
-            # Process each new match
-            for match_id in new_match_ids:
-                match_data = await self.api.get_match(match_id)
-                if not match_data:
-                    continue
+            # Champions won on (week / split)
+            champs_won = stats.champs_won
+            split_champs_won = split_stats.champs_won
 
+            # Process each new match (oldest first)
+            for player_data in new_rows:
                 # Check if match is from this week
-                match_timestamp = match_data.get('info', {}).get('gameCreation', 0) / 1000
+                match_timestamp = player_data.get('gameCreation', 0) / 1000
                 match_date = datetime.fromtimestamp(match_timestamp, PARIS_TZ)
                 week_start_date = datetime.strptime(week_start, '%Y-%m-%d').replace(tzinfo=PARIS_TZ)
 
                 if match_date < week_start_date:
                     continue
 
-                # Find player data
-                participants = match_data.get('info', {}).get('participants', [])
-                player_data = None
-                for p in participants:
-                    if p.get('puuid') == riot_puuid:
-                        player_data = p
-                        break
-
-                if not player_data:
-                    continue
-
                 # Get game duration in minutes
-                game_duration_sec = match_data.get('info', {}).get('gameDuration', 0)
+                game_duration_sec = player_data.get('gameDuration', 0)
                 game_duration_min = game_duration_sec / 60 if game_duration_sec > 0 else 1
 
                 # Extract all stats from match
@@ -372,7 +231,7 @@ class WeeklyChallenges:
                 inhibitor_kills = player_data.get('inhibitorKills', 0)
                 dragon_kills = player_data.get('dragonKills', 0)
                 baron_kills = player_data.get('baronKills', 0)
-                rift_herald_kills = player_data.get('challenges', {}).get('riftHeraldTakedowns', 0)
+                rift_herald_kills = player_data.get('riftHeraldTakedowns', 0)
 
                 vision_score = player_data.get('visionScore', 0)
                 wards_placed = player_data.get('wardsPlaced', 0)
@@ -400,213 +259,180 @@ class WeeklyChallenges:
                 champion_id = player_data.get('championId', 0)
 
                 # Update cumulative stats (WEEKLY)
-                stats['gold_earned'] += gold_earned
-                stats['gold_spent'] += gold_spent
-                stats['kills'] += kills
-                stats['deaths'] += deaths
-                stats['assists'] += assists
-                stats['games_played'] += 1
-                games_counted += 1
+                stats.gold_earned += gold_earned
+                stats.gold_spent += gold_spent
+                stats.kills += kills
+                stats.deaths += deaths
+                stats.assists += assists
+                stats.games_played += 1
+                stats.games_counted += 1
 
                 if won:
-                    stats['wins'] += 1
+                    stats.wins += 1
                     champs_won.add(str(champion_id))
                 else:
-                    stats['losses'] += 1
-
-                stats['damage_dealt'] += damage_dealt
-                stats['damage_dealt_physical'] += damage_physical
-                stats['damage_dealt_magic'] += damage_magic
-                stats['damage_dealt_true'] += damage_true
-                stats['damage_taken'] += damage_taken
-
-                stats['turret_kills'] += turret_kills
-                stats['turret_takedowns'] += turret_takedowns
-                stats['inhibitor_kills'] += inhibitor_kills
-                stats['dragon_kills'] += dragon_kills
-                stats['baron_kills'] += baron_kills
-                stats['rift_herald_kills'] += rift_herald_kills
-
-                stats['vision_score_total'] += vision_score
-                stats['wards_placed'] += wards_placed
-                stats['wards_killed'] += wards_killed
-                stats['control_wards_placed'] += control_wards
-
-                stats['cs_total'] += total_cs
-                stats['jungle_cs'] += jungle_cs
-
-                stats['double_kills'] += double_kills
-                stats['triple_kills'] += triple_kills
-                stats['quadra_kills'] += quadra_kills
-                stats['penta_kills'] += penta_kills
+                    stats.losses += 1
+
+                stats.damage_dealt += damage_dealt
+                stats.damage_dealt_physical += damage_physical
+                stats.damage_dealt_magic += damage_magic
+                stats.damage_dealt_true += damage_true
+                stats.damage_taken += damage_taken
+
+                stats.turret_kills += turret_kills
+                stats.turret_takedowns += turret_takedowns
+                stats.inhibitor_kills += inhibitor_kills
+                stats.dragon_kills += dragon_kills
+                stats.baron_kills += baron_kills
+                stats.rift_herald_kills += rift_herald_kills
+
+                stats.vision_score_total += vision_score
+                stats.wards_placed += wards_placed
+                stats.wards_killed += wards_killed
+                stats.control_wards_placed += control_wards
+
+                stats.cs_total += total_cs
+                stats.jungle_cs += jungle_cs
+
+                stats.double_kills += double_kills
+                stats.triple_kills += triple_kills
+                stats.quadra_kills += quadra_kills
+                stats.penta_kills += penta_kills
 
                 if first_blood_kill:
-                    stats['first_blood_kills'] += 1
+                    stats.first_blood_kills += 1
                 if first_blood_assist:
-                    stats['first_blood_assists'] += 1
+                    stats.first_blood_assists += 1
                 if first_tower_kill:
-                    stats['first_tower_kills'] += 1
+                    stats.first_tower_kills += 1
 
-                stats['cc_time'] += cc_time
-                stats['time_played'] += game_duration_sec
-                stats['time_dead'] += time_dead
-                if longest_life > stats['longest_life']:
-                    stats['longest_life'] = longest_life
+                stats.cc_time += cc_time
+                stats.time_played += game_duration_sec
+                stats.time_dead += time_dead
+                if longest_life > stats.longest_life:
+                    stats.longest_life = longest_life
 
                 # Update max/min records (WEEKLY)
-                if kills > stats['max_kills_game']:
-                    stats['max_kills_game'] = kills
-                if deaths > stats['max_deaths_game']:
-                    stats['max_deaths_game'] = deaths
-                if total_cs > stats['max_cs_game']:
-                    stats['max_cs_game'] = total_cs
-                if damage_dealt > stats['max_damage_game']:
-                    stats['max_damage_game'] = damage_dealt
-                if gold_earned > stats['max_gold_game']:
-                    stats['max_gold_game'] = gold_earned
-                if vision_score > stats['max_vision_game']:
-                    stats['max_vision_game'] = vision_score
-                if vision_score < stats['min_vision_game']:
-                    stats['min_vision_game'] = vision_score
-                if damage_dealt < stats['min_damage_game']:
-                    stats['min_damage_game'] = damage_dealt
-                if cs_per_min > stats['max_cs_per_min']:
-                    stats['max_cs_per_min'] = cs_per_min
-                if damage_taken > stats['max_damage_taken_game']:
-                    stats['max_damage_taken_game'] = damage_taken
+                if kills > stats.max_kills_game:
+                    stats.max_kills_game = kills
+                if deaths > stats.max_deaths_game:
+                    stats.max_deaths_game = deaths
+                if total_cs > stats.max_cs_game:
+                    stats.max_cs_game = total_cs
+                if damage_dealt > stats.max_damage_game:
+                    stats.max_damage_game = damage_dealt
+                if gold_earned > stats.max_gold_game:
+                    stats.max_gold_game = gold_earned
+                if vision_score > stats.max_vision_game:
+                    stats.max_vision_game = vision_score
+                if vision_score < stats.min_vision_game:
+                    stats.min_vision_game = vision_score
+                if damage_dealt < stats.min_damage_game:
+                    stats.min_damage_game = damage_dealt
+                if cs_per_min > stats.max_cs_per_min:
+                    stats.max_cs_per_min = cs_per_min
+                if damage_taken > stats.max_damage_taken_game:
+                    stats.max_damage_taken_game = damage_taken
 
                 # Special achievements (WEEKLY)
                 if penta_kills > 0:
-                    stats['games_with_penta'] += 1
+                    stats.games_with_penta += 1
                 if quadra_kills > 0:
-                    stats['games_with_quadra'] += 1
+                    stats.games_with_quadra += 1
                 if triple_kills > 0:
-                    stats['games_with_triple'] += 1
+                    stats.games_with_triple += 1
                 if double_kills > 0:
-                    stats['games_with_double'] += 1
+                    stats.games_with_double += 1
                 if cs_per_min >= 11:
-                    stats['games_11cs_min'] += 1
+                    stats.games_11cs_min += 1
                 if deaths == 0:
-                    stats['games_zero_deaths'] += 1
+                    stats.games_zero_deaths += 1
                 if kills >= 20:
-                    stats['games_20_kills'] += 1
+                    stats.games_20_kills += 1
                 if baron_kills > 0 and dragon_kills > 0:
-                    stats['games_baron_and_dragon'] += 1
+                    stats.games_baron_and_dragon += 1
 
                 # ===================== SPLIT STATS =====================
-                split_stats['gold_earned'] += gold_earned
-                split_stats['gold_spent'] += gold_spent
-                split_stats['kills'] += kills
-                split_stats['deaths'] += deaths
-                split_stats['assists'] += assists
-                split_stats['games_played'] += 1
-                split_games_counted += 1
+                split_stats.gold_earned += gold_earned
+                split_stats.gold_spent += gold_spent
+                split_stats.kills += kills
+                split_stats.deaths += deaths
+                split_stats.assists += assists
+                split_stats.games_played += 1
+                split_stats.games_counted += 1
 
                 if won:
-                    split_stats['wins'] += 1
+                    split_stats.wins += 1
                     split_champs_won.add(str(champion_id))
                 else:
-                    split_stats['losses'] += 1
-
-                split_stats['damage_dealt'] += damage_dealt
-                split_stats['damage_taken'] += damage_taken
-                split_stats['turret_kills'] += turret_kills
-                split_stats['turret_takedowns'] += turret_takedowns
-                split_stats['dragon_kills'] += dragon_kills
-                split_stats['baron_kills'] += baron_kills
-                split_stats['vision_score_total'] += vision_score
-                split_stats['wards_placed'] += wards_placed
-                split_stats['wards_killed'] += wards_killed
-                split_stats['control_wards_placed'] += control_wards
-                split_stats['cs_total'] += total_cs
-                split_stats['jungle_cs'] += jungle_cs
-                split_stats['double_kills'] += double_kills
-                split_stats['triple_kills'] += triple_kills
-                split_stats['quadra_kills'] += quadra_kills
-                split_stats['penta_kills'] += penta_kills
-                split_stats['cc_time'] += cc_time
-                split_stats['time_played'] += game_duration_sec
+                    split_stats.losses += 1
+
+                split_stats.damage_dealt += damage_dealt
+                split_stats.damage_taken += damage_taken
+                split_stats.turret_kills += turret_kills
+                split_stats.turret_takedowns += turret_takedowns
+                split_stats.dragon_kills += dragon_kills
+                split_stats.baron_kills += baron_kills
+                split_stats.vision_score_total += vision_score
+                split_stats.wards_placed += wards_placed
+                split_stats.wards_killed += wards_killed
+                split_stats.control_wards_placed += control_wards
+                split_stats.cs_total += total_cs
+                split_stats.jungle_cs += jungle_cs
+                split_stats.double_kills += double_kills
+                split_stats.triple_kills += triple_kills
+                split_stats.quadra_kills += quadra_kills
+                split_stats.penta_kills += penta_kills
+                split_stats.cc_time += cc_time
+                split_stats.time_played += game_duration_sec
 
                 if first_blood_kill:
-                    split_stats['first_blood_kills'] += 1
+                    split_stats.first_blood_kills += 1
                 if first_tower_kill:
-                    split_stats['first_tower_kills'] += 1
+                    split_stats.first_tower_kills += 1
 
                 # Max records (SPLIT)
-                if kills > split_stats['max_kills_game']:
-                    split_stats['max_kills_game'] = kills
-                if cs_per_min > split_stats['max_cs_per_min']:
-                    split_stats['max_cs_per_min'] = cs_per_min
-                if damage_dealt > split_stats['max_damage_game']:
-                    split_stats['max_damage_game'] = damage_dealt
+                if kills > split_stats.max_kills_game:
+                    split_stats.max_kills_game = kills
+                if cs_per_min > split_stats.max_cs_per_min:
+                    split_stats.max_cs_per_min = cs_per_min
+                if damage_dealt > split_stats.max_damage_game:
+                    split_stats.max_damage_game = damage_dealt
 
                 # Special achievements (SPLIT)
                 if penta_kills > 0:
-                    split_stats['games_with_penta'] += 1
+                    split_stats.games_with_penta += 1
                 if quadra_kills > 0:
-                    split_stats['games_with_quadra'] += 1
+                    split_stats.games_with_quadra += 1
                 if deaths == 0:
-                    split_stats['games_zero_deaths'] += 1
+                    split_stats.games_zero_deaths += 1
                 if kills >= 20:
-                    split_stats['games_20_kills'] += 1
+                    split_stats.games_20_kills += 1
                 if cs_per_min >= 11:
-                    split_stats['games_11cs_min'] += 1
+                    split_stats.games_11cs_min += 1
                 if baron_kills > 0 and dragon_kills > 0:
-                    split_stats['games_baron_and_dragon'] += 1
+                    split_stats.games_baron_and_dragon += 1
 
                 # Win without defensive items
                 if won:
                     has_defensive = self._check_defensive_items(player_data)
                     if not has_defensive:
-                        stats['win_no_defensive'] += 1
+                        stats.win_no_defensive += 1
 
             # Update unique champs won count
-            stats['unique_champ_wins'] = len(champs_won)
-            split_stats['unique_champ_wins'] = len(split_champs_won)
-
-            # Save all stats
-            latest_match = new_match_ids[-1] if new_match_ids else last_match_id
-
-            # Save WEEKLY stats
-            for stat_type, value in stats.items():
-                await self.db.update_weekly_stat(
-                    riot_puuid=riot_puuid,
-                    week_start=week_start,
-                    stat_type=stat_type,
-                    stat_value=float(value),
-                    games_counted=games_counted,
-                    last_match_id=latest_match
-                )
-
-            # Save champs won list as comma-separated string in last_match_id
-            await self.db.update_weekly_stat(
-                riot_puuid=riot_puuid,
-                week_start=week_start,
-                stat_type='champs_won_list',
-                stat_value=0,
-                games_counted=games_counted,
-                last_match_id=','.join(champs_won) if champs_won else ''
-            )
-
-            # Save SPLIT stats
-            for stat_type, value in split_stats.items():
-                await self.db.update_split_stat(
-                    riot_puuid=riot_puuid,
-                    season_split=season_split,
-                    stat_type=stat_type,
-                    stat_value=float(value),
-                    games_counted=split_games_counted,
-                    last_match_id=latest_match
-                )
-
-            # Save split champs won list
-            await self.db.update_split_stat(
-                riot_puuid=riot_puuid,
-                season_split=season_split,
-                stat_type='champs_won_list',
-                stat_value=0,
-                games_counted=split_games_counted,
-                last_match_id=','.join(split_champs_won) if split_champs_won else ''
+            stats.unique_champ_wins = len(champs_won)
+            split_stats.unique_champ_wins = len(split_champs_won)
+
+            # Save all stats (one row per player for the week and the split)
+            latest_match = new_rows[-1]['match_id']
+            stats.last_match_id = latest_match
+            split_stats.last_match_id = latest_match
+            await self.db.save_weekly_player_stats(riot_puuid, week_start, stats)
+            await self.db.save_split_player_stats(riot_puuid, season_split, split_stats)
+
+            # Advance the match cursor (flushed in the same transaction as the stats)
+            await self.db.set_match_cursor(
+                riot_puuid, 'challenges', latest_match, new_rows[-1]['gameCreation']
             )
 
             return latest_match
@@ -654,330 +480,90 @@ class WeeklyChallenges:
         game_name: str,
         tag_line: str,
         week_start: str,
+        week_completions: WeekCompletions,
         latest_match_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Verifie si un joueur a complete des challenges"""
         completions = []
 
         # Get player's weekly AND split stats
-        weekly_stats = await self.db.get_all_weekly_stats(riot_puuid, week_start)
-        split_stats = await self.db.get_all_split_stats(riot_puuid, config.CURRENT_SEASON_SPLIT)
+        weekly_stats = await self.db.get_weekly_player_stats(riot_puuid, week_start) or PlayerStats()
+        split_stats = await self.db.get_split_player_stats(riot_puuid, config.CURRENT_SEASON_SPLIT) or PlayerStats()
 
         # Get challenges for this player
         challenges = await self.db.get_weekly_challenges(week_start, discord_id)
 
+        pending = []
         for challenge_row in challenges:
             challenge_id = challenge_row['challenge_id']
-            challenge_type = challenge_row['challenge_type']
 
             # Check if already completed
-            existing = await self.db.get_challenge_completion(
-                challenge_id, week_start, discord_id
-            )
-            if existing:
+            if week_completions.get(challenge_id, discord_id):
                 continue
 
-            # Get challenge definition
-            if challenge_type == 'global':
-                challenge_def = config.GLOBAL_CHALLENGES.get(challenge_id)
-            else:
-                challenge_def = config.PERSONAL_CHALLENGES.get(challenge_id)
+            compiled = self.challenges.get((challenge_row['challenge_type'], challenge_id))
+            if compiled:
+                pending.append(compiled)
 
-            if not challenge_def:
-                continue
+        # Evaluate every pending challenge against the same snapshots
+        completed = evaluate_challenges(
+            pending, StatSnapshot(weekly_stats), StatSnapshot(split_stats)
+        )
 
-            # Use split stats if scope is 'split', otherwise use weekly
-            scope = challenge_def.get('scope', 'weekly')
-            stats = split_stats if scope == 'split' else weekly_stats
+        for challenge, multiplier in completed:
+            challenge_id = challenge.challenge_id
+            challenge_type = challenge.challenge_type
+            challenge_def = challenge.definition
 
-            # Check completion
-            completed, multiplier = self._check_challenge_completion(
-                challenge_def, stats
-            )
+            # Check if first to complete (for global)
+            is_first = False
+            if challenge_type == 'global':
+                is_first = not week_completions.for_challenge(challenge_id)
 
-            if completed:
-                # Check if first to complete (for global)
-                is_first = False
-                if challenge_type == 'global':
-                    existing_completions = await self.db.get_challenge_completions_for_week(
-                        challenge_id, week_start
-                    )
-                    is_first = len(existing_completions) == 0
-
-                # Calculate points
-                base_points = config.CHALLENGE_POINTS.get(
-                    challenge_def.get('difficulty', 'medium'),
-                    20
-                )
-                points = int(base_points * multiplier)
+            # Calculate points
+            points = int(challenge.base_points * multiplier)
 
-                if is_first:
-                    points = int(points * config.FIRST_COMPLETION_BONUS)
+            if is_first:
+                points = int(points * config.FIRST_COMPLETION_BONUS)
 
-                # Record completion
-                await self.db.record_challenge_completion(
-                    challenge_id=challenge_id,
-                    week_start=week_start,
-                    discord_id=discord_id,
-                    is_first=is_first,
-                    points_awarded=points
-                )
+            # Record completion
+            await self.db.record_challenge_completion(
+                challenge_id=challenge_id,
+                week_start=week_start,
+                discord_id=discord_id,
+                is_first=is_first,
+                points_awarded=points
+            )
+            week_completions.add({
+                'challenge_id': challenge_id,
+                'week_start': week_start,
+                'discord_id': discord_id,
+                'is_first': is_first,
+                'points_awarded': points,
+            })
 
-                # Add points to leaderboard
-                await self.db.add_challenge_points(
-                    discord_id=discord_id,
-                    season_split=config.CURRENT_SEASON_SPLIT,
-                    points=points
-                )
+            # Add points to leaderboard
+            await self.db.add_challenge_points(
+                discord_id=discord_id,
+                season_split=config.CURRENT_SEASON_SPLIT,
+                points=points
+            )
 
-                completions.append({
-                    'discord_id': discord_id,
-                    'game_name': game_name,
-                    'tag_line': tag_line,
-                    'challenge_id': challenge_id,
-                    'challenge_name': challenge_def.get('name', challenge_id),
-                    'challenge_type': challenge_type,
-                    'is_first': is_first,
-                    'points': points,
-                    'description': challenge_def.get('description', ''),
-                    'latest_match_id': latest_match_id,
-                })
+            completions.append({
+                'discord_id': discord_id,
+                'game_name': game_name,
+                'tag_line': tag_line,
+                'challenge_id': challenge_id,
+                'challenge_name': challenge_def.get('name', challenge_id),
+                'challenge_type': challenge_type,
+                'is_first': is_first,
+                'points': points,
+                'description': challenge_def.get('description', ''),
+                'latest_match_id': latest_match_id,
+            })
 
         return completions
 
-    def _check_challenge_completion(
-        self,
-        challenge_def: Dict,
-        stats: Dict[str, Dict]
-    ) -> Tuple[bool, float]:
-        """
-        Verifie si un challenge est complete.
-        Retourne (completed, multiplier).
-
-        Supports:
-        - Single condition: {'stat': 'kills', 'op': '>=', 'value': 100}
-        - Multiple conditions (AND): {'conditions': [...], 'logic': 'and'}
-        - Multiple conditions (OR): {'conditions': [...], 'logic': 'or'}
-        - Legacy format: {'stat_type': 'gold', 'target': 500000}
-        - Computed stats: 'avg_kda', 'weekly_winrate', 'cs_per_min_avg'
-        """
-        multiplier = 1.0
-
-        # Check minimum games requirement
-        min_games = challenge_def.get('min_games', 0)
-        games_played = stats.get('games_played', {}).get('stat_value', 0)
-        if min_games > 0 and games_played < min_games:
-            return False, 1.0
-
-        # New format with conditions array
-        if 'conditions' in challenge_def:
-            return self._check_multi_conditions(challenge_def, stats)
-
-        # New format with single condition
-        if 'stat' in challenge_def:
-            return self._check_single_condition(challenge_def, stats)
-
-        # Legacy format support
-        stat_type = challenge_def.get('stat_type')
-        target = challenge_def.get('target', 0)
-
-        # Direct stat mapping (most stats)
-        direct_stats = {
-            'gold': 'gold_earned',
-            'gold_earned': 'gold_earned',
-            'gold_spent': 'gold_spent',
-            'towers': 'turret_takedowns',
-            'turret_kills': 'turret_kills',
-            'turret_takedowns': 'turret_takedowns',
-            'damage_dealt': 'damage_dealt',
-            'damage_taken': 'damage_taken',
-            'kills': 'kills',
-            'deaths': 'deaths',
-            'assists': 'assists',
-            'penta_kills': 'penta_kills',
-            'quadra_kills': 'quadra_kills',
-            'triple_kills': 'triple_kills',
-            'double_kills': 'double_kills',
-            'first_blood_kills': 'first_blood_kills',
-            'first_tower_kills': 'first_tower_kills',
-            'baron_kills': 'baron_kills',
-            'dragon_kills': 'dragon_kills',
-            'cc_time': 'cc_time',
-            'vision_score_total': 'vision_score_total',
-            'wards_placed': 'wards_placed',
-            'control_wards_placed': 'control_wards_placed',
-            'cs_total': 'cs_total',
-            'jungle_cs': 'jungle_cs',
-            'games_played': 'games_played',
-            'wins': 'wins',
-            'losses': 'losses',
-            'win_no_defensive': 'win_no_defensive',
-            'unique_champ_wins': 'unique_champ_wins',
-            'games_with_penta': 'games_with_penta',
-            'games_with_quadra': 'games_with_quadra',
-            'games_with_triple': 'games_with_triple',
-            'games_11cs_min': 'games_11cs_min',
-            'games_zero_deaths': 'games_zero_deaths',
-            'games_baron_and_dragon': 'games_baron_and_dragon',
-            'max_cs_per_min': 'max_cs_per_min',
-            'max_damage_taken_game': 'max_damage_taken_game',
-        }
-
-        if stat_type in direct_stats:
-            current = stats.get(direct_stats[stat_type], {}).get('stat_value', 0)
-            return current >= target, 1.0
-
-        # Computed stats
-        if stat_type == 'avg_kda':
-            kills = stats.get('kills', {}).get('stat_value', 0)
-            deaths = stats.get('deaths', {}).get('stat_value', 0)
-            assists = stats.get('assists', {}).get('stat_value', 0)
-            kda = (kills + assists) / max(deaths, 1)
-            return kda >= target, 1.0
-
-        elif stat_type == 'weekly_winrate':
-            wins = stats.get('wins', {}).get('stat_value', 0)
-            losses = stats.get('losses', {}).get('stat_value', 0)
-            total = wins + losses
-            if total < min_games:
-                return False, 1.0
-            winrate = (wins / total) * 100 if total > 0 else 0
-            return winrate >= target, 1.0
-
-        elif stat_type == 'cs_per_min_avg':
-            cs = stats.get('cs_total', {}).get('stat_value', 0)
-            time_played = stats.get('time_played', {}).get('stat_value', 0)
-            time_min = time_played / 60 if time_played > 0 else 1
-            cs_per_min = cs / time_min
-            return cs_per_min >= target, 1.0
-
-        elif stat_type == 'avg_vision':
-            vision = stats.get('vision_score_total', {}).get('stat_value', 0)
-            games = stats.get('games_played', {}).get('stat_value', 1)
-            avg = vision / max(games, 1)
-            return avg >= target, 1.0
-
-        elif stat_type == 'win_streak':
-            # Checked via tilt detector separately
-            return False, 1.0
-
-        elif stat_type == 'assaf':
-            vision_min = stats.get('min_vision_game', {}).get('stat_value', 999)
-            damage_min = stats.get('min_damage_game', {}).get('stat_value', 999999)
-            if damage_min == 0:
-                return True, challenge_def.get('zero_damage_multiplier', 3.0)
-            elif vision_min < 10:
-                return True, 1.0
-            return False, 1.0
-
-        elif stat_type == 'lp_gain':
-            # TODO: Implement via rank history comparison
-            return False, 1.0
-
-        elif stat_type == 'wins_on_main':
-            # TODO: Track champion-specific wins
-            return False, 1.0
-
-        return False, 1.0
-
-    def _check_single_condition(
-        self,
-        condition: Dict,
-        stats: Dict[str, Dict]
-    ) -> Tuple[bool, float]:
-        """Check a single condition."""
-        stat = condition.get('stat', '')
-        op = condition.get('op', '>=')
-        target = condition.get('value', 0)
-        multiplier = condition.get('multiplier', 1.0)
-
-        # Get stat value
-        current = self._get_stat_value(stat, stats)
-
-        # Compare
-        if op == '>=':
-            result = current >= target
-        elif op == '>':
-            result = current > target
-        elif op == '<=':
-            result = current <= target
-        elif op == '<':
-            result = current < target
-        elif op == '==':
-            result = current == target
-        elif op == '!=':
-            result = current != target
-        else:
-            result = False
-
-        return result, multiplier if result else 1.0
-
-    def _check_multi_conditions(
-        self,
-        challenge_def: Dict,
-        stats: Dict[str, Dict]
-    ) -> Tuple[bool, float]:
-        """Check multiple conditions with AND/OR logic."""
-        conditions = challenge_def.get('conditions', [])
-        logic = challenge_def.get('logic', 'and').lower()
-        max_multiplier = 1.0
-
-        results = []
-        for cond in conditions:
-            passed, mult = self._check_single_condition(cond, stats)
-            results.append(passed)
-            if passed and mult > max_multiplier:
-                max_multiplier = mult
-
-        if logic == 'and':
-            return all(results), max_multiplier
-        elif logic == 'or':
-            return any(results), max_multiplier
-        else:
-            return False, 1.0
-
-    def _get_stat_value(self, stat: str, stats: Dict[str, Dict]) -> float:
-        """Get a stat value, handling computed stats."""
-        # Direct stat
-        if stat in stats:
-            return stats[stat].get('stat_value', 0)
-
-        # Computed stats
-        if stat == 'avg_kda':
-            kills = stats.get('kills', {}).get('stat_value', 0)
-            deaths = stats.get('deaths', {}).get('stat_value', 0)
-            assists = stats.get('assists', {}).get('stat_value', 0)
-            return (kills + assists) / max(deaths, 1)
-
-        elif stat == 'weekly_winrate':
-            wins = stats.get('wins', {}).get('stat_value', 0)
-            losses = stats.get('losses', {}).get('stat_value', 0)
-            total = wins + losses
-            return (wins / total) * 100 if total > 0 else 0
-
-        elif stat == 'cs_per_min_avg':
-            cs = stats.get('cs_total', {}).get('stat_value', 0)
-            time_played = stats.get('time_played', {}).get('stat_value', 0)
-            time_min = time_played / 60 if time_played > 0 else 1
-            return cs / time_min
-
-        elif stat == 'avg_vision':
-            vision = stats.get('vision_score_total', {}).get('stat_value', 0)
-            games = stats.get('games_played', {}).get('stat_value', 1)
-            return vision / max(games, 1)
-
-        elif stat == 'avg_damage':
-            damage = stats.get('damage_dealt', {}).get('stat_value', 0)
-            games = stats.get('games_played', {}).get('stat_value', 1)
-            return damage / max(games, 1)
-
-        elif stat == 'avg_gold':
-            gold = stats.get('gold_earned', {}).get('stat_value', 0)
-            games = stats.get('games_played', {}).get('stat_value', 1)
-            return gold / max(games, 1)
-
-        return 0
-
     async def process_week_end(self) -> Dict[str, Any]:
         """
         Traite la fin de semaine:
@@ -988,6 +574,7 @@ class WeeklyChallenges:
 
         # Check for uncompleted global challenges
         global_challenges = await self.db.get_weekly_challenges(week_start)
+        week_completions = await self.load_completions(week_start)
         penalties_applied = []
 
         for challenge in global_challenges:
@@ -995,11 +582,7 @@ class WeeklyChallenges:
                 continue
 
             challenge_id = challenge['challenge_id']
-            completions = await self.db.get_challenge_completions_for_week(
-                challenge_id, week_start
-            )
-
-            if not completions:
+            if not week_completions.for_challenge(challenge_id):
                 # No one completed - apply penalty
                 challenge_def = config.GLOBAL_CHALLENGES.get(challenge_id, {})
 
@@ -1069,6 +652,7 @@ class WeeklyChallenges:
         """Genere l'embed des challenges actifs pour un joueur"""
         week_start = self.get_current_week_start()
         challenges = await self.db.get_weekly_challenges(week_start, discord_id)
+        week_completions = await self.load_completions(week_start)
 
         embed = discord.Embed(
             title=f"Challenges de la semaine",
@@ -1101,9 +685,7 @@ class WeeklyChallenges:
                 points = config.CHALLENGE_POINTS.get(difficulty, 20)
 
                 # Check if completed
-                completion = await self.db.get_challenge_completion(
-                    challenge_id, week_start, discord_id
-                )
+                completion = week_completions.get(challenge_id, discord_id)
                 status = " Termine!" if completion else ""
 
                 lines.append(f"**{name}** ({points} pts){status}\n> {desc}")
@@ -1124,9 +706,7 @@ class WeeklyChallenges:
                 points = config.CHALLENGE_POINTS.get(difficulty, 20)
 
                 # Check if completed
-                completion = await self.db.get_challenge_completion(
-                    challenge_id, week_start, discord_id
-                )
+                completion = week_completions.get(challenge_id, discord_id)
                 status = " Termine!" if completion else ""
 
                 lines.append(f"**{name}** ({points} pts){status}\n> {desc}")
@@ -4,65 +4,220 @@ Client HTTP asynchrone avec rate limiting pour l'API Riot
 import aiohttp
 import asyncio
 import time
-from collections import deque
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlsplit
 from config import RATE_LIMIT
 
 
+def parse_rate_limit_header(value: Optional[str]) -> List[Tuple[int, float]]:
+    """
+    Parse un header Riot de rate limit ("20:1,100:120").
+
+    Fonctionne pour les limites (X-App-Rate-Limit) comme pour les compteurs
+    (X-App-Rate-Limit-Count). Retourne [(valeur, fenetre_secondes)].
+    """
+    pairs = []
+    if not value:
+        return pairs
+    for part in value.split(','):
+        try:
+            count, window = part.strip().split(':')
+            pairs.append((int(count), float(window)))
+        except ValueError:
+            continue
+    return pairs
+
+
+class _WindowLog:
+    """
+    Ring buffer de taille fixe pour une fenetre de rate limit.
+
+    Contient les timestamps des `limit` derniers appels (reserves), le plus
+    ancien etant toujours sous `head`. Un nouvel appel est autorise des que
+    ce plus ancien appel sort de la fenetre: verification en O(1).
+    """
+
+    __slots__ = ('limit', 'window', 'slots', 'head')
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.slots = [float('-inf')] * limit
+        self.head = 0
+
+    def next_free(self) -> float:
+        """Instant (monotonic) a partir duquel un nouvel appel passe"""
+        return self.slots[self.head] + self.window
+
+    def newest(self) -> float:
+        """Timestamp du dernier appel enregistre"""
+        return self.slots[self.head - 1]
+
+    def record(self, ts: float):
+        """Enregistre un appel a l'instant ts (ecrase le plus ancien)"""
+        self.slots[self.head] = ts
+        self.head = (self.head + 1) % self.limit
+
+    def has_room(self, calls: int, cutoff: float) -> bool:
+        """True si moins de `calls` appels sont enregistres apres cutoff (O(1))"""
+        if calls > self.limit:
+            return True
+        # Le buffer est trie: le calls-ieme plus recent suffit
+        return self.slots[(self.head - calls) % self.limit] <= cutoff
+
+    def count_since(self, cutoff: float) -> int:
+        """Nombre d'appels enregistres apres cutoff (reservations incluses)"""
+        return sum(1 for ts in self.slots if ts > cutoff)
+
+    def resize(self, limit: int):
+        """Change la taille du buffer en gardant les appels les plus recents"""
+        if limit == self.limit:
+            return
+        ordered = self.slots[self.head:] + self.slots[:self.head]
+        if limit < self.limit:
+            ordered = ordered[-limit:]
+        else:
+            ordered = [float('-inf')] * (limit - self.limit) + ordered
+        self.limit = limit
+        self.slots = ordered
+        self.head = 0
+
+
 class RateLimiter:
     """
-    Gestionnaire de rate limiting avec sliding window.
+    Rate limiter multi-fenetres a temps constant.
 
-    Tracks actual API call timestamps and waits when approaching limits.
-    - 20 requests per second
-    - 100 requests per 2 minutes
+    Chaque fenetre est un ring buffer des N derniers appels. acquire() calcule
+    l'instant exact ou l'appel respecte toutes les fenetres, reserve ce slot
+    immediatement puis dort jusqu'a cette echeance, sans lock: les appelants
+    sont servis dans l'ordre d'arrivee (FIFO) et reveilles a l'heure exacte.
+
+    Les fenetres par defaut viennent de config.RATE_LIMIT (cle dev:
+    20 req/s, 100 req/2min) puis sont remplacees par les vraies limites
+    annoncees dans les headers X-*-Rate-Limit des reponses Riot.
     """
 
-    def __init__(self):
-        self.limit_per_second = RATE_LIMIT['REQUESTS_PER_SECOND']  # 20
-        self.limit_per_two_minutes = RATE_LIMIT['REQUESTS_PER_TWO_MINUTES']  # 100
+    # Marge de securite ajoutee a chaque echeance (decalage d'horloge serveur)
+    SAFETY_MARGIN = 0.01
+
+    def __init__(self, name: str = "app", limits: Optional[List[Tuple[int, float]]] = None):
+        self.name = name
+        if limits is None:
+            limits = [
+                (RATE_LIMIT['REQUESTS_PER_SECOND'], 1.0),
+                (RATE_LIMIT['REQUESTS_PER_TWO_MINUTES'], 120.0),
+            ]
+        self.windows: List[_WindowLog] = [
+            _WindowLog(limit, window) for limit, window in sorted(limits, key=lambda p: p[1])
+        ]
+        self._limits_header: Optional[str] = None
 
-        # Sliding window: store timestamps of all calls
-        self.call_timestamps: deque = deque()
-        self.lock = asyncio.Lock()
+        # Bloque apres un 429 (Retry-After)
+        self.blocked_until = 0.0
 
         # Stats
         self.total_calls = 0
         self.total_waits = 0
 
-    def _cleanup_old_calls(self, now: float):
-        """Remove calls older than 2 minutes"""
-        cutoff = now - 120.0
-        while self.call_timestamps and self.call_timestamps[0] < cutoff:
-            self.call_timestamps.popleft()
-
-    def _count_calls_in_window(self, now: float, window_seconds: float) -> int:
-        """Count calls in the last N seconds"""
-        cutoff = now - window_seconds
-        count = 0
-        # Count from the end (most recent) backwards
-        for ts in reversed(self.call_timestamps):
-            if ts >= cutoff:
-                count += 1
+    def _window(self, seconds: float) -> Optional[_WindowLog]:
+        for window in self.windows:
+            if window.window == seconds:
+                return window
+        return None
+
+    def update_limits(self, header: Optional[str]):
+        """Reconfigure les fenetres depuis un header X-*-Rate-Limit"""
+        if not header or header == self._limits_header:
+            return
+        limits = parse_rate_limit_header(header)
+        if not limits:
+            return
+
+        windows = []
+        for limit, seconds in sorted(limits, key=lambda p: p[1]):
+            window = self._window(seconds)
+            if window:
+                window.resize(limit)
             else:
-                break
-        return count
+                window = _WindowLog(limit, seconds)
+            windows.append(window)
+
+        self.windows = windows
+        self._limits_header = header
+        print(f"[RateLimit] {self.name}: limites {header}")
+
+    def sync_counts(self, header: Optional[str]):
+        """
+        Resynchronise les compteurs locaux avec X-*-Rate-Limit-Count.
+
+        Si Riot compte plus d'appels que nous (redemarrage, autre process sur
+        la meme cle), on ajoute les appels manquants. On ne retire jamais
+        d'appels: le compteur local reste au moins aussi prudent que Riot.
+        """
+        now = time.monotonic()
+        for count, seconds in parse_rate_limit_header(header):
+            window = self._window(seconds)
+            if not window:
+                continue
+            missing = min(count, window.limit) - window.count_since(now - seconds)
+            for _ in range(missing):
+                # Ajoute en queue pour garder le buffer trie
+                window.record(max(now, window.newest()))
+
+    def block_for(self, seconds: float):
+        """Bloque le limiter (429 recu avec Retry-After)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def next_start(self, now: float) -> float:
+        """Premier instant >= now ou un appel respecte toutes les fenetres"""
+        start = max(now, self.blocked_until)
+        for window in self.windows:
+            free_at = window.next_free()
+            if free_at > start:
+                start = free_at + self.SAFETY_MARGIN
+        return start
+
+    def has_headroom(self, now: float, headroom: float) -> bool:
+        """
+        True si un appel peut partir maintenant en laissant au moins la
+        fraction `headroom` de chaque fenetre libre (appels basse priorite).
+        """
+        if now < self.blocked_until:
+            return False
+        for window in self.windows:
+            allowed = max(1, int(window.limit * (1 - headroom)))
+            if not window.has_room(allowed, now - window.window):
+                return False
+        return True
+
+    def reserve(self, start: float, waited: bool):
+        """Reserve un slot a l'instant start dans toutes les fenetres"""
+        for window in self.windows:
+            window.record(start)
+        self.total_calls += 1
+        if waited:
+            self.total_waits += 1
 
     def get_status(self) -> Dict[str, Any]:
         """Get current rate limit status"""
-        now = time.time()
-        self._cleanup_old_calls(now)
+        now = time.monotonic()
 
-        calls_1s = self._count_calls_in_window(now, 1.0)
-        calls_2m = len(self.call_timestamps)
+        short = self.windows[0]
+        long = self.windows[-1]
+        calls_short = short.count_since(now - short.window)
+        calls_long = long.count_since(now - long.window)
 
         return {
-            'calls_last_second': calls_1s,
-            'calls_last_2min': calls_2m,
-            'limit_per_second': self.limit_per_second,
-            'limit_per_2min': self.limit_per_two_minutes,
-            'available_1s': self.limit_per_second - calls_1s,
-            'available_2m': self.limit_per_two_minutes - calls_2m,
+            'calls_last_second': calls_short,
+            'calls_last_2min': calls_long,
+            'limit_per_second': short.limit,
+            'limit_per_2min': long.limit,
+            'available_1s': short.limit - calls_short,
+            'available_2m': long.limit - calls_long,
+            'windows': [
+                {'window': w.window, 'limit': w.limit, 'calls': w.count_since(now - w.window)}
+                for w in self.windows
+            ],
             'total_calls': self.total_calls,
             'total_waits': self.total_waits,
         }
@@ -72,49 +227,39 @@ class RateLimiter:
         Wait until we can make a call without exceeding rate limits.
         Returns immediately if under limits, waits if at limit.
         """
-        async with self.lock:
-            while True:
-                now = time.time()
-                self._cleanup_old_calls(now)
-
-                calls_1s = self._count_calls_in_window(now, 1.0)
-                calls_2m = len(self.call_timestamps)
-
-                # Check if we can make a call
-                if calls_1s < self.limit_per_second and calls_2m < self.limit_per_two_minutes:
-                    # Record this call
-                    self.call_timestamps.append(now)
-                    self.total_calls += 1
-                    return
-
-                # Need to wait - calculate how long
-                wait_time = 0.0
-
-                if calls_1s >= self.limit_per_second:
-                    # Wait until oldest call in last second expires
-                    oldest_in_1s = None
-                    cutoff_1s = now - 1.0
-                    for ts in self.call_timestamps:
-                        if ts >= cutoff_1s:
-                            oldest_in_1s = ts
-                            break
-                    if oldest_in_1s:
-                        wait_time = max(wait_time, (oldest_in_1s + 1.0) - now + 0.01)
-
-                if calls_2m >= self.limit_per_two_minutes:
-                    # Wait until oldest call expires from 2min window
-                    if self.call_timestamps:
-                        oldest = self.call_timestamps[0]
-                        wait_time = max(wait_time, (oldest + 120.0) - now + 0.01)
-
-                if wait_time > 0:
-                    self.total_waits += 1
-                    remaining_2m = self.limit_per_two_minutes - calls_2m
-                    print(f"[RateLimit] Waiting {wait_time:.1f}s... ({calls_2m}/100 calls in 2min, {remaining_2m} remaining)")
-                    await asyncio.sleep(wait_time)
-                else:
-                    # Small sleep to prevent tight loop
-                    await asyncio.sleep(0.05)
+        await acquire_all([self])
+
+
+async def acquire_all(limiters: List[RateLimiter], low_priority: bool = False):
+    """
+    Reserve un meme slot dans plusieurs limiters (application + methode).
+
+    Le slot est l'instant le plus tot qui respecte toutes leurs fenetres; il
+    est reserve avant de dormir, donc un appelant annule pendant l'attente
+    consomme quand meme son slot (comportement conservateur).
+
+    low_priority: l'appel attend (sans rien reserver) que chaque fenetre ait
+    encore RATE_LIMIT['BACKGROUND_HEADROOM'] de sa capacite libre, pour ne
+    jamais retarder les appels interactifs.
+    """
+    if low_priority:
+        headroom = RATE_LIMIT['BACKGROUND_HEADROOM']
+        while not all(limiter.has_headroom(time.monotonic(), headroom) for limiter in limiters):
+            await asyncio.sleep(RATE_LIMIT['BACKGROUND_POLL_INTERVAL'])
+
+    now = time.monotonic()
+    start = now
+    for limiter in limiters:
+        start = max(start, limiter.next_start(now))
+
+    wait_time = start - now
+    for limiter in limiters:
+        limiter.reserve(start, waited=wait_time > 0)
+
+    if wait_time > 0:
+        names = ", ".join(l.name for l in limiters)
+        print(f"[RateLimit] Waiting {wait_time:.1f}s... ({names})")
+        await asyncio.sleep(wait_time)
 
 
 class RiotAPIClient:
@@ -123,7 +268,13 @@ class RiotAPIClient:
     def __init__(self, api_key: str, db_manager=None):
         self.api_key = api_key
         self.db_manager = db_manager
-        self.rate_limiter = RateLimiter()
+        # Riot compte les limites par routing value: euw1 (platform) et
+        # europe (regional) ont chacun leur bucket application.
+        self.rate_limiters: Dict[str, RateLimiter] = {}
+        # Limites par (host, methode), apprises depuis X-Method-Rate-Limit
+        self.method_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+        # Requetes en cours, par cache_key (ou URL), pour le single-flight
+        self._inflight: Dict[str, asyncio.Future] = {}
         self.session: Optional[aiohttp.ClientSession] = None
 
     async def start(self):
@@ -137,27 +288,98 @@ class RiotAPIClient:
         if self.session:
             await self.session.close()
 
+    def _app_limiter(self, host: str) -> RateLimiter:
+        """Limiter application du host (cree avec les limites de config)"""
+        limiter = self.rate_limiters.get(host)
+        if not limiter:
+            limiter = RateLimiter(name=host)
+            self.rate_limiters[host] = limiter
+        return limiter
+
+    def _limiters_for(self, host: str, method: Optional[str]) -> List[RateLimiter]:
+        """Limiters a traverser pour une requete"""
+        limiters = [self._app_limiter(host)]
+        method_limiter = self.method_limiters.get((host, method)) if method else None
+        if method_limiter:
+            limiters.append(method_limiter)
+        return limiters
+
+    def _update_rate_limits(self, headers, host: str, method: Optional[str]):
+        """Apprend les limites et resynchronise les compteurs depuis les headers"""
+        app_limit = headers.get('X-App-Rate-Limit')
+        if app_limit:
+            limiter = self._app_limiter(host)
+            limiter.update_limits(app_limit)
+            limiter.sync_counts(headers.get('X-App-Rate-Limit-Count'))
+
+        method_limit = headers.get('X-Method-Rate-Limit')
+        if method and method_limit:
+            limiter = self.method_limiters.get((host, method))
+            if not limiter:
+                limiter = RateLimiter(
+                    name=f"{host} {method}", limits=parse_rate_limit_header(method_limit)
+                )
+                self.method_limiters[(host, method)] = limiter
+            limiter.update_limits(method_limit)
+            limiter.sync_counts(headers.get('X-Method-Rate-Limit-Count'))
+
     async def request(
         self,
         url: str,
         cache_key: Optional[str] = None,
         cache_ttl: Optional[int] = None,
         use_rate_limit: bool = True,
-        _retries: int = 0
+        method: Optional[str] = None,
+        low_priority: bool = False
     ) -> Optional[Dict[str, Any]]:
         """
         Effectue une requête HTTP avec cache et rate limiting
 
+        Les requetes identiques concurrentes (meme cache_key, ou meme URL sans
+        cache) sont fusionnees: un seul appel HTTP, un seul token de rate
+        limit, et tous les appelants recoivent le meme objet resultat (a ne
+        pas modifier en place).
+
         Args:
             url: URL complète de la requête
             cache_key: Clé pour le cache (optionnel)
             cache_ttl: Durée de vie du cache en secondes (optionnel)
             use_rate_limit: Utiliser le rate limiter (défaut: True)
-            _retries: Compteur interne de retries (ne pas utiliser directement)
+            method: Nom de la methode Riot (ex: 'match-v5.getMatch') pour
+                appliquer ses limites X-Method-Rate-Limit (optionnel)
+            low_priority: Requete de fond (backfill), ne passe que s'il reste
+                de la marge dans le rate limit (défaut: False)
 
         Returns:
             Réponse JSON ou None en cas d'erreur
         """
+        flight_key = cache_key or url
+
+        pending = self._inflight.get(flight_key)
+        if pending:
+            print(f"[API] Requete deja en cours, partage: {flight_key}")
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(
+            self._request(url, cache_key, cache_ttl, use_rate_limit, method, low_priority)
+        )
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+
+        # shield: si l'appelant est annule, la requete continue pour les autres
+        return await asyncio.shield(task)
+
+    async def _request(
+        self,
+        url: str,
+        cache_key: Optional[str],
+        cache_ttl: Optional[int],
+        use_rate_limit: bool,
+        method: Optional[str],
+        low_priority: bool = False,
+        _retries: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """Cache, rate limiting et requete HTTP (voir request)"""
         MAX_RETRIES = 3
 
         # Vérifier le cache
@@ -167,9 +389,10 @@ class RiotAPIClient:
                 print(f"[API] Cache hit: {cache_key}")
                 return cached
 
-        # Attendre le rate limiter
+        # Attendre le rate limiter (bucket du host + bucket de la methode)
+        host = urlsplit(url).netloc
         if use_rate_limit:
-            await self.rate_limiter.acquire()
+            await acquire_all(self._limiters_for(host, method), low_priority)
 
         # Effectuer la requête
         print(f"[API] Requête: {url}")
@@ -181,6 +404,8 @@ class RiotAPIClient:
         try:
             async with self.session.get(url) as response:
                 print(f"[API] Status: {response.status}")
+                self._update_rate_limits(response.headers, host, method)
+
                 if response.status == 200:
                     data = await response.json()
 
@@ -196,9 +421,19 @@ class RiotAPIClient:
                         return None
                     # Rate limit dépassé, attendre
                     retry_after = int(response.headers.get('Retry-After', 1))
-                    print(f"[API] Rate limit 429, retry dans {retry_after}s (tentative {_retries + 1}/{MAX_RETRIES})")
+                    limit_type = response.headers.get('X-Rate-Limit-Type')
+                    print(f"[API] Rate limit 429 ({limit_type}), retry dans {retry_after}s (tentative {_retries + 1}/{MAX_RETRIES})")
+
+                    # Bloquer le bucket concerne pour que les autres appelants attendent aussi
+                    if limit_type == 'application':
+                        self._app_limiter(host).block_for(retry_after)
+                    elif limit_type == 'method' and (host, method) in self.method_limiters:
+                        self.method_limiters[(host, method)].block_for(retry_after)
+
                     await asyncio.sleep(retry_after)
-                    return await self.request(url, cache_key, cache_ttl, use_rate_limit=False, _retries=_retries + 1)
+                    return await self._request(
+                        url, cache_key, cache_ttl, False, method, low_priority, _retries=_retries + 1
+                    )
 
                 elif response.status == 404:
                     return None
@@ -226,5 +461,14 @@ class RiotAPIClient:
         return await asyncio.gather(*tasks)
 
     def get_rate_limit_status(self) -> Dict[str, Any]:
-        """Get current rate limit status"""
-        return self.rate_limiter.get_status()
+        """Get current rate limit status, par host puis par methode"""
+        status = {}
+        for host, limiter in self.rate_limiters.items():
+            host_status = limiter.get_status()
+            host_status['methods'] = {
+                method: method_limiter.get_status()
+                for (method_host, method), method_limiter in self.method_limiters.items()
+                if method_host == host
+            }
+            status[host] = host_status
+        return status
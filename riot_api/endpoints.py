@@ -1,6 +1,7 @@
 """
 Wrappers pour les endpoints de l'API Riot Games
 """
+import asyncio
 from typing import Optional, Dict, Any, List
 from config import RIOT_API_BASE, DEFAULT_REGION, ROUTING_REGION, CACHE_TTL
 
@@ -23,7 +24,7 @@ class RiotEndpoints:
         """
         url = f"{self.regional_base}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
         cache_key = f"account:riotid:{game_name}#{tag_line}"
-        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'])
+        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'], method='account-v1.getByRiotId')
 
     async def get_account_by_puuid(self, puuid: str) -> Optional[Dict[str, Any]]:
         """
@@ -33,7 +34,7 @@ class RiotEndpoints:
         """
         url = f"{self.regional_base}/riot/account/v1/accounts/by-puuid/{puuid}"
         cache_key = f"account:puuid:{puuid}"
-        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'])
+        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'], method='account-v1.getByPuuid')
 
     # ==================== SUMMONER-V4 ====================
 
@@ -45,7 +46,7 @@ class RiotEndpoints:
         """
         url = f"{self.platform_base}/lol/summoner/v4/summoners/by-puuid/{puuid}"
         cache_key = f"summoner:puuid:{puuid}"
-        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'])
+        return await self.client.request(url, cache_key, CACHE_TTL['REGISTERED_USER'], method='summoner-v4.getByPUUID')
 
     # ==================== LEAGUE-V4 ====================
 
@@ -59,7 +60,7 @@ class RiotEndpoints:
         cache_key = f"league:puuid:{puuid}"
 
         # Faire la requête
-        result = await self.client.request(url, cache_key, CACHE_TTL['RANK'])
+        result = await self.client.request(url, cache_key, CACHE_TTL['RANK'], method='league-v4.getLeagueEntriesByPUUID')
 
         # Si le résultat est vide, supprimer du cache pour permettre un refresh
         # (évite de cacher un résultat "non classé" pendant 30 min)
@@ -80,7 +81,7 @@ class RiotEndpoints:
         """
         url = f"{self.platform_base}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top?count={count}"
         cache_key = f"mastery:puuid:{puuid}:top{count}"
-        return await self.client.request(url, cache_key, CACHE_TTL['MASTERY'])
+        return await self.client.request(url, cache_key, CACHE_TTL['MASTERY'], method='champion-mastery-v4.getTopChampionMasteries')
 
     async def get_champion_mastery(self, puuid: str, champion_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -90,7 +91,7 @@ class RiotEndpoints:
         """
         url = f"{self.platform_base}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/by-champion/{champion_id}"
         cache_key = f"mastery:puuid:{puuid}:champion:{champion_id}"
-        return await self.client.request(url, cache_key, CACHE_TTL['MASTERY'])
+        return await self.client.request(url, cache_key, CACHE_TTL['MASTERY'], method='champion-mastery-v4.getChampionMastery')
 
     # ==================== MATCH-V5 ====================
 
@@ -121,7 +122,36 @@ class RiotEndpoints:
             url += f"&startTime={start_time}"
 
         cache_key = f"match_history:puuid:{puuid}:queue:{queue}:start:{start}:count:{count}:st:{start_time}"
-        return await self.client.request(url, cache_key, CACHE_TTL['MATCH_HISTORY'])
+        return await self.client.request(url, cache_key, CACHE_TTL['MATCH_HISTORY'], method='match-v5.getMatchIdsByPUUID')
+
+    async def get_match_ids_since(
+        self,
+        puuid: str,
+        start_time: int,
+        queue: Optional[int] = None
+    ) -> List[str]:
+        """
+        Tous les IDs de matchs depuis start_time (epoch secondes), du plus
+        recent au plus ancien. Pagine par 100: le nombre d'appels depend du
+        nombre de matchs apres start_time, pas de la longueur de la saison.
+        """
+        match_ids = []
+        start = 0
+        while True:
+            batch = await self.get_match_history(
+                puuid=puuid,
+                start=start,
+                count=100,
+                queue=queue,
+                start_time=start_time
+            )
+            if not batch:
+                break
+            match_ids.extend(batch)
+            if len(batch) < 100:
+                break
+            start += 100
+        return match_ids
 
     async def get_match(self, match_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -131,17 +161,56 @@ class RiotEndpoints:
         """
         url = f"{self.regional_base}/lol/match/v5/matches/{match_id}"
         cache_key = f"match:{match_id}"
-        return await self.client.request(url, cache_key, CACHE_TTL['MATCH_DETAIL'])
+        result = await self.client.request(url, cache_key, CACHE_TTL['MATCH_DETAIL'], method='match-v5.getMatch')
+
+        # Normaliser le match (matches / match_participants) au premier fetch
+        if result and self.client.db_manager:
+            await self.client.db_manager.store_match(result)
+
+        return result
+
+    async def get_match_participants(self, match_ids: List[str], puuid: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Ligne normalisee d'un joueur pour chaque match, {match_id: participant}.
+        Lit match_participants et ne fetch que les matchs pas encore stockes.
+        """
+        db = self.client.db_manager
+        rows = await db.get_match_participants(puuid, match_ids)
+
+        missing = [match_id for match_id in match_ids if match_id not in rows]
+        if missing:
+            await asyncio.gather(*(self.get_match(match_id) for match_id in missing), return_exceptions=True)
+            rows.update(await db.get_match_participants(puuid, missing))
+
+        return rows
 
-    async def get_match_timeline(self, match_id: str) -> Optional[Dict[str, Any]]:
+    async def get_match_participant(self, match_id: str, puuid: str) -> Optional[Dict[str, Any]]:
+        """Ligne normalisee d'un joueur dans un match (None si absent)"""
+        rows = await self.get_match_participants([match_id], puuid)
+        return rows.get(match_id)
+
+    async def get_match_timeline(
+        self,
+        match_id: str,
+        use_cache: bool = True,
+        low_priority: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Récupère la timeline d'un match (frames par minute, événements)
 
+        use_cache=False: ni lue ni stockee dans api_cache (l'appelant n'en
+        garde que des features, la timeline brute est jetee aussitot)
+        low_priority=True: requete de fond, cede la place aux commandes
+
         Returns: Timeline data avec 'info.frames' et 'info.frameInterval'
         """
         url = f"{self.regional_base}/lol/match/v5/matches/{match_id}/timeline"
+        if not use_cache:
+            return await self.client.request(url, method='match-v5.getTimeline', low_priority=low_priority)
         cache_key = f"timeline:{match_id}"
-        return await self.client.request(url, cache_key, CACHE_TTL['MATCH_TIMELINE'])
+        return await self.client.request(
+            url, cache_key, CACHE_TTL['MATCH_TIMELINE'], method='match-v5.getTimeline', low_priority=low_priority
+        )
 
     # ==================== SPECTATOR-V4 ====================
 
@@ -152,7 +221,7 @@ class RiotEndpoints:
         Returns: Game data ou None si pas en partie
         """
         url = f"{self.platform_base}/lol/spectator/v4/active-games/by-summoner/{puuid}"
-        return await self.client.request(url, use_rate_limit=True)
+        return await self.client.request(url, use_rate_limit=True, method='spectator-v4.getCurrentGameInfoByPuuid')
 
     # ==================== CLASH-V1 ====================
 
@@ -163,7 +232,7 @@ class RiotEndpoints:
         Returns: List of {'teamId': str, 'position': str, 'role': str}
         """
         url = f"{self.platform_base}/lol/clash/v1/players/by-puuid/{puuid}"
-        return await self.client.request(url, use_rate_limit=True)
+        return await self.client.request(url, use_rate_limit=True, method='clash-v1.getPlayersByPUUID')
 
     async def get_clash_team(self, team_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -172,4 +241,4 @@ class RiotEndpoints:
         Returns: {'id': str, 'name': str, 'players': [...]}
         """
         url = f"{self.platform_base}/lol/clash/v1/teams/{team_id}"
-        return await self.client.request(url, use_rate_limit=True)
+        return await self.client.request(url, use_rate_limit=True, method='clash-v1.getTeamById')